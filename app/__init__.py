@@ -3,11 +3,19 @@ from pathlib import Path
 import os
 from datetime import datetime
 
-from app.routes import appointment_bp
+from app.config import active_config
+from app.routes import appointment_bp, metrics_bp
+from app.services.archive_service import start_archive_scheduler
+from app.utils.profiler import init_profiler
 
 
-def create_app(test_config=None):
-    """Create and configure the Flask application"""
+def create_app(test_config=None, background_jobs=True):
+    """
+    Create and configure the Flask application
+
+    Pass background_jobs=False when the app is loaded before worker processes
+    are forked; each worker then starts the jobs itself (see wsgi.py).
+    """
     # Create and configure the app
     app = Flask(__name__, instance_relative_config=True)
     app.config.from_mapping(
@@ -33,6 +41,21 @@ def create_app(test_config=None):
 
     # Register blueprints
     app.register_blueprint(appointment_bp)
+    app.register_blueprint(metrics_bp)
+
+    # Profile sampled or flagged requests, if enabled (no hooks otherwise)
+    init_profiler(
+        app,
+        active_config.PROFILE_DIR,
+        sample_rate=active_config.PROFILE_SAMPLE_RATE,
+        token=active_config.PROFILE_TOKEN,
+        header=active_config.PROFILE_HEADER,
+        trace_memory=active_config.PROFILE_TRACEMALLOC
+    )
+
+    # Archive past slots on a schedule, unless disabled or testing
+    if background_jobs and active_config.ARCHIVE_INTERVAL_SECONDS > 0 and not app.config.get('TESTING'):
+        start_archive_scheduler(active_config.ARCHIVE_INTERVAL_SECONDS)
 
     # UI Routes
     @app.route('/')
@@ -54,10 +77,26 @@ def create_app(test_config=None):
             "message": "Welcome to the Therapist-Client Scheduling API",
             "endpoints": {
                 "Create slot": "POST /api/appointments/therapist/slots",
+                "Create availability range": "POST /api/appointments/therapist/availability",
+                "Apply availability template": "POST /api/appointments/availability/template",
+                "Create availability rule": "POST /api/appointments/therapist/{therapist_id}/rules",
+                "List availability rules": "GET /api/appointments/therapist/{therapist_id}/rules",
+                "Delete availability rule": "DELETE /api/appointments/therapist/{therapist_id}/rules/{rule_id}",
                 "List slots": "GET /api/appointments/therapist/{therapist_id}/slots?date=YYYY-MM-DD",
+                "List slots in range": "GET /api/appointments/therapist/{therapist_id}/slots?from=YYYY-MM-DD&to=YYYY-MM-DD (supports If-None-Match)",
+                "Stream slot changes": "GET /api/appointments/therapist/{therapist_id}/events",
+                "Day statistics": "GET /api/appointments/therapist/{therapist_id}/stats?date=YYYY-MM-DD",
+                "List therapists": "GET /api/appointments/therapists?date=YYYY-MM-DD",
+                "Find earliest slots": "GET /api/appointments/search/earliest?therapist_ids=ID,ID&from=YYYY-MM-DD&to=YYYY-MM-DD",
+                "Export slots": "GET /api/appointments/export?from=YYYY-MM-DD&to=YYYY-MM-DD",
+                "Cache statistics": "GET /api/appointments/cache/stats",
                 "Book slot": "POST /api/appointments/book",
-                "Cancel booking": "POST /api/appointments/cancel"
-            }
+                "Cancel booking": "POST /api/appointments/cancel",
+                "Book slots": "POST /api/appointments/book/batch",
+                "Cancel bookings": "POST /api/appointments/cancel/batch",
+                "Metrics": "GET /metrics"
+            },
+            "documentation": "See the API Endpoints section of README.md"
         }
 
     return app
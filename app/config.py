@@ -3,6 +3,7 @@ Application Configuration Module
 """
 import os
 import logging
+from pathlib import Path
 from typing import Dict, Any
 from dotenv import load_dotenv
 
@@ -24,6 +25,80 @@ class Config:
     PORT = int(os.getenv('FLASK_PORT', 5000))
     DEBUG = os.getenv('FLASK_DEBUG', 'False').lower() == 'true'
     
+    # Storage backend settings ('firebase' or 'sqlite')
+    STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'firebase').lower()
+    SQLITE_PATH = os.getenv('SQLITE_PATH', str(Path(__file__).resolve().parent.parent / 'data' / 'appointments.db'))
+    
+    # Slot cache settings (a TTL or size of 0 disables the cache)
+    SLOT_CACHE_TTL_SECONDS = float(os.getenv('SLOT_CACHE_TTL_SECONDS', 30))
+    SLOT_CACHE_MAX_ENTRIES = int(os.getenv('SLOT_CACHE_MAX_ENTRIES', 10000))
+    
+    # Multi-therapist fan-out settings (worker pool size, per-therapist timeout, per-request deadline)
+    FANOUT_MAX_WORKERS = int(os.getenv('FANOUT_MAX_WORKERS', 16))
+    FANOUT_TIMEOUT_SECONDS = float(os.getenv('FANOUT_TIMEOUT_SECONDS', 5))
+    FANOUT_DEADLINE_SECONDS = float(os.getenv('FANOUT_DEADLINE_SECONDS', 10))
+    
+    # Earliest available slot search settings (default window and maximum number of results)
+    SEARCH_WINDOW_DAYS = int(os.getenv('SEARCH_WINDOW_DAYS', 30))
+    SEARCH_MAX_RESULTS = int(os.getenv('SEARCH_MAX_RESULTS', 100))
+    
+    # Maximum number of items in a batch booking or cancellation
+    BATCH_MAX_ITEMS = int(os.getenv('BATCH_MAX_ITEMS', 100))
+    
+    # Maximum number of days an availability template is applied over at once
+    TEMPLATE_MAX_DAYS = int(os.getenv('TEMPLATE_MAX_DAYS', 366))
+    
+    # Maximum number of therapists an availability template is applied to
+    TEMPLATE_MAX_THERAPISTS = int(os.getenv('TEMPLATE_MAX_THERAPISTS', 200))
+    
+    # Cache-Control max-age of GET responses; 0 makes clients revalidate with their ETag every time
+    HTTP_CACHE_MAX_AGE_SECONDS = int(os.getenv('HTTP_CACHE_MAX_AGE_SECONDS', 0))
+    
+    # JSON encoder of slot listings ('auto' uses orjson when installed, else 'json')
+    JSON_ENCODER = os.getenv('JSON_ENCODER', 'auto').lower()
+    
+    # Per-therapist write locks (number of lock stripes, directory of the lock files
+    # shared with the other processes of the host, and seconds a writer waits for a
+    # lock before failing); without a directory the locks only cover this process
+    WRITE_LOCK_STRIPES = int(os.getenv('WRITE_LOCK_STRIPES', 64))
+    WRITE_LOCK_DIR = os.getenv('WRITE_LOCK_DIR', '')
+    WRITE_LOCK_TIMEOUT_SECONDS = float(os.getenv('WRITE_LOCK_TIMEOUT_SECONDS', 30))
+    
+    # Slot event streams (maximum open streams per process, events queued per stream
+    # before its client is told to refetch, and seconds between keep-alive comments)
+    EVENTS_MAX_SUBSCRIBERS = int(os.getenv('EVENTS_MAX_SUBSCRIBERS', 1000))
+    EVENTS_QUEUE_SIZE = int(os.getenv('EVENTS_QUEUE_SIZE', 256))
+    EVENTS_KEEPALIVE_SECONDS = float(os.getenv('EVENTS_KEEPALIVE_SECONDS', 15))
+    
+    # Production server (see gunicorn.conf.py): listening address, worker processes
+    # (0 starts one per CPU core), threads per worker, seconds a worker may stay
+    # unresponsive before it is restarted, seconds workers get to finish their
+    # requests on shutdown, and whether workers warm up before serving
+    SERVER_BIND = os.getenv('SERVER_BIND', '0.0.0.0:5001')
+    SERVER_WORKERS = int(os.getenv('SERVER_WORKERS', 0))
+    SERVER_THREADS = int(os.getenv('SERVER_THREADS', 32))
+    SERVER_TIMEOUT_SECONDS = int(os.getenv('SERVER_TIMEOUT_SECONDS', 30))
+    SERVER_GRACEFUL_TIMEOUT_SECONDS = int(os.getenv('SERVER_GRACEFUL_TIMEOUT_SECONDS', 30))
+    SERVER_WARMUP = os.getenv('SERVER_WARMUP', 'True').lower() == 'true'
+    
+    # Maximum number of therapists given their own label in the backend metrics;
+    # the others are reported together as "_other"
+    METRICS_MAX_THERAPISTS = int(os.getenv('METRICS_MAX_THERAPISTS', 100))
+    
+    # Request profiling (fraction of requests sampled, secret that profiles a request
+    # when sent in PROFILE_HEADER, and whether allocations are traced too);
+    # profiling is off unless a sample rate or a token is set
+    PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', 0))
+    PROFILE_TOKEN = os.getenv('PROFILE_TOKEN', '')
+    PROFILE_HEADER = os.getenv('PROFILE_HEADER', 'X-Profile-Token')
+    PROFILE_TRACEMALLOC = os.getenv('PROFILE_TRACEMALLOC', 'False').lower() == 'true'
+    PROFILE_DIR = os.getenv('PROFILE_DIR', str(Path(__file__).resolve().parent.parent / 'data' / 'profiles'))
+    
+    # Retention settings (days of history kept in the working set, and how often
+    # the in-process job archives older months; an interval of 0 disables the job)
+    RETENTION_DAYS = int(os.getenv('RETENTION_DAYS', 180))
+    ARCHIVE_INTERVAL_SECONDS = float(os.getenv('ARCHIVE_INTERVAL_SECONDS', 0))
+    
     # Firebase settings
     FIREBASE_CONFIG = {
         "project_id": "sansa-sswe-kevin",
@@ -1,49 +1,252 @@
 # Integration modules for database access
 #
-# The application supports two compatible database backends:
-# 1. Firebase Realtime Database (primary implementation)
-# 2. Google Calendar Mock (alternative implementation using Firebase under the hood)
+# Every storage backend implements the StorageBackend interface from
+# app.integrations.base. The backend is selected with the STORAGE_BACKEND
+# setting in app/config.py:
+# 1. firebase - Firebase Realtime Database (default)
+# 2. sqlite - Local SQLite database file, no network required
 #
-# Both implementations provide the same interface and functionality.
-# The architecture allows for easy switching between implementations
-# or adding new ones in the future.
+# The module-level functions below delegate to the active backend, which is
+# only imported and created on first use, so selecting SQLite never needs
+# firebase_admin to be installed. A process forked after the backend was
+# created resets it (StorageBackend._after_fork), so workers of a pre-fork
+# server never share their parent's connections.
 
+import importlib
 import logging
+import os
+import threading
+from datetime import datetime, date, time
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
+
+from app.config import active_config
+from app.integrations.base import StorageBackend, TimeSlot, BookingResult, AvailabilityRule
+from app.integrations.events import SlotEvent, SlotSubscription, TooManySubscribers
+from app.integrations.locks import LockTimeout
 
 logger = logging.getLogger(__name__)
 
-# Try to import from firebase first (primary implementation)
-try:
-    from app.integrations.firebase_db import (
-        TimeSlot,
-        create_free_slot,
-        create_availability_range,
-        list_available_slots,
-        list_all_slots,
-        book_slot,
-        cancel_booking
-    )
-    logger.info("Using Firebase DB implementation")
-except ImportError:
-    # Fall back to Google Calendar mock if Firebase is unavailable
-    logger.info("Firebase implementation not found, falling back to Google Calendar mock")
-    from app.integrations.google_calendar import (
-        TimeSlot,
-        create_free_slot,
-        create_availability_range,
-        list_available_slots,
-        list_all_slots,
-        book_slot,
-        cancel_booking
-    )
+# Backend name -> (module, class)
+BACKENDS = {
+    'firebase': ('app.integrations.firebase_db', 'FirebaseBackend'),
+    'sqlite': ('app.integrations.sqlite_db', 'SQLiteBackend'),
+}
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def create_backend(name: str) -> StorageBackend:
+    """
+    Create a storage backend by name.
+    
+    Args:
+        name: One of the keys of BACKENDS
+    
+    Returns:
+        StorageBackend: The new backend
+    
+    Raises:
+        ValueError: If the name is not a known backend
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown storage backend '{name}'. Choose one of: {', '.join(BACKENDS)}")
+    
+    module_name, class_name = BACKENDS[name]
+    backend_class = getattr(importlib.import_module(module_name), class_name)
+    logger.info(f"Using {name} storage backend")
+    return backend_class()
+
+
+def get_backend() -> StorageBackend:
+    """Return the active storage backend, creating the configured one on first use."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = create_backend(active_config.STORAGE_BACKEND)
+    return _backend
+
+
+def set_backend(backend: StorageBackend) -> None:
+    """Replace the active storage backend, e.g. with a local one for scripts."""
+    global _backend
+    with _backend_lock:
+        _backend = backend
+
+
+def close_backend() -> None:
+    """Close the active storage backend, if any; the next call creates a new one."""
+    global _backend
+    with _backend_lock:
+        backend, _backend = _backend, None
+    if backend is not None:
+        backend.close()
+
+
+def _after_fork_in_child() -> None:
+    """Reset the backend inherited by a forked child process."""
+    global _backend, _backend_lock
+    # The lock may have been held by another thread of the parent at the fork
+    _backend_lock = threading.Lock()
+    if _backend is not None:
+        try:
+            _backend._after_fork()
+        except Exception as e:
+            logger.error(f"Error resetting the storage backend after fork, creating a new one on next use: {e}")
+            _backend = None
+
+
+if hasattr(os, 'register_at_fork'):  # Not available on Windows, which cannot fork
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+def create_free_slot(therapist_id: str, start_time: datetime, end_time: datetime) -> bool:
+    """Create a free slot for a therapist. See StorageBackend.create_free_slot."""
+    return get_backend().create_free_slot(therapist_id, start_time, end_time)
+
+
+def create_availability_range(therapist_id: str, start_time: datetime, end_time: datetime, slot_duration_minutes: int = 60) -> bool:
+    """Create free slots within a time range. See StorageBackend.create_availability_range."""
+    return get_backend().create_availability_range(therapist_id, start_time, end_time, slot_duration_minutes)
+
+
+def apply_availability_template(therapist_ids: List[str], first_day: date, last_day: date, weekdays: Iterable[int], start_time: time, end_time: time, slot_duration_minutes: int = 60) -> Dict[str, int]:
+    """Create the same weekly availability for several therapists. See StorageBackend.apply_availability_template."""
+    return get_backend().apply_availability_template(therapist_ids, first_day, last_day, weekdays, start_time, end_time, slot_duration_minutes)
+
+
+def create_availability_rule(therapist_id: str, weekdays: Iterable[int], start_time: time, end_time: time, slot_duration_minutes: int = 60, valid_from: Optional[date] = None, valid_to: Optional[date] = None, exceptions: Iterable[date] = ()) -> AvailabilityRule:
+    """Create a recurring weekly availability rule. See StorageBackend.create_availability_rule."""
+    return get_backend().create_availability_rule(therapist_id, weekdays, start_time, end_time, slot_duration_minutes, valid_from, valid_to, exceptions)
+
+
+def list_availability_rules(therapist_id: str) -> List[AvailabilityRule]:
+    """List the availability rules of a therapist. See StorageBackend.list_availability_rules."""
+    return get_backend().list_availability_rules(therapist_id)
+
+
+def delete_availability_rule(therapist_id: str, rule_id: str) -> bool:
+    """Delete an availability rule. See StorageBackend.delete_availability_rule."""
+    return get_backend().delete_availability_rule(therapist_id, rule_id)
+
+
+def list_available_slots(therapist_id: str, search_date: date) -> List[TimeSlot]:
+    """List free slots on a date. See StorageBackend.list_available_slots."""
+    return get_backend().list_available_slots(therapist_id, search_date)
+
+
+def list_all_slots(therapist_id: str, search_date: date) -> List[TimeSlot]:
+    """List all slots on a date. See StorageBackend.list_all_slots."""
+    return get_backend().list_all_slots(therapist_id, search_date)
+
+
+def list_slots_in_range(therapist_id: str, start_time: datetime, end_time: datetime, status: Optional[str] = None) -> List[TimeSlot]:
+    """List the slots starting within a time range. See StorageBackend.list_slots_in_range."""
+    return get_backend().list_slots_in_range(therapist_id, start_time, end_time, status)
+
+
+def find_earliest_available(therapist_ids: List[str], start_time: datetime, end_time: datetime, limit: int) -> List[Tuple[str, TimeSlot]]:
+    """Find the first free slots across several therapists. See StorageBackend.find_earliest_available."""
+    return get_backend().find_earliest_available(therapist_ids, start_time, end_time, limit)
+
+
+def iter_slots(therapist_id: str, first_day: date, last_day: date) -> Iterator[TimeSlot]:
+    """Stream every slot of a therapist within a range of days. See StorageBackend.iter_slots."""
+    return get_backend().iter_slots(therapist_id, first_day, last_day)
+
+
+def list_therapist_ids() -> List[str]:
+    """List every therapist with stored slots, counters or rules. See StorageBackend.list_therapist_ids."""
+    return get_backend().list_therapist_ids()
+
+
+def get_day_stats(therapist_id: str, search_date: date) -> Dict[str, int]:
+    """Get the slot counters of a therapist on a date. See StorageBackend.get_day_stats."""
+    return get_backend().get_day_stats(therapist_id, search_date)
+
+
+def repair_stats(therapist_ids: Optional[List[str]] = None, first_day: Optional[date] = None, last_day: Optional[date] = None) -> Dict[str, int]:
+    """Recompute the slot counters from the stored slots. See StorageBackend.repair_stats."""
+    return get_backend().repair_stats(therapist_ids, first_day, last_day)
+
+
+def archive_slots(therapist_ids: Optional[List[str]] = None, before: Optional[date] = None) -> Dict[str, int]:
+    """Move past slots into compressed monthly archives. See StorageBackend.archive_slots."""
+    return get_backend().archive_slots(therapist_ids, before)
+
+
+def book_slot(therapist_id: str, slot_time: datetime) -> BookingResult:
+    """Book a slot. See StorageBackend.book_slot."""
+    return get_backend().book_slot(therapist_id, slot_time)
+
+
+def cancel_booking(therapist_id: str, slot_time: datetime) -> BookingResult:
+    """Cancel a booked slot. See StorageBackend.cancel_booking."""
+    return get_backend().cancel_booking(therapist_id, slot_time)
+
+
+def book_slots(items: List[Tuple[str, datetime]], all_or_nothing: bool = False) -> List[BookingResult]:
+    """Book several slots. See StorageBackend.book_slots."""
+    return get_backend().book_slots(items, all_or_nothing)
+
+
+def cancel_bookings(items: List[Tuple[str, datetime]], all_or_nothing: bool = False) -> List[BookingResult]:
+    """Cancel several booked slots. See StorageBackend.cancel_bookings."""
+    return get_backend().cancel_bookings(items, all_or_nothing)
+
+
+def subscribe_slot_events(therapist_id: str) -> SlotSubscription:
+    """Subscribe to the slot changes of a therapist. See SlotEvents.subscribe."""
+    return get_backend().events.subscribe(therapist_id)
+
+
+def close_slot_event_streams() -> int:
+    """End every open subscription to slot events, e.g. on shutdown. See SlotEvents.close_all."""
+    backend = _backend
+    return backend.events.close_all() if backend is not None else 0
+
+
+def get_cache_stats() -> Dict[str, Any]:
+    """Return the hit, miss and eviction counters of the active backend's slot cache."""
+    return get_backend().cache.stats()
+
 
 # Export the public API
 __all__ = [
     'TimeSlot',
+    'BookingResult',
+    'AvailabilityRule',
+    'StorageBackend',
+    'LockTimeout',
+    'SlotEvent',
+    'SlotSubscription',
+    'TooManySubscribers',
+    'BACKENDS',
+    'create_backend',
+    'get_backend',
+    'set_backend',
+    'close_backend',
     'create_free_slot',
     'create_availability_range',
+    'apply_availability_template',
+    'create_availability_rule',
+    'list_availability_rules',
+    'delete_availability_rule',
     'list_available_slots',
     'list_all_slots',
+    'list_slots_in_range',
+    'find_earliest_available',
+    'iter_slots',
+    'list_therapist_ids',
+    'get_day_stats',
+    'repair_stats',
+    'archive_slots',
     'book_slot',
-    'cancel_booking'
+    'cancel_booking',
+    'book_slots',
+    'cancel_bookings',
+    'subscribe_slot_events',
+    'close_slot_event_streams',
+    'get_cache_stats'
 ]
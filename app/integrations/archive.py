@@ -0,0 +1,47 @@
+"""
+Compressed monthly archives of past slots.
+"""
+from datetime import date
+from typing import Iterable, List
+import json
+import zlib
+
+from app.integrations.base import TimeSlot
+
+# zlib level used for archives, which are written once and read rarely
+COMPRESSION_LEVEL = 9
+
+
+def month_key(month: date) -> str:
+    """Return the key of a monthly archive (YYYY-MM)."""
+    return month.strftime("%Y-%m")
+
+
+def encode_slots(slots: Iterable[TimeSlot]) -> bytes:
+    """
+    Compress slots into the archive format.
+    
+    Slots are written as a JSON list of [start, end, status] integer triples,
+    the compact form TimeSlot keeps, then compressed with zlib.
+    
+    Args:
+        slots: Slots to archive, ordered by start time
+    
+    Returns:
+        bytes: Compressed archive
+    """
+    triples = [[slot.start, slot.end, slot.status_code] for slot in slots]
+    return zlib.compress(json.dumps(triples, separators=(",", ":")).encode("ascii"), COMPRESSION_LEVEL)
+
+
+def decode_slots(data: bytes) -> List[TimeSlot]:
+    """
+    Decompress an archive written by encode_slots().
+    
+    Args:
+        data: Compressed archive
+    
+    Returns:
+        List[TimeSlot]: Archived slots ordered by start time
+    """
+    return [TimeSlot.from_epoch(start, end, status_code) for start, end, status_code in json.loads(zlib.decompress(data))]
@@ -0,0 +1,1581 @@
+"""
+Storage backend interface shared by all integration modules.
+"""
+from abc import ABC, abstractmethod
+from contextlib import contextmanager, ExitStack
+from datetime import datetime, date, time, timedelta
+from enum import Enum
+from itertools import islice
+from time import perf_counter
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
+import heapq
+import logging
+import uuid
+
+from app.config import active_config
+from app.integrations.cache import SlotCache
+from app.integrations.events import SlotEvents
+from app.integrations.locks import TherapistLocks
+from app.integrations.slot_index import SlotIndex
+from app.utils.date_utils import to_epoch, epoch_to_datetime, epoch_to_date, epoch_to_iso, date_to_epoch, month_start
+from app.utils.metrics import REGISTRY, SLOTS_PARSED, BYTES_BUCKETS, BoundedLabel
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Status byte of the compact slot representation
+STATUS_NAMES = ("free", "busy")
+STATUS_CODES = {name: code for code, name in enumerate(STATUS_NAMES)}
+
+# Counters kept for every therapist and day, so stats never need the slots
+STATS_FIELDS = ("free", "busy", "total")
+
+# Metrics of the slot read and write primitives, per backend, operation and therapist
+BACKEND_CALL_SECONDS = REGISTRY.histogram(
+    "backend_call_duration_seconds",
+    "Duration of storage backend slot reads and writes",
+    ("backend", "operation", "therapist_id")
+)
+BACKEND_PAYLOAD_BYTES = REGISTRY.histogram(
+    "backend_payload_bytes",
+    "Estimated size of the slots read or written by storage backend calls",
+    ("backend", "operation", "therapist_id"),
+    buckets=BYTES_BUCKETS
+)
+BACKEND_CALL_ERRORS = REGISTRY.counter(
+    "backend_call_errors_total",
+    "Storage backend slot reads and writes that raised an error",
+    ("backend", "operation")
+)
+_therapist_label = BoundedLabel(active_config.METRICS_MAX_THERAPISTS)
+
+
+class _BatchRejected(Exception):
+    """Raised inside a write scope to roll back an all-or-nothing batch."""
+
+
+class BookingResult(str, Enum):
+    """Outcome of a booking or a cancellation."""
+    
+    SUCCESS = "success"
+    NOT_FOUND = "not_found"  # No slot starts at the requested time
+    CONFLICT = "conflict"  # The slot is not in the expected state, e.g. already booked
+    ABORTED = "aborted"  # Not applied because another item of an all-or-nothing batch failed
+    
+    def __bool__(self) -> bool:
+        """Only a successful outcome is truthy, so callers can keep testing `if result:`."""
+        return self is BookingResult.SUCCESS
+
+
+class TimeSlot:
+    """
+    Represents a time slot for a therapist appointment.
+    
+    Slots are kept compact: start and end are epoch seconds and the status is
+    a one-byte code. The datetime and string views are computed on access, so
+    only slots that reach the API boundary pay for the conversion.
+    """
+    
+    __slots__ = ("start", "end", "status_code")
+    
+    def __init__(self, start_time: datetime, end_time: datetime, status: str = "free"):
+        """
+        Initialize a new TimeSlot.
+        
+        Args:
+            start_time: Start time of the appointment slot
+            end_time: End time of the appointment slot
+            status: Status of the slot - 'free' or 'busy'
+        """
+        self.start = to_epoch(start_time)
+        self.end = to_epoch(end_time)
+        self.status_code = STATUS_CODES[status]
+    
+    @classmethod
+    def from_epoch(cls, start: int, end: int, status_code: int = 0) -> 'TimeSlot':
+        """Create a TimeSlot directly from its compact fields, without any datetime."""
+        slot = cls.__new__(cls)
+        slot.start = start
+        slot.end = end
+        slot.status_code = status_code
+        return slot
+    
+    @property
+    def start_time(self) -> datetime:
+        """Start time of the slot."""
+        return epoch_to_datetime(self.start)
+    
+    @property
+    def end_time(self) -> datetime:
+        """End time of the slot."""
+        return epoch_to_datetime(self.end)
+    
+    @property
+    def start_date(self) -> date:
+        """Day the slot starts on."""
+        return epoch_to_date(self.start)
+    
+    @property
+    def status(self) -> str:
+        """Status of the slot - 'free' or 'busy'."""
+        return STATUS_NAMES[self.status_code]
+    
+    @status.setter
+    def status(self, value: str) -> None:
+        self.status_code = STATUS_CODES[value]
+    
+    def __repr__(self) -> str:
+        return f"TimeSlot({self.start_time.isoformat()}, {self.end_time.isoformat()}, {self.status})"
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert the TimeSlot to a dictionary of ISO strings."""
+        return {
+            "start_time": self.start_time.isoformat(),
+            "end_time": self.end_time.isoformat(),
+            "status": self.status
+        }
+    
+    def to_wire(self) -> Dict[str, int]:
+        """Convert the TimeSlot to its compact storage format of integers."""
+        return {
+            "start": self.start,
+            "end": self.end,
+            "status": self.status_code
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'TimeSlot':
+        """Create a TimeSlot from either the compact storage format or a dictionary of ISO strings."""
+        if "start" in data:
+            return cls.from_epoch(int(data["start"]), int(data["end"]), int(data["status"]))
+        return cls(
+            start_time=datetime.fromisoformat(data["start_time"]),
+            end_time=datetime.fromisoformat(data["end_time"]),
+            status=data["status"]
+        )
+
+
+def count_slots_by_day(slots: Iterable[TimeSlot]) -> Dict[date, Dict[str, int]]:
+    """
+    Count slots by the day they start on.
+    
+    Args:
+        slots: Slots to count
+    
+    Returns:
+        Dict mapping each day with slots to its free, busy and total counts
+    """
+    counts: Dict[date, Dict[str, int]] = {}
+    for slot in slots:
+        day_counts = counts.setdefault(slot.start_date, dict.fromkeys(STATS_FIELDS, 0))
+        day_counts[slot.status] += 1
+        day_counts["total"] += 1
+    return counts
+
+
+def _seconds_of_day(value: time) -> int:
+    """Return the number of seconds from midnight to a time of day."""
+    return value.hour * 3600 + value.minute * 60 + value.second
+
+
+class AvailabilityRule:
+    """
+    Weekly recurring availability of a therapist.
+    
+    A rule is stored instead of the free slots it stands for. Its slots are
+    generated only for the days being read, so the storage and read cost of a
+    therapist depends on the number of rules, not on the weeks they cover.
+    Only the slots that get booked are stored as concrete records.
+    """
+    
+    def __init__(
+        self,
+        weekdays: Iterable[int],
+        start_time: time,
+        end_time: time,
+        slot_duration_minutes: int = 60,
+        valid_from: Optional[date] = None,
+        valid_to: Optional[date] = None,
+        exceptions: Iterable[date] = (),
+        rule_id: Optional[str] = None
+    ):
+        """
+        Initialize a new AvailabilityRule.
+        
+        Args:
+            weekdays: Days of the week the rule applies on (Monday is 0)
+            start_time: Time of day the availability starts
+            end_time: Time of day the availability ends
+            slot_duration_minutes: Duration of each slot in minutes (default is 60)
+            valid_from: First day the rule applies on (default: today)
+            valid_to: Last day the rule applies on (default: no end)
+            exceptions: Days the rule does not apply on, e.g. holidays
+            rule_id: Unique identifier of the rule (default: a new one)
+        
+        Raises:
+            ValueError: If the rule cannot generate any slot
+        """
+        self.rule_id = rule_id or uuid.uuid4().hex
+        self.weekdays = frozenset(weekdays)
+        self.start_time = start_time
+        self.end_time = end_time
+        self.slot_duration_minutes = slot_duration_minutes
+        self.valid_from = valid_from or date.today()
+        self.valid_to = valid_to
+        self.exceptions = frozenset(exceptions)
+        
+        if not self.weekdays:
+            raise ValueError("A rule needs at least one weekday")
+        if start_time >= end_time:
+            raise ValueError("Start time must be before end time")
+        if slot_duration_minutes <= 0:
+            raise ValueError(f"Invalid slot duration: {slot_duration_minutes} minutes")
+        if valid_to is not None and valid_to < self.valid_from:
+            raise ValueError("valid_to must not be before valid_from")
+    
+    def __repr__(self) -> str:
+        return f"AvailabilityRule({self.rule_id}, {sorted(self.weekdays)}, {self.start_time}-{self.end_time})"
+    
+    def applies_on(self, day: date) -> bool:
+        """Check whether the rule generates slots on a day."""
+        return (
+            self.valid_from <= day
+            and (self.valid_to is None or day <= self.valid_to)
+            and day.weekday() in self.weekdays
+            and day not in self.exceptions
+        )
+    
+    def expand(self, first_day: date, last_day: date) -> List[TimeSlot]:
+        """
+        Generate the free slots of the rule within a range of days.
+        
+        Args:
+            first_day: First day of the range (inclusive)
+            last_day: Last day of the range (inclusive)
+        
+        Returns:
+            List[TimeSlot]: Free slots ordered by start time
+        """
+        first_day = max(first_day, self.valid_from)
+        if self.valid_to is not None:
+            last_day = min(last_day, self.valid_to)
+        
+        duration = self.slot_duration_minutes * 60
+        day_start = _seconds_of_day(self.start_time)
+        day_end = _seconds_of_day(self.end_time)
+        
+        slots = []
+        for offset in range((last_day - first_day).days + 1):
+            day = first_day + timedelta(days=offset)
+            if self.applies_on(day):
+                midnight = date_to_epoch(day)
+                slots.extend(
+                    TimeSlot.from_epoch(start, start + duration)
+                    for start in range(midnight + day_start, midnight + day_end - duration + 1, duration)
+                )
+        return slots
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert the rule to a dictionary of ISO strings, used both for storage and the API."""
+        return {
+            "rule_id": self.rule_id,
+            "weekdays": sorted(self.weekdays),
+            "start_time": self.start_time.isoformat(),
+            "end_time": self.end_time.isoformat(),
+            "slot_duration_minutes": self.slot_duration_minutes,
+            "valid_from": self.valid_from.isoformat(),
+            "valid_to": self.valid_to.isoformat() if self.valid_to else None,
+            "exceptions": sorted(day.isoformat() for day in self.exceptions)
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'AvailabilityRule':
+        """Create a rule from its dictionary form. Missing optional fields take their defaults."""
+        return cls(
+            weekdays=[int(weekday) for weekday in data["weekdays"]],
+            start_time=time.fromisoformat(data["start_time"]),
+            end_time=time.fromisoformat(data["end_time"]),
+            slot_duration_minutes=int(data.get("slot_duration_minutes", 60)),
+            valid_from=date.fromisoformat(data["valid_from"]),
+            valid_to=date.fromisoformat(data["valid_to"]) if data.get("valid_to") else None,
+            exceptions=[date.fromisoformat(day) for day in data.get("exceptions") or []],
+            rule_id=data["rule_id"]
+        )
+
+
+def expand_rules(rules: Iterable[AvailabilityRule], first_day: date, last_day: date, stored_slots: List[TimeSlot]) -> List[TimeSlot]:
+    """
+    Generate the free slots of several rules within a range of days.
+    
+    Stored slots take precedence: a generated slot overlapping a stored one,
+    such as the booking it turned into, is left out, and so is a generated
+    slot overlapping an earlier one of another rule.
+    
+    Args:
+        rules: Rules of one therapist
+        first_day: First day of the range (inclusive)
+        last_day: Last day of the range (inclusive)
+        stored_slots: Stored slots of the therapist over the same days
+    
+    Returns:
+        List[TimeSlot]: Generated slots ordered by start time, stored slots excluded
+    """
+    candidates: List[TimeSlot] = []
+    for slot in heapq.merge(*(rule.expand(first_day, last_day) for rule in rules), key=lambda slot: slot.start):
+        if not candidates or slot.start >= candidates[-1].end:
+            candidates.append(slot)
+    
+    generated, _ = SlotIndex(stored_slots).merge(candidates)
+    return generated
+
+
+def _merge_archived(archived: List[TimeSlot], slots: List[TimeSlot]) -> List[TimeSlot]:
+    """Merge archived slots with slots of the working set, which win on the same start time."""
+    starts = {slot.start for slot in slots}
+    return list(heapq.merge((slot for slot in archived if slot.start not in starts), slots, key=lambda slot: slot.start))
+
+
+class StorageBackend(ABC):
+    """
+    Interface of a slot storage backend.
+    
+    The public methods implement the scheduling rules (overlap checks, range
+    generation, status transitions) once for every backend. A backend only
+    provides the storage primitives below them, and may override a public
+    method when its store can answer it more directly.
+    """
+    
+    # Name used to select the backend in app/config.py
+    name = "base"
+    
+    # Estimated size of one slot as stored, for the payload metrics
+    # (the compact JSON of a slot node under its time key)
+    slot_payload_bytes = 60
+    
+    # Whether slot events come from a change feed of the database
+    # (_watch_changes) rather than from the writes of this process
+    watches_changes = False
+    
+    # Whether one transaction (_transaction_scope) can span the writes of
+    # several therapists, so all-or-nothing batches commit or roll back as one
+    atomic_batches = False
+    
+    def __init__(self):
+        """Initialize the state shared by every backend."""
+        self.locks = TherapistLocks(
+            self.name,
+            stripes=active_config.WRITE_LOCK_STRIPES,
+            directory=active_config.WRITE_LOCK_DIR or None,
+            timeout=active_config.WRITE_LOCK_TIMEOUT_SECONDS
+        )
+        self._init_process_state()
+    
+    def _init_process_state(self) -> None:
+        """Create the slot cache and the event subscriptions, which belong to one process."""
+        self.cache = SlotCache(
+            ttl_seconds=active_config.SLOT_CACHE_TTL_SECONDS,
+            max_entries=active_config.SLOT_CACHE_MAX_ENTRIES
+        )
+        self.events = SlotEvents(
+            max_subscribers=active_config.EVENTS_MAX_SUBSCRIBERS,
+            max_queued=active_config.EVENTS_QUEUE_SIZE,
+            start_feed=self._watch_changes if self.watches_changes else None,
+            stop_feed=self._unwatch_changes if self.watches_changes else None
+        )
+    
+    def create_free_slot(self, therapist_id: str, start_time: datetime, end_time: datetime) -> bool:
+        """
+        Create a free slot for a therapist in the calendar.
+        
+        Args:
+            therapist_id: Unique identifier for the therapist
+            start_time: Start time of the slot
+            end_time: End time of the slot
+        
+        Returns:
+            bool: True if slot was created successfully, False otherwise
+        """
+        with self._write_scope(therapist_id):
+            # Index existing slots around the new one (slots never span more than a day)
+            index = SlotIndex(self._get_slots_with_rules(therapist_id, start_time.date() - timedelta(days=1), end_time.date()))
+            
+            # Check for overlapping slots
+            if index.overlaps(to_epoch(start_time), to_epoch(end_time)):
+                logger.info(f"Slot creation failed for therapist {therapist_id}: overlapping slot found")
+                return False  # Overlapping slot
+            
+            # Create and save the new slot along with its day's counters
+            new_slot = TimeSlot(start_time=start_time, end_time=end_time)
+            self._store_therapist_slots(therapist_id, [new_slot], count_slots_by_day([new_slot]))
+            self.cache.invalidate(therapist_id, [start_time.date()])
+        
+        self._publish(therapist_id, "created", [new_slot])
+        logger.info(f"Slot created successfully for therapist {therapist_id}")
+        return True
+    
+    def create_availability_range(self, therapist_id: str, start_time: datetime, end_time: datetime, slot_duration_minutes: int = 60) -> bool:
+        """
+        Create multiple free slots within a time range for a therapist.
+        
+        Args:
+            therapist_id: Unique identifier for the therapist
+            start_time: Start time of the availability range
+            end_time: End time of the availability range
+            slot_duration_minutes: Duration of each slot in minutes (default is 60)
+        
+        Returns:
+            bool: True if at least one slot was created, False otherwise
+        """
+        logger.info(f"Creating availability range for therapist {therapist_id} from {start_time} to {end_time}")
+        
+        if slot_duration_minutes <= 0:
+            logger.error(f"Invalid slot duration: {slot_duration_minutes} minutes")
+            return False
+        
+        duration = slot_duration_minutes * 60
+        
+        # Generate complete slots for the entire range
+        candidates = [
+            TimeSlot.from_epoch(slot_start, slot_start + duration)
+            for slot_start in range(to_epoch(start_time), to_epoch(end_time) - duration + 1, duration)
+        ]
+        
+        with self._write_scope(therapist_id):
+            # Index existing slots covering the range and merge the candidates in one sweep
+            index = SlotIndex(self._get_slots_with_rules(therapist_id, start_time.date() - timedelta(days=1), end_time.date()))
+            new_slots, skipped_slots = index.merge(candidates)
+            
+            for slot in skipped_slots:
+                logger.warning(f"Skipping overlapping slot: {slot.start_time} - {slot.end_time}")
+            
+            # If slots were created, save them and their counters in a single write
+            if new_slots:
+                self._store_therapist_slots(therapist_id, new_slots, count_slots_by_day(new_slots))
+                self.cache.invalidate(therapist_id, {slot.start_date for slot in new_slots})
+        
+        if new_slots:
+            self._publish(therapist_id, "created", new_slots)
+            logger.info(f"Created {len(new_slots)} slots for therapist {therapist_id}")
+            return True
+        
+        logger.warning(f"No slots created for therapist {therapist_id}")
+        return False
+    
+    def apply_availability_template(self, therapist_ids: List[str], first_day: date, last_day: date, weekdays: Iterable[int], start_time: time, end_time: time, slot_duration_minutes: int = 60) -> Dict[str, int]:
+        """
+        Create the same weekly availability for several therapists in a single write.
+        
+        Overlaps are resolved per therapist against one read of its slots in
+        the date range; slots overlapping existing ones are skipped. All new
+        slots of all therapists are then committed with _save_slots_bulk().
+        
+        Args:
+            therapist_ids: Unique identifiers of the therapists
+            first_day: First day of the date range (inclusive)
+            last_day: Last day of the date range (inclusive)
+            weekdays: Days of the week to create slots on (Monday is 0)
+            start_time: Time of day the availability starts
+            end_time: Time of day the availability ends
+            slot_duration_minutes: Duration of each slot in minutes (default is 60)
+        
+        Returns:
+            Dict mapping each therapist to the number of slots created
+        """
+        if slot_duration_minutes <= 0:
+            logger.error(f"Invalid slot duration: {slot_duration_minutes} minutes")
+            return {therapist_id: 0 for therapist_id in therapist_ids}
+        
+        duration = slot_duration_minutes * 60
+        day_start = _seconds_of_day(start_time)
+        day_end = _seconds_of_day(end_time)
+        weekdays = set(weekdays)
+        
+        # Slot start times of the template over the whole range
+        starts = []
+        for offset in range((last_day - first_day).days + 1):
+            day = first_day + timedelta(days=offset)
+            if day.weekday() in weekdays:
+                midnight = date_to_epoch(day)
+                starts.extend(range(midnight + day_start, midnight + day_end - duration + 1, duration))
+        
+        therapist_ids = list(dict.fromkeys(therapist_ids))
+        results = self.insert_slots({
+            therapist_id: [TimeSlot.from_epoch(start, start + duration) for start in starts]
+            for therapist_id in therapist_ids
+        })
+        
+        created = {therapist_id: len(results[therapist_id][0]) for therapist_id in therapist_ids}
+        logger.info(f"Applied availability template: {sum(created.values())} slots for {len(therapist_ids)} therapists")
+        return created
+    
+    def insert_slots(self, slots_by_therapist: Dict[str, List[TimeSlot]]) -> Dict[str, Tuple[List[TimeSlot], List[TimeSlot]]]:
+        """
+        Insert new slots for several therapists in a single write, skipping overlaps.
+        
+        Each therapist's slots are checked against one read of its existing
+        slots over their span, rule slots included, and against each other. All accepted slots are
+        then committed with _save_slots_bulk().
+        
+        Args:
+            slots_by_therapist: New slots of each therapist, in any order and with any status
+        
+        Returns:
+            Dict mapping each therapist to (inserted slots, skipped overlapping slots)
+        """
+        results: Dict[str, Tuple[List[TimeSlot], List[TimeSlot]]] = {}
+        new_slots: Dict[str, List[TimeSlot]] = {}
+        
+        # Locks and scopes are entered in a fixed order so concurrent bulk writes cannot deadlock
+        with ExitStack() as stack:
+            stack.enter_context(self.locks.hold(slots_by_therapist))
+            for therapist_id in sorted(slots_by_therapist):
+                stack.enter_context(self._write_scope(therapist_id))
+            
+            for therapist_id, slots in slots_by_therapist.items():
+                if not slots:
+                    results[therapist_id] = ([], [])
+                    continue
+                
+                # Drop slots overlapping an earlier one of the same batch, as merge() requires
+                candidates, skipped = [], []
+                for slot in sorted(slots, key=lambda slot: slot.start):
+                    (skipped if candidates and slot.start < candidates[-1].end else candidates).append(slot)
+                
+                first_day = epoch_to_date(candidates[0].start) - timedelta(days=1)
+                last_day = epoch_to_date(max(slot.end for slot in candidates))
+                index = SlotIndex(self._get_slots_with_rules(therapist_id, first_day, last_day))
+                inserted, overlapping = index.merge(candidates)
+                skipped.extend(overlapping)
+                
+                if skipped:
+                    logger.info(f"Skipping {len(skipped)} overlapping slots for therapist {therapist_id}")
+                if inserted:
+                    new_slots[therapist_id] = inserted
+                results[therapist_id] = (inserted, skipped)
+            
+            if new_slots:
+                self._save_slots_bulk(new_slots)
+        
+        for therapist_id, slots in new_slots.items():
+            self.cache.invalidate(therapist_id, {slot.start_date for slot in slots})
+            self._publish(therapist_id, "created", slots)
+        
+        return results
+    
+    def list_available_slots(self, therapist_id: str, search_date: date) -> List[TimeSlot]:
+        """
+        List available (free) slots for a therapist on a specific date.
+        
+        Args:
+            therapist_id: Unique identifier for the therapist
+            search_date: Date to search for available slots
+        
+        Returns:
+            List[TimeSlot]: List of available time slots
+        """
+        slots = self._read_slots(therapist_id, search_date, search_date)
+        return [slot for slot in slots if slot.status_code == STATUS_CODES["free"]]
+    
+    def list_all_slots(self, therapist_id: str, search_date: date) -> List[TimeSlot]:
+        """
+        List all slots (both free and busy) for a therapist on a specific date.
+        
+        Args:
+            therapist_id: Unique identifier for the therapist
+            search_date: Date to search for slots
+        
+        Returns:
+            List[TimeSlot]: List of all time slots
+        """
+        return self._read_slots(therapist_id, search_date, search_date)
+    
+    def list_slots_in_range(self, therapist_id: str, start_time: datetime, end_time: datetime, status: Optional[str] = None) -> List[TimeSlot]:
+        """
+        List the slots of a therapist starting within a time range.
+        
+        The days covered by the range are read at once, so a week or a month
+        costs a single backend read, and then sliced to the exact range.
+        
+        Args:
+            therapist_id: Unique identifier for the therapist
+            start_time: Start of the range (inclusive)
+            end_time: End of the range (exclusive)
+            status: Only list slots with this status - 'free' or 'busy' (default: all)
+        
+        Returns:
+            List[TimeSlot]: Slots ordered by start time
+        
+        Raises:
+            ValueError: If the status is not a known slot status
+        """
+        if status is not None and status not in STATUS_CODES:
+            raise ValueError(f"Unknown slot status '{status}'. Choose one of: {', '.join(STATUS_NAMES)}")
+        
+        start, end = to_epoch(start_time), to_epoch(end_time)
+        if end <= start:
+            return []
+        
+        # The last day read is the one holding the last second of the range
+        slots = SlotIndex(self._read_slots(therapist_id, epoch_to_date(start), epoch_to_date(end - 1))).between(start, end)
+        if status is not None:
+            slots = [slot for slot in slots if slot.status_code == STATUS_CODES[status]]
+        return slots
+    
+    def iter_free_slots(self, therapist_id: str, start_time: datetime, end_time: datetime) -> Iterator[TimeSlot]:
+        """
+        Lazily yield the free slots of a therapist starting within a time range.
+        
+        Days are read in chunks that double in size, starting with one day, so
+        a consumer that stops early reads little while a sparse calendar still
+        takes few reads.
+        
+        Args:
+            therapist_id: Unique identifier for the therapist
+            start_time: Start of the range (inclusive)
+            end_time: End of the range (exclusive)
+        
+        Yields:
+            TimeSlot: Free slots ordered by start time
+        """
+        start, end = to_epoch(start_time), to_epoch(end_time)
+        if end <= start:
+            return
+        
+        first_day, last_day = epoch_to_date(start), epoch_to_date(end - 1)
+        chunk_days = 1
+        while first_day <= last_day:
+            chunk_end = min(first_day + timedelta(days=chunk_days - 1), last_day)
+            for slot in self._read_slots(therapist_id, first_day, chunk_end):
+                if start <= slot.start < end and slot.status_code == STATUS_CODES["free"]:
+                    yield slot
+            first_day = chunk_end + timedelta(days=1)
+            chunk_days *= 2
+    
+    def find_earliest_available(self, therapist_ids: List[str], start_time: datetime, end_time: datetime, limit: int) -> List[Tuple[str, TimeSlot]]:
+        """
+        Find the first free slots across several therapists, in time order.
+        
+        The free slots of each therapist come out sorted, so they are combined
+        with a k-way merge that stops reading as soon as the limit is reached.
+        
+        Args:
+            therapist_ids: Unique identifiers of the therapists
+            start_time: Start of the search window (inclusive)
+            end_time: End of the search window (exclusive)
+            limit: Maximum number of slots to return
+        
+        Returns:
+            List of (therapist_id, slot) ordered by start time, ties in the order of therapist_ids
+        """
+        def tagged(therapist_id: str) -> Iterator[Tuple[str, TimeSlot]]:
+            for slot in self.iter_free_slots(therapist_id, start_time, end_time):
+                yield therapist_id, slot
+        
+        streams = [tagged(therapist_id) for therapist_id in dict.fromkeys(therapist_ids)]
+        merged = heapq.merge(*streams, key=lambda entry: entry[1].start)
+        return list(islice(merged, max(limit, 0)))
+    
+    def iter_slots(self, therapist_id: str, first_day: date, last_day: date, chunk_days: int = 31) -> Iterator[TimeSlot]:
+        """
+        Stream every slot of a therapist within a range of days, for exports.
+        
+        The range is read from the backend in chunks of days, bypassing the
+        cache so a long export neither fills nor evicts it.
+        
+        Args:
+            therapist_id: Unique identifier for the therapist
+            first_day: First day of the range (inclusive)
+            last_day: Last day of the range (inclusive)
+            chunk_days: Number of days read at once
+        
+        Yields:
+            TimeSlot: Slots ordered by start time
+        """
+        while first_day <= last_day:
+            chunk_end = min(first_day + timedelta(days=chunk_days - 1), last_day)
+            yield from self._get_slots_with_rules(therapist_id, first_day, chunk_end)
+            first_day = chunk_end + timedelta(days=1)
+    
+    def create_availability_rule(
+        self,
+        therapist_id: str,
+        weekdays: Iterable[int],
+        start_time: time,
+        end_time: time,
+        slot_duration_minutes: int = 60,
+        valid_from: Optional[date] = None,
+        valid_to: Optional[date] = None,
+        exceptions: Iterable[date] = ()
+    ) -> AvailabilityRule:
+        """
+        Create a recurring weekly availability rule for a therapist.
+        
+        Nothing but the rule is written; its free slots appear in every listing
+        of the days it applies on. A rule slot overlapping a stored slot, or an
+        earlier slot of another rule, is left out.
+        
+        Args:
+            therapist_id: Unique identifier for the therapist
+            weekdays: Days of the week the rule applies on (Monday is 0)
+            start_time: Time of day the availability starts
+            end_time: Time of day the availability ends
+            slot_duration_minutes: Duration of each slot in minutes (default is 60)
+            valid_from: First day the rule applies on (default: today)
+            valid_to: Last day the rule applies on (default: no end)
+            exceptions: Days the rule does not apply on, e.g. holidays
+        
+        Returns:
+            AvailabilityRule: The new rule
+        
+        Raises:
+            ValueError: If the rule cannot generate any slot
+        """
+        rule = AvailabilityRule(weekdays, start_time, end_time, slot_duration_minutes, valid_from, valid_to, exceptions)
+        with self._write_scope(therapist_id):
+            self._save_rule(therapist_id, rule)
+        self.cache.invalidate(therapist_id)
+        self._publish(therapist_id, "resync")
+        
+        logger.info(f"Availability rule {rule.rule_id} created for therapist {therapist_id}")
+        return rule
+    
+    def list_availability_rules(self, therapist_id: str) -> List[AvailabilityRule]:
+        """
+        List the availability rules of a therapist.
+        
+        Args:
+            therapist_id: Unique identifier for the therapist
+        
+        Returns:
+            List[AvailabilityRule]: Rules of the therapist
+        """
+        return self._get_rules(therapist_id)
+    
+    def delete_availability_rule(self, therapist_id: str, rule_id: str) -> bool:
+        """
+        Delete an availability rule of a therapist.
+        
+        Its free slots disappear; bookings made on them are stored slots and stay.
+        
+        Args:
+            therapist_id: Unique identifier for the therapist
+            rule_id: Unique identifier of the rule
+        
+        Returns:
+            bool: True if the rule was deleted, False if there is no such rule
+        """
+        with self._write_scope(therapist_id):
+            deleted = self._delete_rule(therapist_id, rule_id)
+        self.cache.invalidate(therapist_id)
+        
+        if deleted:
+            self._publish(therapist_id, "resync")
+            logger.info(f"Availability rule {rule_id} deleted for therapist {therapist_id}")
+        else:
+            logger.info(f"Availability rule {rule_id} not found for therapist {therapist_id}")
+        return deleted
+    
+    def list_therapist_ids(self) -> List[str]:
+        """
+        List every therapist with stored slots, counters or rules.
+        
+        Returns:
+            List of therapist identifiers
+        """
+        return self._list_therapist_ids()
+    
+    def get_day_stats(self, therapist_id: str, search_date: date) -> Dict[str, int]:
+        """
+        Get the free, busy and total slot counts of a therapist on a specific date.
+        
+        The counters are maintained by every write, so this reads a single small
+        record instead of the slots. Days written before the counters existed
+        have none and are counted from their slots until repair_stats() is run.
+        The counters only cover stored slots, so days an availability rule
+        applies on are counted from their slots as well.
+        
+        Args:
+            therapist_id: Unique identifier for the therapist
+            search_date: Date to get the counts for
+        
+        Returns:
+            Dict with free, busy and total counts
+        """
+        try:
+            if any(rule.applies_on(search_date) for rule in self._get_rules_cached(therapist_id)):
+                stats = None
+            else:
+                stats = self._get_day_stats(therapist_id, search_date)
+        except Exception as e:
+            logger.error(f"Error getting stats for therapist {therapist_id}: {e}")
+            stats = None
+        
+        if stats is None:
+            slots = self._read_slots(therapist_id, search_date, search_date)
+            stats = count_slots_by_day(slots).get(search_date, dict.fromkeys(STATS_FIELDS, 0))
+        
+        return stats
+    
+    def repair_stats(self, therapist_ids: Optional[List[str]] = None, first_day: Optional[date] = None, last_day: Optional[date] = None) -> Dict[str, int]:
+        """
+        Recompute the per-day counters from the stored slots.
+        
+        Counters of days without slots are removed. Slots of availability
+        rules are not stored and never counted.
+        
+        Args:
+            therapist_ids: Therapists to repair, or None for every therapist
+            first_day: First day to repair (inclusive), or None for no lower bound
+            last_day: Last day to repair (inclusive), or None for no upper bound
+        
+        Returns:
+            Dict mapping each repaired therapist to the number of days with slots
+        """
+        first_day = first_day or date.min
+        last_day = last_day or date.max - timedelta(days=1)
+        
+        repaired = {}
+        for therapist_id in (self._list_therapist_ids() if therapist_ids is None else therapist_ids):
+            with self._write_scope(therapist_id):
+                counts = count_slots_by_day(self._get_stored_slots(therapist_id, first_day, last_day))
+                self._replace_day_stats(therapist_id, first_day, last_day, counts)
+            repaired[therapist_id] = len(counts)
+            logger.info(f"Repaired stats of {len(counts)} days for therapist {therapist_id}")
+        
+        return repaired
+    
+    def archive_slots(self, therapist_ids: Optional[List[str]] = None, before: Optional[date] = None) -> Dict[str, int]:
+        """
+        Move past slots out of the working set into compressed monthly archives.
+        
+        Every whole month before the one containing the cutoff day is
+        archived; a month already archived is merged with the slots added to
+        it since. Archived slots stay visible to every read of their days and
+        their counters are kept, but they can no longer be booked or cancelled.
+        
+        Reads only look for archives before the current month, so a later
+        cutoff is lowered to the first day of the current month.
+        
+        Args:
+            therapist_ids: Therapists to archive, or None for every therapist
+            before: Cutoff day (default: RETENTION_DAYS days ago)
+        
+        Returns:
+            Dict mapping each therapist with archived slots to the number of slots moved
+        
+        Raises:
+            ValueError: If no cutoff is given and RETENTION_DAYS is less than 1
+        """
+        if before is None:
+            if active_config.RETENTION_DAYS < 1:
+                raise ValueError(f"RETENTION_DAYS must be at least 1, got {active_config.RETENTION_DAYS}")
+            before = date.today() - timedelta(days=active_config.RETENTION_DAYS)
+        before = min(before, month_start(date.today()))
+        last_day = month_start(before) - timedelta(days=1)
+        
+        archived = {}
+        for therapist_id in (self._list_therapist_ids() if therapist_ids is None else therapist_ids):
+            with self._write_scope(therapist_id):
+                slots_by_month: Dict[date, List[TimeSlot]] = {}
+                for slot in self._load_therapist_slots(therapist_id, date.min, last_day):
+                    slots_by_month.setdefault(month_start(slot.start_date), []).append(slot)
+                
+                # One month at a time, so a crash leaves every month either archived or not
+                for month, slots in sorted(slots_by_month.items()):
+                    merged = _merge_archived(self._get_archived_slots(therapist_id, month, month), slots)
+                    self._archive_month(therapist_id, month, merged, slots)
+            
+            if slots_by_month:
+                archived[therapist_id] = sum(len(slots) for slots in slots_by_month.values())
+                logger.info(f"Archived {archived[therapist_id]} slots of {len(slots_by_month)} months for therapist {therapist_id}")
+        
+        return archived
+    
+    def book_slot(self, therapist_id: str, slot_time: datetime) -> BookingResult:
+        """
+        Book a slot with a therapist.
+        
+        Args:
+            therapist_id: Unique identifier for the therapist
+            slot_time: Start time of the slot to book
+        
+        Returns:
+            BookingResult: SUCCESS if the slot was booked, NOT_FOUND if there is no
+            such slot, CONFLICT if it is already booked
+        """
+        with self.locks.hold([therapist_id]):
+            result = self._transition_group(therapist_id, [slot_time], "free", "busy", False)[0]
+        self.cache.invalidate(therapist_id, [slot_time.date()])
+        
+        if result is BookingResult.SUCCESS:
+            self._publish_transitions(therapist_id, [slot_time], "busy")
+            logger.info(f"Slot booked successfully for therapist {therapist_id}")
+        elif result is BookingResult.CONFLICT:
+            logger.info(f"Booking failed for therapist {therapist_id}: slot already booked")
+        else:
+            logger.info(f"Booking failed for therapist {therapist_id}: slot not found")
+        
+        return result
+    
+    def cancel_booking(self, therapist_id: str, slot_time: datetime) -> BookingResult:
+        """
+        Cancel a booked slot.
+        
+        Args:
+            therapist_id: Unique identifier for the therapist
+            slot_time: Start time of the booked slot
+        
+        Returns:
+            BookingResult: SUCCESS if the booking was cancelled, NOT_FOUND if there
+            is no such slot, CONFLICT if it is not booked
+        """
+        with self.locks.hold([therapist_id]):
+            result = self._transition_slot(therapist_id, slot_time, "busy", "free")
+        self.cache.invalidate(therapist_id, [slot_time.date()])
+        
+        if result is BookingResult.SUCCESS:
+            self._publish_transitions(therapist_id, [slot_time], "free")
+            logger.info(f"Booking cancelled successfully for therapist {therapist_id}")
+        elif result is BookingResult.CONFLICT:
+            logger.info(f"Cancellation failed for therapist {therapist_id}: slot is not booked")
+        else:
+            logger.info(f"Cancellation failed for therapist {therapist_id}: slot not found")
+        
+        return result
+    
+    def book_slots(self, items: List[Tuple[str, datetime]], all_or_nothing: bool = False) -> List[BookingResult]:
+        """
+        Book several slots, possibly with several therapists.
+        
+        Args:
+            items: (therapist_id, slot_time) of each slot to book
+            all_or_nothing: If True, book nothing unless every slot can be booked;
+                            see _transition_batch() for what other requests can see
+        
+        Returns:
+            List[BookingResult]: Outcome of each item, in the order of items
+        """
+        return self._transition_batch(items, "free", "busy", all_or_nothing)
+    
+    def cancel_bookings(self, items: List[Tuple[str, datetime]], all_or_nothing: bool = False) -> List[BookingResult]:
+        """
+        Cancel several booked slots, possibly with several therapists.
+        
+        Args:
+            items: (therapist_id, slot_time) of each booked slot
+            all_or_nothing: If True, cancel nothing unless every booking can be cancelled;
+                            see _transition_batch() for what other requests can see
+        
+        Returns:
+            List[BookingResult]: Outcome of each item, in the order of items
+        """
+        return self._transition_batch(items, "busy", "free", all_or_nothing)
+    
+    def _transition_batch(self, items: List[Tuple[str, datetime]], from_status: str, to_status: str, all_or_nothing: bool) -> List[BookingResult]:
+        """
+        Apply a status transition to a batch of slots, one call per therapist.
+        
+        Each therapist's items go to _transition_group() together. In
+        all-or-nothing mode, backends with atomic_batches run the whole batch
+        in one transaction, rolled back if any item fails. Other backends
+        compensate instead: a failing therapist leaves its own slots untouched,
+        the therapists already done are moved back and the rule slots stored
+        for the batch are removed. Until then, other readers and writers can
+        see, and act on, the slots already moved; a slot they changed in the
+        meantime is not moved back.
+        
+        Args:
+            items: (therapist_id, slot_time) of each slot
+            from_status: Status the slots must have
+            to_status: Status to set
+            all_or_nothing: If True, apply nothing unless every item succeeds
+        
+        Returns:
+            List[BookingResult]: Outcome of each item, in the order of items
+        """
+        indexes_by_therapist: Dict[str, List[int]] = {}
+        for i, (therapist_id, _) in enumerate(items):
+            indexes_by_therapist.setdefault(therapist_id, []).append(i)
+        
+        if all_or_nothing and self.atomic_batches and items:
+            results = self._transition_batch_atomic(items, indexes_by_therapist, from_status, to_status)
+        else:
+            results = self._transition_batch_compensated(items, indexes_by_therapist, from_status, to_status, all_or_nothing)
+        
+        for therapist_id, indexes in indexes_by_therapist.items():
+            self._publish_transitions(therapist_id, [items[i][1] for i in indexes if results[i]], to_status)
+        
+        succeeded = sum(1 for result in results if result)
+        logger.info(f"Batch {from_status} -> {to_status}: {succeeded} of {len(items)} slots across {len(indexes_by_therapist)} therapists")
+        return results
+    
+    def _transition_batch_atomic(self, items: List[Tuple[str, datetime]], indexes_by_therapist: Dict[str, List[int]], from_status: str, to_status: str) -> List[BookingResult]:
+        """Run an all-or-nothing batch in one transaction, rolled back if any item fails."""
+        results: List[BookingResult] = [BookingResult.ABORTED] * len(items)
+        try:
+            with self.locks.hold(indexes_by_therapist), self._transaction_scope(items[0][0]):
+                for therapist_id, indexes in indexes_by_therapist.items():
+                    group_results = self._transition_group(therapist_id, [items[i][1] for i in indexes], from_status, to_status, True)
+                    for i, result in zip(indexes, group_results):
+                        results[i] = result
+                    if not all(group_results):
+                        raise _BatchRejected()
+        except _BatchRejected:
+            results = [BookingResult.ABORTED if result else result for result in results]
+        finally:
+            for therapist_id, indexes in indexes_by_therapist.items():
+                self.cache.invalidate(therapist_id, {items[i][1].date() for i in indexes})
+        return results
+    
+    def _transition_batch_compensated(self, items: List[Tuple[str, datetime]], indexes_by_therapist: Dict[str, List[int]], from_status: str, to_status: str, all_or_nothing: bool) -> List[BookingResult]:
+        """Run a batch therapist by therapist, undoing the therapists already done if an all-or-nothing batch fails."""
+        results: List[BookingResult] = [BookingResult.ABORTED] * len(items)
+        applied: List[Tuple[str, List[int], List[TimeSlot]]] = []
+        
+        for therapist_id, indexes in indexes_by_therapist.items():
+            slot_times = [items[i][1] for i in indexes]
+            materialized: List[TimeSlot] = []
+            with self.locks.hold([therapist_id]):
+                group_results = self._transition_group(therapist_id, slot_times, from_status, to_status, all_or_nothing, materialized)
+            self.cache.invalidate(therapist_id, {slot_time.date() for slot_time in slot_times})
+            for i, result in zip(indexes, group_results):
+                results[i] = result
+            
+            if all_or_nothing and not all(group_results):
+                # Move the therapists already done back, newest first
+                for done_id, done_indexes, done_materialized in reversed(applied):
+                    with self.locks.hold([done_id]):
+                        reverted = self._transition_slots(done_id, [items[i][1] for i in done_indexes], to_status, from_status, False)
+                        if done_materialized:
+                            self._remove_free_slots(done_id, done_materialized)
+                    self.cache.invalidate(done_id, {items[i][1].date() for i in done_indexes})
+                    if not all(reverted):
+                        logger.error(f"Could not revert every slot of therapist {done_id} after a failed batch")
+                    for i in done_indexes:
+                        results[i] = BookingResult.ABORTED
+                break
+            
+            applied.append((therapist_id, indexes, materialized))
+        
+        return results
+    
+    def _transition_group(self, therapist_id: str, slot_times: List[datetime], from_status: str, to_status: str, all_or_nothing: bool, materialized: Optional[List[TimeSlot]] = None) -> List[BookingResult]:
+        """
+        Move several slots of one therapist from one status to another, rule slots included.
+        
+        Slots of availability rules are not stored, so a transition out of free
+        first finds them NOT_FOUND. Those that a rule does generate are then
+        stored and the transition is run again for them, which keeps booking a
+        rule slot as atomic as booking a stored one. In all-or-nothing mode,
+        the rule slots stored for a group that fails are removed again.
+        
+        Args:
+            therapist_id: Unique identifier for the therapist
+            slot_times: Start times of the slots
+            from_status: Status the slots must have for the transition to apply
+            to_status: Status to set
+            all_or_nothing: If True, leave every slot untouched unless all succeed
+            materialized: If given, receives the rule slots stored for the group
+        
+        Returns:
+            List[BookingResult]: Outcome of each slot, as for _transition_slots()
+        """
+        results = self._transition_slots(therapist_id, slot_times, from_status, to_status, all_or_nothing)
+        if from_status != "free":
+            return results
+        
+        missing = [i for i, result in enumerate(results) if result is BookingResult.NOT_FOUND]
+        added: List[TimeSlot] = []
+        if not missing or not self._materialize_rule_slots(therapist_id, [slot_times[i] for i in missing], added):
+            return results
+        if materialized is not None:
+            materialized.extend(added)
+        
+        if all_or_nothing:
+            results = self._transition_slots(therapist_id, slot_times, from_status, to_status, True)
+            if added and not all(results):
+                self._remove_free_slots(therapist_id, added)
+                if materialized is not None:
+                    del materialized[-len(added):]
+            return results
+        
+        retried = self._transition_slots(therapist_id, [slot_times[i] for i in missing], from_status, to_status, False)
+        for i, result in zip(missing, retried):
+            results[i] = result
+        return results
+    
+    def _materialize_rule_slots(self, therapist_id: str, slot_times: List[datetime], added: Optional[List[TimeSlot]] = None) -> bool:
+        """
+        Store the rule slots starting at the given times as free slots.
+        
+        The rules are read from the backend rather than the cache, so a rule
+        deleted by another process cannot be booked.
+        
+        Args:
+            therapist_id: Unique identifier for the therapist
+            slot_times: Start times of the slots
+            added: If given, receives the slots stored by this call, leaving
+                   out those another writer stored first
+        
+        Returns:
+            bool: True if a rule generates a slot at any of the times
+        """
+        rules = self._get_rules(therapist_id)
+        if not rules:
+            return False
+        
+        starts = {to_epoch(slot_time) for slot_time in slot_times}
+        first_day = min(slot_time.date() for slot_time in slot_times)
+        last_day = max(slot_time.date() for slot_time in slot_times)
+        
+        with self._write_scope(therapist_id):
+            stored_slots = self._load_therapist_slots(therapist_id, first_day, last_day)
+            generated = [slot for slot in expand_rules(rules, first_day, last_day, stored_slots) if slot.start in starts]
+            if generated:
+                stored = self._add_missing_slots(therapist_id, generated)
+                if added is not None:
+                    added.extend(stored)
+        
+        return bool(generated)
+    
+    def _get_rules_cached(self, therapist_id: str) -> List[AvailabilityRule]:
+        """Read-through access to the availability rules of a therapist; errors propagate."""
+        rules = self.cache.get_rules(therapist_id)
+        if rules is None:
+            generation = self.cache.generation(therapist_id)
+            rules = self._get_rules(therapist_id)
+            self.cache.put_rules(therapist_id, rules, generation)
+        return rules
+    
+    def _get_slots_with_rules(self, therapist_id: str, first_day: date, last_day: date) -> List[TimeSlot]:
+        """
+        Get the stored slots of a therapist within a range of days, merged with
+        the free slots its availability rules generate on those days.
+        
+        Always reads the stored slots from the backend, archives included;
+        errors propagate.
+        
+        Args:
+            therapist_id: Unique identifier for the therapist
+            first_day: First day of the range (inclusive)
+            last_day: Last day of the range (inclusive)
+        
+        Returns:
+            List of slots ordered by start time
+        """
+        stored_slots = self._get_stored_slots(therapist_id, first_day, last_day)
+        rules = self._get_rules_cached(therapist_id)
+        if not rules:
+            return stored_slots
+        
+        generated = expand_rules(rules, first_day, last_day, stored_slots)
+        if not generated:
+            return stored_slots
+        return list(heapq.merge(stored_slots, generated, key=lambda slot: slot.start))
+    
+    def _get_stored_slots(self, therapist_id: str, first_day: date, last_day: date) -> List[TimeSlot]:
+        """
+        Get the slots of a therapist within a range of days from the working set
+        and, for the days before the current month, from the archives.
+        
+        Only whole past months are ever archived, so ranges within the current
+        month and later cost no archive read.
+        
+        Args:
+            therapist_id: Unique identifier for the therapist
+            first_day: First day of the range (inclusive)
+            last_day: Last day of the range (inclusive)
+        
+        Returns:
+            List of slots ordered by start time
+        """
+        slots = self._load_therapist_slots(therapist_id, first_day, last_day)
+        
+        current_month = month_start(date.today())
+        if first_day >= current_month:
+            return slots
+        
+        archive_last_day = min(last_day, current_month - timedelta(days=1))
+        archived_slots = self._get_archived_slots(therapist_id, month_start(first_day), month_start(archive_last_day))
+        SLOTS_PARSED.add(len(archived_slots))
+        archived = [slot for slot in archived_slots if first_day <= slot.start_date <= last_day]
+        if not archived:
+            return slots
+        return _merge_archived(archived, slots)
+    
+    def _read_slots(self, therapist_id: str, first_day: date, last_day: date) -> List[TimeSlot]:
+        """
+        Read-through access to the slots of a therapist within a range of days.
+        
+        Days found in the cache are served from it. The span of missing days is
+        fetched in one backend read, merged with the slots of the therapist's
+        availability rules and cached day by day, empty days included.
+        
+        Args:
+            therapist_id: Unique identifier for the therapist
+            first_day: First day of the range (inclusive)
+            last_day: Last day of the range (inclusive)
+        
+        Returns:
+            List of slots ordered by start time, empty if the backend read failed
+        """
+        days = [first_day + timedelta(days=offset) for offset in range((last_day - first_day).days + 1)]
+        slots_by_day = {day: self.cache.get(therapist_id, day) for day in days}
+        missing_days = [day for day in days if slots_by_day[day] is None]
+        
+        if missing_days:
+            generation = self.cache.generation(therapist_id)
+            try:
+                fetched = self._get_slots_with_rules(therapist_id, missing_days[0], missing_days[-1])
+            except Exception as e:
+                logger.error(f"Error getting slots for therapist {therapist_id}: {e}")
+                return []
+            
+            for day in days:
+                if missing_days[0] <= day <= missing_days[-1]:
+                    slots_by_day[day] = []
+            for slot in fetched:
+                slots_by_day[slot.start_date].append(slot)
+            for day in days:
+                if missing_days[0] <= day <= missing_days[-1]:
+                    self.cache.put(therapist_id, day, slots_by_day[day], generation)
+        
+        return [slot for day in days for slot in slots_by_day[day]]
+    
+    def close(self) -> None:
+        """Release the backend's connections. The default backend holds none."""
+    
+    def _after_fork(self) -> None:
+        """
+        Reset the state a forked child process inherited from its parent.
+        
+        The parent's subscriptions, change feeds and cache locks mean nothing
+        in the child, so it starts with an empty cache and no subscribers.
+        Backends holding connections also drop them here, without closing
+        them, since the parent may still be using them.
+        """
+        self._init_process_state()
+    
+    def _publish(self, therapist_id: str, event_type: str, slots: Iterable[TimeSlot] = ()) -> None:
+        """
+        Publish a change made by this process to the subscribers of the therapist.
+        
+        Backends that watch a change feed publish from the feed instead, which
+        also sees this process's writes.
+        """
+        if self.watches_changes or not self.events.has_subscribers(therapist_id):
+            return
+        self.events.publish(therapist_id, event_type, [
+            {"start_time": epoch_to_iso(slot.start), "end_time": epoch_to_iso(slot.end), "status": slot.status}
+            for slot in slots
+        ])
+    
+    def _publish_transitions(self, therapist_id: str, slot_times: List[datetime], to_status: str) -> None:
+        """Publish the slots moved to a status as booked or cancelled. The events carry no end times."""
+        if not slot_times or self.watches_changes or not self.events.has_subscribers(therapist_id):
+            return
+        self.events.publish(
+            therapist_id,
+            "booked" if to_status == "busy" else "cancelled",
+            [{"start_time": epoch_to_iso(to_epoch(slot_time)), "status": to_status} for slot_time in slot_times]
+        )
+    
+    def _watch_changes(self, therapist_id: str) -> Any:
+        """
+        Start a change feed publishing the slot events of a therapist.
+        
+        Called when a therapist gets its first subscriber, on backends with
+        watches_changes set.
+        
+        Args:
+            therapist_id: Unique identifier for the therapist
+        
+        Returns:
+            Handle of the feed, passed to _unwatch_changes()
+        """
+        raise NotImplementedError(f"The {self.name} backend has no change feed")
+    
+    def _unwatch_changes(self, handle: Any) -> None:
+        """Stop a change feed started by _watch_changes()."""
+    
+    @contextmanager
+    def _write_scope(self, therapist_id: str) -> Iterator[None]:
+        """
+        Group the reads and writes of one read-modify-write operation.
+        
+        Holds the therapist's write lock, so concurrent writers of the same
+        therapist in this process, and in the other processes sharing
+        WRITE_LOCK_DIR, run one after another, then enters the backend's
+        _transaction_scope().
+        
+        Args:
+            therapist_id: Unique identifier for the therapist being modified
+        
+        Raises:
+            LockTimeout: If the lock is still held by another writer after WRITE_LOCK_TIMEOUT_SECONDS
+        """
+        with self.locks.hold([therapist_id]), self._transaction_scope(therapist_id):
+            yield
+    
+    @contextmanager
+    def _transaction_scope(self, therapist_id: str) -> Iterator[None]:
+        """
+        Run the reads and writes of a write scope as one transaction.
+        
+        Backends with transactions override this so the overlap check and the
+        write it guards commit together. The default runs them as they come.
+        
+        Args:
+            therapist_id: Unique identifier for the therapist being modified
+        """
+        yield
+    
+    def _transition_slots(self, therapist_id: str, slot_times: List[datetime], from_status: str, to_status: str, all_or_nothing: bool) -> List[BookingResult]:
+        """
+        Move several slots of one therapist from one status to another.
+        
+        Backends that can apply the whole group in one transaction override
+        this. The default transitions the slots one by one and, in
+        all-or-nothing mode, moves the successful ones back if any fails.
+        
+        Args:
+            therapist_id: Unique identifier for the therapist
+            slot_times: Start times of the slots
+            from_status: Status the slots must have for the transition to apply
+            to_status: Status to set
+            all_or_nothing: If True, leave every slot untouched unless all succeed
+        
+        Returns:
+            List[BookingResult]: Outcome of each slot; in all-or-nothing mode the
+            slots left untouched because of another failure are ABORTED
+        """
+        results = [self._transition_slot(therapist_id, slot_time, from_status, to_status) for slot_time in slot_times]
+        if not all_or_nothing or all(results):
+            return results
+        
+        for slot_time, result in zip(slot_times, results):
+            if result:
+                self._transition_slot(therapist_id, slot_time, to_status, from_status)
+        return [BookingResult.ABORTED if result else result for result in results]
+    
+    def _add_missing_slots(self, therapist_id: str, slots: List[TimeSlot]) -> List[TimeSlot]:
+        """
+        Save the given slots of a therapist that do not exist yet, with their counters.
+        
+        A slot already stored at the same start time is left as it is, even
+        if it was booked in the meantime. The default checks and writes within
+        a write scope, which is atomic for backends with transactions; other
+        backends override this with a conditional write per slot.
+        
+        Args:
+            therapist_id: Unique identifier for the therapist
+            slots: Slots to add, ordered by start time
+        
+        Returns:
+            List[TimeSlot]: Slots actually added
+        """
+        with self._write_scope(therapist_id):
+            index = SlotIndex(self._load_therapist_slots(therapist_id, slots[0].start_date, slots[-1].start_date))
+            added = [slot for slot in slots if index.find(slot.start) is None]
+            if added:
+                self._store_therapist_slots(therapist_id, added, count_slots_by_day(added))
+        return added
+    
+    def _save_slots_bulk(self, slots_by_therapist: Dict[str, List[TimeSlot]]) -> None:
+        """
+        Save new slots of several therapists, with their counters.
+        
+        Backends able to write several therapists at once override this. The
+        default saves therapist by therapist, which still commits as one
+        transaction when the caller holds a transactional write scope.
+        
+        Args:
+            slots_by_therapist: New slots of each therapist
+        """
+        for therapist_id, slots in slots_by_therapist.items():
+            self._store_therapist_slots(therapist_id, slots, count_slots_by_day(slots))
+    
+    def _load_therapist_slots(self, therapist_id: str, first_day: date, last_day: date) -> List[TimeSlot]:
+        """Call _get_therapist_slots(), recording its latency, payload and slots parsed."""
+        started = perf_counter()
+        try:
+            slots = self._get_therapist_slots(therapist_id, first_day, last_day)
+        except Exception:
+            BACKEND_CALL_ERRORS.inc(self.name, "get_therapist_slots")
+            raise
+        self._observe_call("get_therapist_slots", therapist_id, started, len(slots))
+        SLOTS_PARSED.add(len(slots))
+        return slots
+    
+    def _store_therapist_slots(self, therapist_id: str, slots: List[TimeSlot], stats_delta: Dict[date, Dict[str, int]]) -> None:
+        """Call _save_therapist_slots(), recording its latency and payload."""
+        started = perf_counter()
+        try:
+            self._save_therapist_slots(therapist_id, slots, stats_delta)
+        except Exception:
+            BACKEND_CALL_ERRORS.inc(self.name, "save_therapist_slots")
+            raise
+        self._observe_call("save_therapist_slots", therapist_id, started, len(slots))
+    
+    def _observe_call(self, operation: str, therapist_id: str, started: float, slot_count: int) -> None:
+        """Record the latency and estimated payload of a backend call that started at started."""
+        therapist_label = _therapist_label(therapist_id)
+        BACKEND_CALL_SECONDS.observe(perf_counter() - started, self.name, operation, therapist_label)
+        BACKEND_PAYLOAD_BYTES.observe(slot_count * self.slot_payload_bytes, self.name, operation, therapist_label)
+    
+    @abstractmethod
+    def _get_therapist_slots(self, therapist_id: str, first_day: date, last_day: date) -> List[TimeSlot]:
+        """
+        Get the slots of a therapist that start within a range of days.
+        
+        Always reads the backend; errors propagate to the caller.
+        
+        Args:
+            therapist_id: Unique identifier for the therapist
+            first_day: First day of the range (inclusive)
+            last_day: Last day of the range (inclusive)
+        
+        Returns:
+            List of slots ordered by start time
+        """
+    
+    @abstractmethod
+    def _save_therapist_slots(self, therapist_id: str, slots: List[TimeSlot], stats_delta: Dict[date, Dict[str, int]]) -> None:
+        """
+        Save new or updated slots for a therapist, leaving other slots untouched.
+        
+        Args:
+            therapist_id: Unique identifier for the therapist
+            slots: List of slots to save
+            stats_delta: Amounts to add to the per-day counters, written together with the slots
+        """
+    
+    @abstractmethod
+    def _transition_slot(self, therapist_id: str, slot_time: datetime, from_status: str, to_status: str) -> BookingResult:
+        """
+        Atomically move a slot from one status to another, moving one count
+        between the day's counters when it succeeds.
+        
+        Args:
+            therapist_id: Unique identifier for the therapist
+            slot_time: Start time of the slot
+            from_status: Status the slot must have for the transition to apply
+            to_status: Status to set
+        
+        Returns:
+            BookingResult: SUCCESS, NOT_FOUND or CONFLICT
+        """
+    
+    @abstractmethod
+    def _get_day_stats(self, therapist_id: str, day: date) -> Optional[Dict[str, int]]:
+        """
+        Get the counters of a therapist on a day.
+        
+        Args:
+            therapist_id: Unique identifier for the therapist
+            day: Day of the counters
+        
+        Returns:
+            Dict with free, busy and total counts, or None if the day has no counters
+        """
+    
+    @abstractmethod
+    def _replace_day_stats(self, therapist_id: str, first_day: date, last_day: date, stats: Dict[date, Dict[str, int]]) -> None:
+        """
+        Replace every counter of a therapist within a range of days.
+        
+        Args:
+            therapist_id: Unique identifier for the therapist
+            first_day: First day of the range (inclusive)
+            last_day: Last day of the range (inclusive)
+            stats: New counters by day; days of the range missing from it lose their counters
+        """
+    
+    @abstractmethod
+    def _list_therapist_ids(self) -> List[str]:
+        """
+        List every therapist with stored slots, counters or rules.
+        
+        Returns:
+            List of therapist identifiers
+        """
+    
+    @abstractmethod
+    def _get_rules(self, therapist_id: str) -> List[AvailabilityRule]:
+        """
+        Get the availability rules of a therapist.
+        
+        Always reads the backend; errors propagate to the caller.
+        
+        Args:
+            therapist_id: Unique identifier for the therapist
+        
+        Returns:
+            List of rules
+        """
+    
+    @abstractmethod
+    def _save_rule(self, therapist_id: str, rule: AvailabilityRule) -> None:
+        """
+        Save an availability rule of a therapist, replacing a rule with the same identifier.
+        
+        Args:
+            therapist_id: Unique identifier for the therapist
+            rule: Rule to save
+        """
+    
+    @abstractmethod
+    def _delete_rule(self, therapist_id: str, rule_id: str) -> bool:
+        """
+        Delete an availability rule of a therapist.
+        
+        Args:
+            therapist_id: Unique identifier for the therapist
+            rule_id: Unique identifier of the rule
+        
+        Returns:
+            bool: True if the rule existed
+        """
+    
+    @abstractmethod
+    def _get_archived_slots(self, therapist_id: str, first_month: date, last_month: date) -> List[TimeSlot]:
+        """
+        Get the archived slots of a therapist within a range of months.
+        
+        Args:
+            therapist_id: Unique identifier for the therapist
+            first_month: First day of the first month (inclusive)
+            last_month: First day of the last month (inclusive)
+        
+        Returns:
+            List of slots ordered by start time
+        """
+    
+    @abstractmethod
+    def _remove_free_slots(self, therapist_id: str, slots: List[TimeSlot]) -> List[TimeSlot]:
+        """
+        Delete the given slots of a therapist that are still free, with their counters.
+        
+        Undoes _add_missing_slots() when the operation it was for fails; a
+        slot booked in the meantime is kept.
+        
+        Args:
+            therapist_id: Unique identifier for the therapist
+            slots: Slots to delete
+        
+        Returns:
+            List[TimeSlot]: Slots actually deleted
+        """
+    
+    @abstractmethod
+    def _archive_month(self, therapist_id: str, month: date, archive: List[TimeSlot], archived_slots: List[TimeSlot]) -> None:
+        """
+        Replace the archive of a month and remove the slots it took from the
+        working set, in one atomic write.
+        
+        Args:
+            therapist_id: Unique identifier for the therapist
+            month: First day of the month
+            archive: Every slot of the month's archive, ordered by start time
+            archived_slots: Slots of the working set moved into the archive
+        """
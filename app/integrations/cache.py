@@ -0,0 +1,216 @@
+"""
+Read-through cache of therapist slots.
+"""
+from collections import OrderedDict
+from datetime import date
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple, TYPE_CHECKING
+import threading
+import time
+
+if TYPE_CHECKING:
+    from app.integrations.base import AvailabilityRule, TimeSlot
+
+
+class SlotCache:
+    """
+    Bounded LRU cache of slot lists keyed by therapist and day.
+    
+    Entries expire after a TTL so changes made by other processes are picked
+    up eventually; changes made by this process invalidate the affected days
+    immediately. A TTL or size of zero disables the cache.
+    
+    The availability rules of each therapist are cached alongside, with the
+    same TTL. They are a handful of small records per therapist, so they are
+    neither counted in max_entries nor in the hit and miss counters.
+    """
+    
+    def __init__(self, ttl_seconds: float, max_entries: int, clock: Callable[[], float] = time.monotonic):
+        """
+        Initialize the cache.
+        
+        Args:
+            ttl_seconds: Time an entry stays valid after it is stored
+            max_entries: Maximum number of (therapist, day) entries kept
+            clock: Monotonic clock returning seconds
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries: "OrderedDict[Tuple[str, date], Tuple[float, List[TimeSlot]]]" = OrderedDict()
+        self._days_by_therapist: Dict[str, Set[date]] = {}
+        # Set from a shared sequence on every invalidation, so a read that raced a write
+        # cannot store stale slots. Only the max_entries therapists invalidated last keep
+        # their own generation; the others share the floor, the highest generation dropped.
+        self._generations: "OrderedDict[str, int]" = OrderedDict()
+        self._sequence = 0
+        self._floor = 0
+        self._rules: Dict[str, Tuple[float, List[AvailabilityRule]]] = {}
+        self._lock = threading.Lock()
+        
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    @property
+    def enabled(self) -> bool:
+        """Whether the cache stores anything at all."""
+        return self.ttl_seconds > 0 and self.max_entries > 0
+    
+    def get(self, therapist_id: str, day: date) -> Optional[List['TimeSlot']]:
+        """
+        Get the cached slots of a therapist on a day.
+        
+        Args:
+            therapist_id: Unique identifier for the therapist
+            day: Day of the slots
+        
+        Returns:
+            A copy of the cached list, or None on a miss or an expired entry
+        """
+        if not self.enabled:
+            return None
+        
+        key = (therapist_id, day)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= self._clock():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return list(entry[1])
+    
+    def generation(self, therapist_id: str) -> int:
+        """Return the invalidation generation of a therapist, to pass back to put()."""
+        with self._lock:
+            return self._generations.get(therapist_id, self._floor)
+    
+    def put(self, therapist_id: str, day: date, slots: List['TimeSlot'], generation: Optional[int] = None) -> None:
+        """
+        Store the slots of a therapist on a day, evicting the least recently used entries.
+        
+        Args:
+            therapist_id: Unique identifier for the therapist
+            day: Day of the slots
+            slots: Every slot of the therapist starting on that day
+            generation: Generation read before the slots were fetched. The slots
+                        are not stored if the therapist was invalidated since.
+        """
+        if not self.enabled:
+            return
+        
+        key = (therapist_id, day)
+        with self._lock:
+            if generation is not None and generation != self._generations.get(therapist_id, self._floor):
+                return
+            self._entries[key] = (self._clock() + self.ttl_seconds, list(slots))
+            self._entries.move_to_end(key)
+            self._days_by_therapist.setdefault(therapist_id, set()).add(day)
+            
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+    
+    def get_rules(self, therapist_id: str) -> Optional[List['AvailabilityRule']]:
+        """
+        Get the cached availability rules of a therapist.
+        
+        Args:
+            therapist_id: Unique identifier for the therapist
+        
+        Returns:
+            A copy of the cached list, or None on a miss or an expired entry
+        """
+        if not self.enabled:
+            return None
+        
+        with self._lock:
+            entry = self._rules.get(therapist_id)
+            if entry is None or entry[0] <= self._clock():
+                self._rules.pop(therapist_id, None)
+                return None
+            return list(entry[1])
+    
+    def put_rules(self, therapist_id: str, rules: List['AvailabilityRule'], generation: Optional[int] = None) -> None:
+        """
+        Store the availability rules of a therapist.
+        
+        Args:
+            therapist_id: Unique identifier for the therapist
+            rules: Every rule of the therapist
+            generation: Generation read before the rules were fetched, as for put()
+        """
+        if not self.enabled:
+            return
+        
+        with self._lock:
+            if generation is not None and generation != self._generations.get(therapist_id, self._floor):
+                return
+            self._rules[therapist_id] = (self._clock() + self.ttl_seconds, list(rules))
+    
+    def invalidate(self, therapist_id: str, days: Optional[Iterable[date]] = None) -> None:
+        """
+        Drop cached entries of a therapist.
+        
+        Args:
+            therapist_id: Unique identifier for the therapist
+            days: Days to drop, or None to drop every day and the rules of the therapist
+        """
+        with self._lock:
+            self._bump_generation(therapist_id)
+            if days is None:
+                self._rules.pop(therapist_id, None)
+            cached_days = self._days_by_therapist.get(therapist_id)
+            if not cached_days:
+                return
+            for day in list(cached_days if days is None else days):
+                if day in cached_days:
+                    self._remove((therapist_id, day))
+    
+    def clear(self) -> None:
+        """Drop every entry, keeping the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._days_by_therapist.clear()
+            self._rules.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return the cache counters and settings."""
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds
+            }
+    
+    def _bump_generation(self, therapist_id: str) -> None:
+        """
+        Give a therapist a generation no read has seen yet. Caller holds the lock.
+        
+        Generations never decrease: the one dropped to keep at most max_entries
+        of them raises the floor, which the therapists without their own share.
+        A read of such a therapist that raced the drop only misses its store.
+        """
+        self._sequence += 1
+        self._generations[therapist_id] = self._sequence
+        self._generations.move_to_end(therapist_id)
+        while len(self._generations) > self.max_entries:
+            _, dropped = self._generations.popitem(last=False)
+            self._floor = max(self._floor, dropped)
+    
+    def _remove(self, key: Tuple[str, date]) -> None:
+        """Remove an entry and its therapist bookkeeping. Caller holds the lock."""
+        del self._entries[key]
+        therapist_id, day = key
+        cached_days = self._days_by_therapist[therapist_id]
+        cached_days.discard(day)
+        if not cached_days:
+            del self._days_by_therapist[therapist_id]
@@ -0,0 +1,318 @@
+"""
+Publish/subscribe of slot changes, per therapist.
+
+Backends publish a SlotEvent whenever slots of a therapist are created,
+booked or cancelled; subscribers, such as the event stream of the portals,
+each get their own bounded queue of the events of one therapist. Events
+carry the slots in the format of the slot listings, so they can be applied
+to a listing fetched earlier.
+
+A backend with a change feed of its database (see
+StorageBackend._watch_changes) publishes from that feed instead of from its
+own writes, so changes made by other processes are seen too. The feed of a
+therapist runs while the therapist has subscribers and is shared by all of
+them.
+"""
+from itertools import count
+from typing import Any, Callable, Dict, List, Optional, Set
+import logging
+import queue
+import threading
+
+from app.utils.metrics import REGISTRY
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Event types. "resync" tells subscribers that changes may have been missed,
+# e.g. a rule changed every slot of a day, and the listing should be fetched again.
+EVENT_TYPES = ("created", "booked", "cancelled", "resync")
+
+EVENTS_PUBLISHED = REGISTRY.counter(
+    "slot_events_published_total",
+    "Slot change events published to subscribers, per type",
+    ("type",)
+)
+EVENTS_DROPPED = REGISTRY.counter(
+    "slot_events_dropped_total",
+    "Slot change events dropped because a subscriber's queue was full"
+)
+SUBSCRIBERS = REGISTRY.gauge(
+    "slot_event_subscribers",
+    "Open subscriptions to slot change events"
+)
+WATCHED_THERAPISTS = REGISTRY.gauge(
+    "slot_event_watched_therapists",
+    "Therapists with at least one subscription to their slot change events"
+)
+
+
+class TooManySubscribers(Exception):
+    """Raised when a subscription would exceed the maximum number of subscribers."""
+
+
+class SlotEvent:
+    """A change of some slots of one therapist."""
+    
+    __slots__ = ("event_id", "event_type", "therapist_id", "slots")
+    
+    def __init__(self, event_id: int, event_type: str, therapist_id: str, slots: List[Dict[str, Any]]):
+        """
+        Initialize the event.
+        
+        Args:
+            event_id: Increasing number of the event within this process
+            event_type: One of EVENT_TYPES
+            therapist_id: Therapist whose slots changed
+            slots: Changed slots as dicts with start_time, status and, except
+                   for bookings and cancellations made by this process, end_time
+        """
+        self.event_id = event_id
+        self.event_type = event_type
+        self.therapist_id = therapist_id
+        self.slots = slots
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert the event to the payload sent to clients."""
+        return {"type": self.event_type, "therapist_id": self.therapist_id, "slots": self.slots}
+
+
+class SlotSubscription:
+    """
+    Queue of the slot events of one therapist for one subscriber.
+    
+    Close it, or use it as a context manager, when the subscriber goes away.
+    """
+    
+    def __init__(self, events: 'SlotEvents', therapist_id: str, max_queued: int):
+        self.therapist_id = therapist_id
+        self._events = events
+        self._queue: queue.Queue = queue.Queue(max_queued)
+        self._overflowed = False
+        self.closed = False
+    
+    def put(self, event: SlotEvent) -> None:
+        """Queue an event; if the queue is full the subscriber will be told to resync."""
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self._overflowed = True
+            EVENTS_DROPPED.inc()
+    
+    def get(self, timeout: Optional[float] = None) -> Optional[SlotEvent]:
+        """
+        Wait for the next event.
+        
+        Args:
+            timeout: Seconds to wait, or None to wait forever
+        
+        Returns:
+            The next event, a resync event if events were dropped, or None on
+            timeout or once the subscription is closed
+        """
+        if self.closed:
+            return None
+        if self._overflowed:
+            # Events were dropped: the queued ones are stale as well
+            self._overflowed = False
+            while not self._queue.empty():
+                self._queue.get_nowait()
+            return self._events.make_event("resync", self.therapist_id)
+        
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+    
+    def close(self) -> None:
+        """Stop receiving events, waking up a subscriber waiting in get()."""
+        if not self.closed:
+            self.closed = True
+            self._events.unsubscribe(self)
+            try:
+                self._queue.put_nowait(None)
+            except queue.Full:
+                pass
+    
+    def __enter__(self) -> 'SlotSubscription':
+        return self
+    
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+class _PendingFeed:
+    """A change feed being started, outside the lock, for the first subscriber of a therapist."""
+    
+    __slots__ = ("started", "error")
+    
+    def __init__(self):
+        self.started = threading.Event()
+        self.error: Optional[Exception] = None
+
+
+class SlotEvents:
+    """
+    Subscriptions to the slot changes of each therapist.
+    
+    start_feed(therapist_id) is called when a therapist gets its first
+    subscriber, and stop_feed() with what it returned once the therapist has
+    none left. Feeds are started without holding the lock, since starting one
+    may wait on the network; later subscribers of the therapist wait for it.
+    A feed that fails to start fails the subscriptions waiting for it.
+    """
+    
+    def __init__(
+        self,
+        max_subscribers: int = 1000,
+        max_queued: int = 256,
+        start_feed: Optional[Callable[[str], Any]] = None,
+        stop_feed: Optional[Callable[[Any], None]] = None
+    ):
+        """
+        Initialize the subscriptions.
+        
+        Args:
+            max_subscribers: Maximum number of open subscriptions in this process
+            max_queued: Events queued per subscriber before it is told to resync
+            start_feed: Starts the change feed of a therapist and returns its handle
+            stop_feed: Stops a change feed given its handle
+        """
+        self.max_subscribers = max_subscribers
+        self.max_queued = max_queued
+        self._start_feed = start_feed
+        self._stop_feed = stop_feed
+        self._subscriptions: Dict[str, Set[SlotSubscription]] = {}
+        self._feeds: Dict[str, Any] = {}
+        self._count = 0
+        self._ids = count(1)
+        self._lock = threading.Lock()
+    
+    def make_event(self, event_type: str, therapist_id: str, slots: Optional[List[Dict[str, Any]]] = None) -> SlotEvent:
+        """Create an event with the next event id."""
+        return SlotEvent(next(self._ids), event_type, therapist_id, slots or [])
+    
+    def has_subscribers(self, therapist_id: str) -> bool:
+        """Whether anyone is subscribed to the events of a therapist."""
+        return therapist_id in self._subscriptions
+    
+    def subscribe(self, therapist_id: str) -> SlotSubscription:
+        """
+        Subscribe to the slot events of a therapist.
+        
+        Args:
+            therapist_id: Unique identifier for the therapist
+        
+        Returns:
+            SlotSubscription: Queue of the therapist's events from now on
+        
+        Raises:
+            TooManySubscribers: If max_subscribers subscriptions are already open
+            Exception: Whatever start_feed raised if the therapist's feed failed to start
+        """
+        subscription = SlotSubscription(self, therapist_id, self.max_queued)
+        pending = None
+        starting = False
+        with self._lock:
+            if self._count >= self.max_subscribers:
+                raise TooManySubscribers(f"Too many open event streams (maximum {self.max_subscribers})")
+            
+            if therapist_id not in self._subscriptions:
+                self._subscriptions[therapist_id] = set()
+                WATCHED_THERAPISTS.inc()
+                if self._start_feed is not None:
+                    pending = self._feeds[therapist_id] = _PendingFeed()
+                    starting = True
+            elif isinstance(self._feeds.get(therapist_id), _PendingFeed):
+                pending = self._feeds[therapist_id]
+            self._subscriptions[therapist_id].add(subscription)
+            self._count += 1
+            SUBSCRIBERS.inc()
+        
+        if starting:
+            self._start_pending_feed(therapist_id, pending)
+        elif pending is not None:
+            pending.started.wait()
+        if pending is not None and pending.error is not None:
+            subscription.close()
+            raise pending.error
+        
+        logger.info(f"Subscribed to slot events of therapist {therapist_id} ({self._count} subscriptions open)")
+        return subscription
+    
+    def _start_pending_feed(self, therapist_id: str, pending: _PendingFeed) -> None:
+        """Start the feed of a therapist, then store it, or stop it if every subscriber left meanwhile."""
+        try:
+            handle = self._start_feed(therapist_id)
+        except Exception as e:
+            # The failed feed stays pending until its subscribers are gone, failing the newcomers too
+            pending.error = e
+            pending.started.set()
+            return
+        
+        with self._lock:
+            stored = self._feeds.get(therapist_id) is pending
+            if stored:
+                self._feeds[therapist_id] = handle
+        pending.started.set()
+        if not stored:
+            self._stop(therapist_id, handle)
+    
+    def _stop(self, therapist_id: str, handle: Any) -> None:
+        """Stop a feed, logging instead of raising errors."""
+        try:
+            self._stop_feed(handle)
+        except Exception as e:
+            logger.warning(f"Error stopping the change feed of therapist {therapist_id}: {e}")
+    
+    def unsubscribe(self, subscription: SlotSubscription) -> None:
+        """Remove a subscription, stopping the therapist's feed if it was the last one."""
+        feed = None
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.therapist_id)
+            if subscriptions is None or subscription not in subscriptions:
+                return
+            subscriptions.discard(subscription)
+            self._count -= 1
+            SUBSCRIBERS.dec()
+            if not subscriptions:
+                del self._subscriptions[subscription.therapist_id]
+                feed = self._feeds.pop(subscription.therapist_id, None)
+                WATCHED_THERAPISTS.dec()
+        
+        # A feed still starting is stopped by its starter once it sees it was dropped
+        if feed is not None and not isinstance(feed, _PendingFeed) and self._stop_feed is not None:
+            self._stop(subscription.therapist_id, feed)
+    
+    def close_all(self) -> int:
+        """
+        Close every open subscription, e.g. when the process shuts down.
+        
+        Returns:
+            Number of subscriptions closed
+        """
+        with self._lock:
+            subscriptions = [subscription for therapist_subscriptions in self._subscriptions.values() for subscription in therapist_subscriptions]
+        for subscription in subscriptions:
+            subscription.close()
+        return len(subscriptions)
+    
+    def publish(self, therapist_id: str, event_type: str, slots: Optional[List[Dict[str, Any]]] = None) -> None:
+        """
+        Send an event to every subscriber of a therapist.
+        
+        Args:
+            therapist_id: Unique identifier for the therapist
+            event_type: One of EVENT_TYPES
+            slots: Changed slots, in the format of the slot listings
+        """
+        subscriptions = self._subscriptions.get(therapist_id)
+        if not subscriptions:
+            return
+        
+        event = self.make_event(event_type, therapist_id, slots)
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(therapist_id, ()))
+        for subscription in subscriptions:
+            subscription.put(event)
+        EVENTS_PUBLISHED.inc(event_type)
@@ -1,7 +1,9 @@
-import os
-from datetime import datetime, date, timedelta
+from datetime import datetime, date
 from typing import List, Dict, Any, Optional, Tuple
+import base64
 import logging
+import os
+import threading
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -10,320 +12,726 @@ import firebase_admin
 from firebase_admin import credentials, db
 
 from app.config import active_config
+from app.integrations.archive import encode_slots, decode_slots, month_key
+from app.integrations.base import StorageBackend, TimeSlot, BookingResult, AvailabilityRule, STATS_FIELDS, count_slots_by_day
+from app.utils.date_utils import to_epoch, epoch_to_date, epoch_to_iso, SECONDS_PER_DAY
 
-# Initialize Firebase Admin SDK
-try:
-    cred = credentials.Certificate(active_config.get_firebase_credentials())
-    firebase_admin.initialize_app(cred, {
-        'databaseURL': active_config.get_database_url()
-    })
-    logger.info("Firebase initialized successfully")
-except Exception as e:
-    logger.error(f"Error initializing Firebase: {e}")
-    raise
 
-# Get a reference to the database
-db_ref = db.reference('appointments')
+# Children of the appointments node holding the per-day counters, the
+# availability rules and the monthly archives of every therapist. They are
+# kept out of the therapist nodes, so a therapist node holds nothing but
+# dates and a listener on it downloads nothing else.
+_STATS_KEY = "_stats"
+_RULES_KEY = "_rules"
+_ARCHIVE_KEY = "_archive"
 
 
-class TimeSlot:
-    """Represents a time slot for a therapist appointment."""
-    
-    def __init__(self, start_time: datetime, end_time: datetime, status: str = "free"):
-        """
-        Initialize a new TimeSlot.
-        
-        Args:
-            start_time: Start time of the appointment slot
-            end_time: End time of the appointment slot
-            status: Status of the slot - 'free' or 'busy'
-        """
-        self.start_time = start_time
-        self.end_time = end_time
-        self.status = status  # 'free' or 'busy'
-    
-    def to_dict(self) -> Dict[str, Any]:
-        """Convert the TimeSlot to a dictionary for storage."""
-        return {
-            "start_time": self.start_time.isoformat(),
-            "end_time": self.end_time.isoformat(),
-            "status": self.status
-        }
-    
-    @classmethod
-    def from_dict(cls, data: Dict[str, Any]) -> 'TimeSlot':
-        """Create a TimeSlot from a dictionary."""
-        return cls(
-            start_time=datetime.fromisoformat(data["start_time"]),
-            end_time=datetime.fromisoformat(data["end_time"]),
-            status=data["status"]
-        )
+class _SlotNotFound(Exception):
+    """Raised inside a transaction to abort it when the slot does not exist."""
+
+
+class _SlotConflict(Exception):
+    """Raised inside a transaction to abort it when the slot has an unexpected status."""
+
+
+def _day_key(day: date) -> str:
+    """Return the key of a date partition (YYYY-MM-DD)."""
+    return day.isoformat()
+
 
+def _slot_key(start: int) -> str:
+    """Return the key of a slot within its date partition (HH:MM:SS) from its epoch start."""
+    seconds = start % SECONDS_PER_DAY
+    return f"{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
 
-def _get_therapist_slots(therapist_id: str) -> List[Dict[str, Any]]:
+
+def _slot_path(start: int) -> str:
+    """Return the path of a slot relative to its therapist node from its epoch start."""
+    return f"{_day_key(epoch_to_date(start))}/{_slot_key(start)}"
+
+
+def _increment(amount: int) -> Dict[str, Any]:
+    """Return a server value that adds an amount to a counter atomically."""
+    return {".sv": {"increment": amount}}
+
+
+def _stats_updates(therapist_id: str, stats_delta: Dict[date, Dict[str, int]]) -> Dict[str, Any]:
+    """Return the multi-path update, relative to the appointments node, adding per-day amounts to the counters of a therapist."""
+    return {
+        f"{_STATS_KEY}/{therapist_id}/{_day_key(day)}/{field}": _increment(amount)
+        for day, delta in stats_delta.items()
+        for field, amount in delta.items()
+        if amount
+    }
+
+
+def _flatten_days(days_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Flatten {day: {slot_key: slot}} partitions into a list ordered by start time."""
+    slots = []
+    for day in sorted(days_data):
+        day_slots = days_data[day]
+        if not isinstance(day_slots, dict):
+            continue
+        for key in sorted(day_slots):
+            slots.append(day_slots[key])
+    return slots
+
+
+def _event_row(slot_dict: Dict[str, Any]) -> Dict[str, str]:
+    """Convert a stored slot to the dict of a slot event."""
+    slot = TimeSlot.from_dict(slot_dict)
+    return {"start_time": epoch_to_iso(slot.start), "end_time": epoch_to_iso(slot.end), "status": slot.status}
+
+
+def _changes_from_event(event_type: str, path: str, data: Any) -> List[Tuple[str, List[Dict[str, str]]]]:
     """
-    Get all slots for a therapist.
+    Turn a change of a therapist node, as reported by a listener, into slot events.
+    
+    Slots written by multi-path updates (patch) are new slots. A slot node
+    written on its own (put) is written by a transaction, i.e. a booking or a
+    cancellation, reported by its new status. Deleted slots are archived ones,
+    which stay visible; any other change, such as a date node rewritten to
+    remove slots, makes subscribers resync.
     
     Args:
-        therapist_id: Unique identifier for the therapist
+        event_type: 'put' or 'patch'
+        path: Path of the change relative to the therapist node
+        data: New value at the path; for a patch, the new values keyed by sub-path
     
     Returns:
-        List of slot dictionaries
+        List of (event type, slots) pairs
     """
-    try:
-        therapist_ref = db_ref.child(therapist_id)
-        slots_data = therapist_ref.get()
-        
-        if slots_data is None:
-            return []
-            
-        if isinstance(slots_data, list):
-            return slots_data
-            
-        # If it's not a list, return an empty list to maintain type safety
-        logger.warning(f"Unexpected data format for therapist {therapist_id}. Expected list, got {type(slots_data)}")
-        return []
-    except Exception as e:
-        logger.error(f"Error getting slots for therapist {therapist_id}: {e}")
-        return []
+    changes = [(path.rstrip("/") + "/" + key, value) for key, value in data.items()] if event_type == "patch" else [(path, data)]
+    
+    created, transitioned, resync = [], {"booked": [], "cancelled": []}, False
+    for change_path, value in changes:
+        parts = [part for part in change_path.split("/") if part]
+        if not parts or len(parts) > 2 or not (len(parts[0]) == 10 and parts[0][4] == "-"):
+            resync = True
+        elif value is None:
+            continue
+        elif len(parts) == 1 and event_type == "put":
+            resync = True
+        elif len(parts) == 1:
+            created.extend(_event_row(slot_dict) for slot_dict in value.values() if isinstance(slot_dict, dict))
+        elif event_type == "patch":
+            created.append(_event_row(value))
+        else:
+            row = _event_row(value)
+            transitioned["booked" if row["status"] == "busy" else "cancelled"].append(row)
+    
+    events = [("created", created)] if created else []
+    events.extend((name, rows) for name, rows in transitioned.items() if rows)
+    if resync:
+        events.append(("resync", []))
+    return events
+
 
+# Number of backends using the Firebase app of each process, which is
+# deleted when the last of them closes
+_app_users: Dict[str, int] = {}
+_app_lock = threading.Lock()
+_app_lock_pid = os.getpid()
 
-def _save_therapist_slots(therapist_id: str, slots: List[Dict[str, Any]]) -> None:
+
+def _app_guard() -> threading.Lock:
+    """Return the lock of the app counts, a new one in a forked child."""
+    global _app_lock, _app_lock_pid
+    if _app_lock_pid != os.getpid():
+        # The lock may have been held by another thread of the parent at the fork
+        _app_lock, _app_lock_pid = threading.Lock(), os.getpid()
+    return _app_lock
+
+
+def _acquire_app() -> firebase_admin.App:
     """
-    Save all slots for a therapist.
+    Return the Firebase app of the current process, initializing it on first use.
     
-    Args:
-        therapist_id: Unique identifier for the therapist
-        slots: List of slot dictionaries to save
-    
-    Raises:
-        Exception: If there's an error saving the slots
+    Apps are named after the process, so a forked worker never shares the
+    HTTP connections of an app its parent created. Every call must be
+    matched by a _release_app() once the app is no longer used.
     """
-    try:
-        therapist_ref = db_ref.child(therapist_id)
-        therapist_ref.set(slots)
-        
-        # Verify the data was saved
-        saved_data = therapist_ref.get()
-        if saved_data != slots:
-            logger.warning(f"Data verification failed for therapist {therapist_id}: saved data does not match input data")
-    except Exception as e:
-        logger.error(f"Error saving slots for therapist {therapist_id}: {e}")
-        raise
+    name = f"appointments-{os.getpid()}"
+    with _app_guard():
+        try:
+            app = firebase_admin.get_app(name)
+        except ValueError:
+            try:
+                cred = credentials.Certificate(active_config.get_firebase_credentials())
+                app = firebase_admin.initialize_app(cred, {
+                    'databaseURL': active_config.get_database_url()
+                }, name=name)
+                logger.info("Firebase initialized successfully")
+            except Exception as e:
+                logger.error(f"Error initializing Firebase: {e}")
+                raise
+        _app_users[name] = _app_users.get(name, 0) + 1
+        return app
+
 
+def _release_app(app: firebase_admin.App) -> None:
+    """Stop using an app from _acquire_app(), deleting it once no backend of the process uses it."""
+    with _app_guard():
+        _app_users[app.name] -= 1
+        if _app_users[app.name] == 0:
+            del _app_users[app.name]
+            firebase_admin.delete_app(app)
 
-def create_free_slot(therapist_id: str, start_time: datetime, end_time: datetime) -> bool:
+
+class FirebaseBackend(StorageBackend):
     """
-    Create a free slot for a therapist in the calendar.
+    Firebase Realtime Database backend.
     
-    Args:
-        therapist_id: Unique identifier for the therapist
-        start_time: Start time of the slot
-        end_time: End time of the slot
-        
-    Returns:
-        bool: True if slot was created successfully, False otherwise
+    Slots are partitioned by therapist, then date, then slot start:
+        appointments/<therapist_id>/<YYYY-MM-DD>/<HH:MM:SS> -> {start, end, status}
+    so a day view downloads a single date node and a booking touches a single slot.
+    The counters of each day, the availability rules and the archives of past
+    months live in trees of their own next to the therapists, so therapist IDs
+    must not start with an underscore:
+        appointments/_stats/<therapist_id>/<YYYY-MM-DD> -> {free, busy, total}
+        appointments/_rules/<therapist_id>/<rule_id> -> AvailabilityRule.to_dict()
+        appointments/_archive/<therapist_id>/<YYYY-MM> -> base64 of a compressed archive
+    Slots are stored in the compact integer format of TimeSlot.to_wire();
+    slots written as ISO strings by earlier versions are still read.
     """
-    # Get existing slots
-    slots = _get_therapist_slots(therapist_id)
     
-    # Check for overlapping slots
-    for slot_dict in slots:
-        slot = TimeSlot.from_dict(slot_dict)
-        # Check if new slot overlaps with existing slots
-        if (start_time < slot.end_time and end_time > slot.start_time):
-            logger.info(f"Slot creation failed for therapist {therapist_id}: overlapping slot found")
-            return False  # Overlapping slot
+    name = "firebase"
     
-    # Create new slot
-    new_slot = TimeSlot(start_time=start_time, end_time=end_time)
-    slots.append(new_slot.to_dict())
+    # Slot events come from listeners on the slots and the rules of each
+    # watched therapist, so changes made by every process are streamed
+    watches_changes = True
     
-    # Save updated slots
-    _save_therapist_slots(therapist_id, slots)
-    logger.info(f"Slot created successfully for therapist {therapist_id}")
+    def __init__(self, ref: Optional[db.Reference] = None):
+        """
+        Initialize the backend.
+        
+        Args:
+            ref: Reference to the appointments node. Defaults to the node of the
+                 Firebase app configured in app/config.py.
+        """
+        # Firebase app created for this backend, None when given a reference
+        self._app = None
+        if ref is None:
+            self._app = _acquire_app()
+            ref = db.reference('appointments', app=self._app)
+        
+        super().__init__()
+        
+        self.db_ref = ref
+        
+        # Therapists known to be stored in the partitioned layout. The legacy
+        # list probe only runs once per therapist per process.
+        self._partitioned_therapists = set()
     
-    return True
-
-
-def create_availability_range(therapist_id: str, start_time: datetime, end_time: datetime, slot_duration_minutes: int = 60) -> bool:
-    """
-    Create multiple free slots within a time range for a therapist.
+    def _get_legacy_slots(self, therapist_id: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        Get all slots for a therapist still stored in the legacy flat list layout.
+        
+        Args:
+            therapist_id: Unique identifier for the therapist
+        
+        Returns:
+            List of slot dictionaries, or None if the therapist uses the partitioned layout
+        """
+        if therapist_id in self._partitioned_therapists:
+            return None
+        
+        therapist_ref = self.db_ref.child(therapist_id)
+        
+        # Legacy lists are stored with integer keys, partitioned nodes with dates and
+        # underscored names. The keys alone are enough, and a sparse list may lack any index.
+        keys = therapist_ref.get(shallow=True)
+        if not isinstance(keys, dict) or not any(key.isdigit() for key in keys):
+            self._partitioned_therapists.add(therapist_id)
+            return None
+        
+        slots_data = therapist_ref.get()
+        if isinstance(slots_data, list):
+            return [slot for slot in slots_data if slot is not None]
+        if isinstance(slots_data, dict):
+            # Sparse arrays come back as dictionaries keyed by index
+            return [slots_data[key] for key in sorted((key for key in slots_data if key.isdigit()), key=int)]
+        return []
     
-    Args:
-        therapist_id: Unique identifier for the therapist
-        start_time: Start time of the availability range
-        end_time: End time of the availability range
-        slot_duration_minutes: Duration of each slot in minutes (default is 60)
+    def _migrate_legacy_slots(self, therapist_id: str) -> None:
+        """
+        Rewrite a therapist's legacy flat list into the partitioned layout.
+        
+        Does nothing if the therapist already uses the partitioned layout.
+        
+        Args:
+            therapist_id: Unique identifier for the therapist
+        """
+        legacy_slots = self._get_legacy_slots(therapist_id)
+        if legacy_slots is None:
+            return
+        
+        partitioned: Dict[str, Dict[str, Any]] = {}
+        slots = [TimeSlot.from_dict(slot_dict) for slot_dict in legacy_slots]
+        for slot in slots:
+            partitioned.setdefault(_day_key(slot.start_date), {})[_slot_key(slot.start)] = slot.to_wire()
+        updates: Dict[str, Any] = {therapist_id: partitioned}
+        if slots:
+            updates[f"{_STATS_KEY}/{therapist_id}"] = {_day_key(day): counts for day, counts in count_slots_by_day(slots).items()}
+        
+        self.db_ref.update(updates)
+        self._partitioned_therapists.add(therapist_id)
+        logger.info(f"Migrated {len(legacy_slots)} legacy slots for therapist {therapist_id}")
+    
+    def _get_therapist_slots(self, therapist_id: str, first_day: date, last_day: date) -> List[TimeSlot]:
+        """
+        Get the slots of a therapist that start within a range of days.
+        
+        Args:
+            therapist_id: Unique identifier for the therapist
+            first_day: First day of the range (inclusive)
+            last_day: Last day of the range (inclusive)
+        
+        Returns:
+            List of slots ordered by start time
+        """
+        therapist_ref = self.db_ref.child(therapist_id)
+        
+        if first_day == last_day:
+            day_data = therapist_ref.child(_day_key(first_day)).get()
+            days_data = {_day_key(first_day): day_data} if day_data else {}
+        else:
+            days_data = therapist_ref.order_by_key() \
+                .start_at(_day_key(first_day)) \
+                .end_at(_day_key(last_day)) \
+                .get() or {}
+        
+        if days_data:
+            self._partitioned_therapists.add(therapist_id)
+            return [TimeSlot.from_dict(slot_dict) for slot_dict in _flatten_days(days_data)]
+        
+        # Nothing in the partitioned layout, the therapist may not be migrated yet
+        legacy_slots = self._get_legacy_slots(therapist_id)
+        if legacy_slots is None:
+            return []
+        
+        slots = [TimeSlot.from_dict(slot_dict) for slot_dict in legacy_slots]
+        return sorted(
+            (slot for slot in slots if first_day <= slot.start_date <= last_day),
+            key=lambda slot: slot.start
+        )
+    
+    def _save_therapist_slots(self, therapist_id: str, slots: List[TimeSlot], stats_delta: Dict[date, Dict[str, int]]) -> None:
+        """
+        Save slots for a therapist, writing only the nodes of the given slots.
+        
+        The slots and the counter increments go out as one multi-path update,
+        which the database applies atomically.
+        
+        Args:
+            therapist_id: Unique identifier for the therapist
+            slots: List of slots to save
+            stats_delta: Amounts to add to the per-day counters
+        
+        Raises:
+            Exception: If there's an error saving the slots
+        """
+        try:
+            self._migrate_legacy_slots(therapist_id)
+            updates = {f"{therapist_id}/{_slot_path(slot.start)}": slot.to_wire() for slot in slots}
+            updates.update(_stats_updates(therapist_id, stats_delta))
+            self.db_ref.update(updates)
+        except Exception as e:
+            logger.error(f"Error saving slots for therapist {therapist_id}: {e}")
+            raise
+    
+    def _save_slots_bulk(self, slots_by_therapist: Dict[str, List[TimeSlot]]) -> None:
+        """
+        Save new slots of several therapists, with their counters, in one multi-path update.
+        
+        Args:
+            slots_by_therapist: New slots of each therapist
+        
+        Raises:
+            Exception: If there's an error saving the slots
+        """
+        try:
+            updates: Dict[str, Any] = {}
+            for therapist_id, slots in slots_by_therapist.items():
+                self._migrate_legacy_slots(therapist_id)
+                updates.update({f"{therapist_id}/{_slot_path(slot.start)}": slot.to_wire() for slot in slots})
+                updates.update(_stats_updates(therapist_id, count_slots_by_day(slots)))
+            self.db_ref.update(updates)
+        except Exception as e:
+            logger.error(f"Error saving slots for {len(slots_by_therapist)} therapists: {e}")
+            raise
+    
+    def _transition_slot(self, therapist_id: str, slot_time: datetime, from_status: str, to_status: str) -> BookingResult:
+        """
+        Atomically move a slot from one status to another.
+        
+        Runs a transaction on the slot node only, so concurrent writers to other
+        slots never interfere and two writers racing for the same slot cannot both win.
+        The day's counters are then moved with server-side increments; a crash
+        between the two writes leaves them off by one until repair_stats() runs.
+        
+        Args:
+            therapist_id: Unique identifier for the therapist
+            slot_time: Start time of the slot
+            from_status: Status the slot must have for the transition to apply
+            to_status: Status to set
+        
+        Returns:
+            BookingResult: SUCCESS, NOT_FOUND or CONFLICT
+        """
+        return self._transition_slots(therapist_id, [slot_time], from_status, to_status, False)[0]
+    
+    def _transition_slots(self, therapist_id: str, slot_times: List[datetime], from_status: str, to_status: str, all_or_nothing: bool) -> List[BookingResult]:
+        """
+        Move several slots of one therapist from one status to another.
+        
+        Every slot is moved by its own transaction; the counters of all of
+        them are then moved by a single multi-path update. In all-or-nothing
+        mode the successful slots are moved back if any fails.
+        
+        Args:
+            therapist_id: Unique identifier for the therapist
+            slot_times: Start times of the slots
+            from_status: Status the slots must have for the transition to apply
+            to_status: Status to set
+            all_or_nothing: If True, leave every slot untouched unless all succeed
+        
+        Returns:
+            List[BookingResult]: Outcome of each slot; in all-or-nothing mode the
+            slots moved back because of another failure are ABORTED
+        """
+        self._migrate_legacy_slots(therapist_id)
+        results = [self._transition_slot_node(therapist_id, slot_time, from_status, to_status) for slot_time in slot_times]
+        
+        if all_or_nothing and not all(results):
+            for slot_time, result in zip(slot_times, results):
+                if result:
+                    self._transition_slot_node(therapist_id, slot_time, to_status, from_status)
+            return [BookingResult.ABORTED if result else result for result in results]
+        
+        stats_delta: Dict[date, Dict[str, int]] = {}
+        for slot_time, result in zip(slot_times, results):
+            if result:
+                delta = stats_delta.setdefault(slot_time.date(), {from_status: 0, to_status: 0})
+                delta[from_status] -= 1
+                delta[to_status] += 1
+        if stats_delta:
+            self.db_ref.update(_stats_updates(therapist_id, stats_delta))
+        
+        return results
+    
+    def _transition_slot_node(self, therapist_id: str, slot_time: datetime, from_status: str, to_status: str) -> BookingResult:
+        """Run the transaction moving a single slot node, leaving the counters alone."""
+        slot_ref = self.db_ref.child(therapist_id).child(_slot_path(to_epoch(slot_time)))
+        
+        def apply_transition(slot_dict: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+            if slot_dict is None:
+                raise _SlotNotFound()
+            slot = TimeSlot.from_dict(slot_dict)
+            if slot.status != from_status:
+                raise _SlotConflict()
+            slot.status = to_status
+            return slot.to_wire()
+        
+        try:
+            slot_ref.transaction(apply_transition)
+        except _SlotNotFound:
+            return BookingResult.NOT_FOUND
+        except (_SlotConflict, db.TransactionAbortedError):
+            # TransactionAbortedError means the slot kept changing under us
+            return BookingResult.CONFLICT
+        
+        return BookingResult.SUCCESS
+    
+    def _add_missing_slots(self, therapist_id: str, slots: List[TimeSlot]) -> List[TimeSlot]:
+        """
+        Save the given slots of a therapist that do not exist yet, with their counters.
+        
+        Each slot is created by a transaction on its own node that aborts if
+        the node exists, so a slot booked in the meantime is never overwritten.
+        The counters of the created slots then go out as one multi-path update.
+        
+        Args:
+            therapist_id: Unique identifier for the therapist
+            slots: Slots to add, ordered by start time
+        
+        Returns:
+            List[TimeSlot]: Slots actually added
+        """
+        self._migrate_legacy_slots(therapist_id)
+        added = [slot for slot in slots if self._create_slot_node(therapist_id, slot)]
+        if added:
+            self.db_ref.update(_stats_updates(therapist_id, count_slots_by_day(added)))
+        return added
+    
+    def _create_slot_node(self, therapist_id: str, slot: TimeSlot) -> bool:
+        """Run the transaction creating a single slot node if it does not exist, leaving the counters alone."""
+        slot_ref = self.db_ref.child(therapist_id).child(_slot_path(slot.start))
+        
+        def create(slot_dict: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+            if slot_dict is not None:
+                raise _SlotConflict()
+            return slot.to_wire()
+        
+        try:
+            slot_ref.transaction(create)
+        except (_SlotConflict, db.TransactionAbortedError):
+            return False
         
-    Returns:
-        bool: True if all slots were created successfully, False otherwise
-    """
-    logger.info(f"Creating availability range for therapist {therapist_id} from {start_time} to {end_time}")
-    
-    # Calculate time slots
-    current_start = start_time
-    slots_created = 0
-    
-    # Get existing slots
-    existing_slots = _get_therapist_slots(therapist_id)
-    new_slots = []
-    
-    # Create slot objects for the entire range
-    while current_start < end_time:
-        slot_end = current_start + timedelta(minutes=slot_duration_minutes)
-        
-        # Make sure we don't go beyond the end time
-        if slot_end > end_time:
-            slot_end = end_time
-            
-        # Only create complete slots if they are at least the minimum duration
-        if (slot_end - current_start).total_seconds() / 60 >= slot_duration_minutes:
-            # Check for overlap with existing slots
-            is_overlapping = False
-            for slot_dict in existing_slots:
-                slot = TimeSlot.from_dict(slot_dict)
-                if (current_start < slot.end_time and slot_end > slot.start_time):
-                    is_overlapping = True
-                    logger.warning(f"Skipping overlapping slot: {current_start} - {slot_end}")
-                    break
-            
-            if not is_overlapping:
-                new_slot = TimeSlot(start_time=current_start, end_time=slot_end)
-                new_slots.append(new_slot.to_dict())
-                slots_created += 1
-        
-        # Move to next slot
-        current_start = slot_end
-    
-    # If slots were created, save them
-    if slots_created > 0:
-        all_slots = existing_slots + new_slots
-        _save_therapist_slots(therapist_id, all_slots)
-        logger.info(f"Created {slots_created} slots for therapist {therapist_id}")
         return True
     
-    logger.warning(f"No slots created for therapist {therapist_id}")
-    return False
-
-
-def list_available_slots(therapist_id: str, search_date: date) -> List[TimeSlot]:
-    """
-    List available (free) slots for a therapist on a specific date.
+    def _remove_free_slots(self, therapist_id: str, slots: List[TimeSlot]) -> List[TimeSlot]:
+        """
+        Delete the given slots of a therapist that are still free, with their counters.
+        
+        Each slot is deleted by a transaction on its own node that aborts
+        unless the slot is free, so a slot booked in the meantime is kept. The
+        counters of the deleted slots then go out as one multi-path update.
+        
+        Args:
+            therapist_id: Unique identifier for the therapist
+            slots: Slots to delete
+        
+        Returns:
+            List[TimeSlot]: Slots actually deleted
+        """
+        removed = [slot for slot in slots if self._delete_free_slot_node(therapist_id, slot)]
+        stats_delta: Dict[date, Dict[str, int]] = {}
+        for slot in removed:
+            delta = stats_delta.setdefault(slot.start_date, {"free": 0, "total": 0})
+            delta["free"] -= 1
+            delta["total"] -= 1
+        if stats_delta:
+            self.db_ref.update(_stats_updates(therapist_id, stats_delta))
+        return removed
     
-    Args:
-        therapist_id: Unique identifier for the therapist
-        search_date: Date to search for available slots
+    def _delete_free_slot_node(self, therapist_id: str, slot: TimeSlot) -> bool:
+        """
+        Run the transaction deleting a single slot node if it is free, leaving the counters alone.
         
-    Returns:
-        List[TimeSlot]: List of available time slots
-    """
-    # Get slots
-    slots = _get_therapist_slots(therapist_id)
+        A transaction cannot return None, so it runs on the date node and
+        returns it without the slot; an empty date node is deleted.
+        """
+        day_ref = self.db_ref.child(therapist_id).child(_day_key(slot.start_date))
+        key = _slot_key(slot.start)
+        
+        def delete(day_dict: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+            if not isinstance(day_dict, dict) or not isinstance(day_dict.get(key), dict):
+                raise _SlotConflict()
+            if TimeSlot.from_dict(day_dict[key]).status != "free":
+                raise _SlotConflict()
+            return {slot_key: slot_dict for slot_key, slot_dict in day_dict.items() if slot_key != key}
+        
+        try:
+            day_ref.transaction(delete)
+        except (_SlotConflict, db.TransactionAbortedError):
+            return False
+        
+        return True
     
-    # Filter slots by date and status
-    available_slots = []
-    for slot_dict in slots:
-        slot = TimeSlot.from_dict(slot_dict)
-        slot_date = slot.start_time.date()
+    def _get_day_stats(self, therapist_id: str, day: date) -> Optional[Dict[str, int]]:
+        """
+        Get the counters of a therapist on a day.
+        
+        Args:
+            therapist_id: Unique identifier for the therapist
+            day: Day of the counters
         
-        if slot_date == search_date and slot.status == "free":
-            available_slots.append(slot)
+        Returns:
+            Dict with free, busy and total counts, or None if the day has no counters
+        """
+        stats = self.db_ref.child(_STATS_KEY).child(therapist_id).child(_day_key(day)).get()
+        if not isinstance(stats, dict):
+            return None
+        return {field: int(stats.get(field, 0)) for field in STATS_FIELDS}
     
-    return available_slots
-
-
-def list_all_slots(therapist_id: str, search_date: date) -> List[TimeSlot]:
-    """
-    List all slots (both free and busy) for a therapist on a specific date.
+    def _replace_day_stats(self, therapist_id: str, first_day: date, last_day: date, stats: Dict[date, Dict[str, int]]) -> None:
+        """
+        Replace every counter of a therapist within a range of days in one multi-path update.
+        
+        Args:
+            therapist_id: Unique identifier for the therapist
+            first_day: First day of the range (inclusive)
+            last_day: Last day of the range (inclusive)
+            stats: New counters by day; days of the range missing from it lose their counters
+        """
+        self._migrate_legacy_slots(therapist_id)
+        
+        existing = self.db_ref.child(_STATS_KEY).child(therapist_id).order_by_key() \
+            .start_at(_day_key(first_day)) \
+            .end_at(_day_key(last_day)) \
+            .get() or {}
+        
+        updates: Dict[str, Any] = {f"{_STATS_KEY}/{therapist_id}/{day_key}": None for day_key in existing}
+        updates.update({f"{_STATS_KEY}/{therapist_id}/{_day_key(day)}": counts for day, counts in stats.items()})
+        if updates:
+            self.db_ref.update(updates)
     
-    Args:
-        therapist_id: Unique identifier for the therapist
-        search_date: Date to search for slots
+    def _get_rules(self, therapist_id: str) -> List[AvailabilityRule]:
+        """
+        Get the availability rules of a therapist.
         
-    Returns:
-        List[TimeSlot]: List of all time slots
-    """
-    # Get slots
-    slots = _get_therapist_slots(therapist_id)
+        Args:
+            therapist_id: Unique identifier for the therapist
+        
+        Returns:
+            List of rules ordered by identifier
+        """
+        rules_data = self.db_ref.child(_RULES_KEY).child(therapist_id).get()
+        if not isinstance(rules_data, dict):
+            return []
+        return [AvailabilityRule.from_dict({**rules_data[rule_id], "rule_id": rule_id}) for rule_id in sorted(rules_data)]
     
-    # Filter slots by date only, not by status
-    all_slots = []
-    for slot_dict in slots:
-        slot = TimeSlot.from_dict(slot_dict)
-        slot_date = slot.start_time.date()
+    def _save_rule(self, therapist_id: str, rule: AvailabilityRule) -> None:
+        """
+        Save an availability rule of a therapist, replacing a rule with the same identifier.
         
-        if slot_date == search_date:
-            all_slots.append(slot)
+        Args:
+            therapist_id: Unique identifier for the therapist
+            rule: Rule to save
+        """
+        self.db_ref.child(_RULES_KEY).child(therapist_id).child(rule.rule_id).set(rule.to_dict())
     
-    return all_slots
-
-
-def book_slot(therapist_id: str, slot_time: datetime) -> bool:
-    """
-    Book a slot with a therapist.
+    def _delete_rule(self, therapist_id: str, rule_id: str) -> bool:
+        """
+        Delete an availability rule of a therapist.
+        
+        Args:
+            therapist_id: Unique identifier for the therapist
+            rule_id: Unique identifier of the rule
+        
+        Returns:
+            bool: True if the rule existed
+        """
+        rule_ref = self.db_ref.child(_RULES_KEY).child(therapist_id).child(rule_id)
+        if rule_ref.get(shallow=True) is None:
+            return False
+        rule_ref.delete()
+        return True
     
-    Args:
-        therapist_id: Unique identifier for the therapist
-        slot_time: Start time of the slot to book
+    def _get_archived_slots(self, therapist_id: str, first_month: date, last_month: date) -> List[TimeSlot]:
+        """
+        Get the archived slots of a therapist within a range of months.
         
-    Returns:
-        bool: True if booking was successful, False otherwise
-    """
-    # Get slots
-    slots = _get_therapist_slots(therapist_id)
-    
-    # Find and update the slot
-    for i, slot_dict in enumerate(slots):
-        slot = TimeSlot.from_dict(slot_dict)
-        
-        # Check if this is the slot we want to book
-        if slot.start_time == slot_time:
-            # Check if slot is already booked
-            if slot.status == "busy":
-                logger.info(f"Booking failed for therapist {therapist_id}: slot already booked")
-                return False
-            
-            # Update slot status to busy
-            slots[i]["status"] = "busy"
-            _save_therapist_slots(therapist_id, slots)
-            logger.info(f"Slot booked successfully for therapist {therapist_id}")
-            return True
-    
-    logger.info(f"Booking failed for therapist {therapist_id}: slot not found")
-    return False  # Slot not found
-
-
-def cancel_booking(therapist_id: str, slot_time: datetime) -> bool:
-    """
-    Cancel a booked slot.
+        Args:
+            therapist_id: Unique identifier for the therapist
+            first_month: First day of the first month (inclusive)
+            last_month: First day of the last month (inclusive)
+        
+        Returns:
+            List of slots ordered by start time
+        """
+        archive_ref = self.db_ref.child(_ARCHIVE_KEY).child(therapist_id)
+        
+        if first_month == last_month:
+            data = archive_ref.child(month_key(first_month)).get()
+            archives = {month_key(first_month): data} if data else {}
+        else:
+            archives = archive_ref.order_by_key() \
+                .start_at(month_key(first_month)) \
+                .end_at(month_key(last_month)) \
+                .get() or {}
+        
+        return [slot for key in sorted(archives) for slot in decode_slots(base64.b64decode(archives[key]))]
     
-    Args:
-        therapist_id: Unique identifier for the therapist
-        slot_time: Start time of the booked slot
+    def _archive_month(self, therapist_id: str, month: date, archive: List[TimeSlot], archived_slots: List[TimeSlot]) -> None:
+        """
+        Replace the archive of a month and delete the archived slot nodes in
+        one multi-path update.
         
-    Returns:
-        bool: True if cancellation was successful, False otherwise
-    """
-    # Get slots
-    slots = _get_therapist_slots(therapist_id)
-    
-    # Find and update the slot
-    for i, slot_dict in enumerate(slots):
-        slot = TimeSlot.from_dict(slot_dict)
-        
-        # Check if this is the slot we want to cancel
-        if slot.start_time == slot_time:
-            # Check if slot is actually booked
-            if slot.status == "free":
-                logger.info(f"Cancellation failed for therapist {therapist_id}: slot is not booked")
-                return False
-            
-            # Update slot status to free
-            slots[i]["status"] = "free"
-            _save_therapist_slots(therapist_id, slots)
-            logger.info(f"Booking cancelled successfully for therapist {therapist_id}")
-            return True
-    
-    logger.info(f"Cancellation failed for therapist {therapist_id}: slot not found")
-    return False  # Slot not found 
\ No newline at end of file
+        Only the nodes of the archived slots are deleted, so a slot written to
+        the month in the meantime stays in the working set until the next run.
+        
+        Args:
+            therapist_id: Unique identifier for the therapist
+            month: First day of the month
+            archive: Every slot of the month's archive, ordered by start time
+            archived_slots: Slots of the working set moved into the archive
+        """
+        self._migrate_legacy_slots(therapist_id)
+        updates: Dict[str, Any] = {
+            f"{_ARCHIVE_KEY}/{therapist_id}/{month_key(month)}": base64.b64encode(encode_slots(archive)).decode("ascii")
+        }
+        updates.update({f"{therapist_id}/{_slot_path(slot.start)}": None for slot in archived_slots})
+        self.db_ref.update(updates)
+    
+    def _list_therapist_ids(self) -> List[str]:
+        """
+        List every therapist with stored slots, counters or rules.
+        
+        Returns:
+            List of therapist identifiers
+        """
+        therapist_ids = {key for key in self.db_ref.get(shallow=True) or {} if not key.startswith("_")}
+        for key in (_STATS_KEY, _RULES_KEY):
+            therapist_ids.update(self.db_ref.child(key).get(shallow=True) or {})
+        return sorted(therapist_ids)
+    
+    def _watch_changes(self, therapist_id: str) -> Any:
+        """
+        Listen to the changes of a therapist's slots and rules and publish them as slot events.
+        
+        The therapist node holds only dates, so neither the counters nor the
+        archives are downloaded by its listener. Each listener first receives
+        the current data of its node, which is skipped; every later change is
+        published to the therapist's subscribers, a rule change as a resync.
+        
+        Args:
+            therapist_id: Unique identifier for the therapist
+        
+        Returns:
+            The listener registrations of the slots and the rules
+        """
+        initial = {"slots": True, "rules": True}
+        
+        def is_initial(node: str, event: Any) -> bool:
+            if initial[node] and event.event_type == "put" and event.path == "/":
+                initial[node] = False
+                return True
+            return False
+        
+        def on_slots_change(event: Any) -> None:
+            if is_initial("slots", event):
+                return
+            try:
+                for event_type, slots in _changes_from_event(event.event_type, event.path, event.data):
+                    self.events.publish(therapist_id, event_type, slots)
+            except Exception as e:
+                logger.error(f"Error handling a change of therapist {therapist_id}: {e}")
+                self.events.publish(therapist_id, "resync")
+        
+        def on_rules_change(event: Any) -> None:
+            if not is_initial("rules", event):
+                self.events.publish(therapist_id, "resync")
+        
+        logger.info(f"Listening to the changes of therapist {therapist_id}")
+        slots_listener = self.db_ref.child(therapist_id).listen(on_slots_change)
+        try:
+            return slots_listener, self.db_ref.child(_RULES_KEY).child(therapist_id).listen(on_rules_change)
+        except Exception:
+            slots_listener.close()
+            raise
+    
+    def _unwatch_changes(self, handle: Any) -> None:
+        """
+        Close the listeners started by _watch_changes().
+        
+        Args:
+            handle: The listener registrations
+        """
+        for listener in handle:
+            listener.close()
+    
+    def close(self) -> None:
+        """Stop the change listeners and release the connections of the backend's Firebase app."""
+        self.events.close_all()
+        if self._app is not None:
+            _release_app(self._app)
+            self._app = None
+    
+    def _after_fork(self) -> None:
+        """Move to a Firebase app of the child process, leaving the parent's app and connections alone."""
+        super()._after_fork()
+        if self._app is not None:
+            self._app = _acquire_app()
+            self.db_ref = db.reference('appointments', app=self._app)
@@ -0,0 +1,204 @@
+"""
+Per-therapist write locks of the storage backends.
+
+Read-modify-write operations, such as the overlap check of a new slot and
+the write it guards, hold the lock of their therapist, so concurrent writers
+of one therapist run one after another while writers of other therapists
+proceed in parallel. Therapists are hashed onto a fixed number of striped
+locks, which bounds memory whatever the number of therapists.
+
+When a lock directory is configured, each stripe is also backed by an
+advisory lock file (fcntl.flock), which extends the locks to every process
+on the host using the same directory, e.g. the workers of a WSGI server.
+"""
+from contextlib import contextmanager
+from pathlib import Path
+from time import monotonic, perf_counter, sleep
+from typing import Any, Dict, Iterable, Iterator, Optional
+import logging
+import os
+import threading
+import zlib
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows
+    fcntl = None
+
+from app.utils.metrics import REGISTRY
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Lock waits are mostly far below the request latency buckets
+WAIT_BUCKETS = (0.0001, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+
+# Longest pause between two attempts at a lock file held by another process
+MAX_FILE_POLL_SECONDS = 0.05
+
+LOCK_WAIT_SECONDS = REGISTRY.histogram(
+    "backend_lock_wait_seconds",
+    "Time spent acquiring per-therapist write locks, per backend and lock (thread or process)",
+    ("backend", "lock"),
+    buckets=WAIT_BUCKETS
+)
+LOCK_CONTENDED = REGISTRY.counter(
+    "backend_lock_contended_total",
+    "Write lock acquisitions that had to wait for another holder, per backend and lock",
+    ("backend", "lock")
+)
+LOCK_TIMEOUTS = REGISTRY.counter(
+    "backend_lock_timeouts_total",
+    "Write lock acquisitions that gave up after the timeout, per backend and lock",
+    ("backend", "lock")
+)
+
+
+class LockTimeout(TimeoutError):
+    """Raised when a write lock is still held by another writer after the timeout."""
+
+
+class TherapistLocks:
+    """
+    Striped write locks keyed by therapist, optionally shared across processes.
+    
+    Locks are reentrant, so an operation holding a therapist's lock can call
+    another one that takes it again. Several therapists are locked at once
+    with hold(), which takes their stripes in a fixed order so concurrent
+    holders cannot deadlock.
+    """
+    
+    def __init__(self, backend: str, stripes: int = 64, directory: Optional[str] = None, timeout: float = 30.0):
+        """
+        Initialize the locks.
+        
+        Args:
+            backend: Name of the backend, for the metrics and the lock file names
+            stripes: Number of locks therapists are spread over
+            directory: Directory of the lock files shared with other processes,
+                       or None to lock within this process only
+            timeout: Seconds to wait for a lock before raising LockTimeout
+        """
+        self.backend = backend
+        self.stripes = max(1, stripes)
+        self.timeout = timeout
+        
+        self.directory = Path(directory) if directory else None
+        if self.directory is not None and fcntl is None:
+            logger.warning("Cross-process write locks need fcntl, which this platform lacks; locking within the process only")
+            self.directory = None
+        if self.directory is not None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+        
+        self._reset()
+    
+    def _reset(self) -> None:
+        """Create the locks of the current process."""
+        self._pid = os.getpid()
+        self._locks = [threading.RLock() for _ in range(self.stripes)]
+        # Nesting depth of each stripe's holder, guarded by the stripe's lock
+        self._depths = [0] * self.stripes
+        self._files: Dict[int, Any] = {}
+        self._files_lock = threading.Lock()
+    
+    @property
+    def cross_process(self) -> bool:
+        """Whether the locks are shared with other processes."""
+        return self.directory is not None
+    
+    def stripe(self, therapist_id: str) -> int:
+        """Return the stripe of a therapist, the same in every process."""
+        return zlib.crc32(therapist_id.encode("utf-8")) % self.stripes
+    
+    @contextmanager
+    def hold(self, therapist_ids: Iterable[str]) -> Iterator[None]:
+        """
+        Hold the write locks of one or more therapists.
+        
+        Args:
+            therapist_ids: Therapists to lock
+        
+        Raises:
+            LockTimeout: If a lock could not be acquired within the timeout
+        """
+        if self._pid != os.getpid():
+            # Forked: locks held by threads of the parent would never be released here,
+            # and inherited lock files share their locks with the parent
+            self._reset()
+        
+        deadline = monotonic() + self.timeout
+        held = []
+        try:
+            for stripe in sorted({self.stripe(therapist_id) for therapist_id in therapist_ids}):
+                self._acquire_stripe(stripe, deadline)
+                held.append(stripe)
+            yield
+        finally:
+            for stripe in reversed(held):
+                self._release_stripe(stripe)
+    
+    def _acquire_stripe(self, stripe: int, deadline: float) -> None:
+        """Acquire the thread lock of a stripe and, on first entry, its lock file."""
+        self._acquire_thread_lock(stripe, deadline)
+        if self._depths[stripe] == 0 and self.directory is not None:
+            try:
+                self._acquire_file_lock(stripe, deadline)
+            except BaseException:
+                self._locks[stripe].release()
+                raise
+        self._depths[stripe] += 1
+    
+    def _release_stripe(self, stripe: int) -> None:
+        self._depths[stripe] -= 1
+        if self._depths[stripe] == 0 and self.directory is not None:
+            fcntl.flock(self._files[stripe].fileno(), fcntl.LOCK_UN)
+        self._locks[stripe].release()
+    
+    def _acquire_thread_lock(self, stripe: int, deadline: float) -> None:
+        lock = self._locks[stripe]
+        if lock.acquire(blocking=False):
+            LOCK_WAIT_SECONDS.observe(0.0, self.backend, "thread")
+            return
+        
+        LOCK_CONTENDED.inc(self.backend, "thread")
+        started = perf_counter()
+        acquired = lock.acquire(timeout=max(0.0, deadline - monotonic()))
+        LOCK_WAIT_SECONDS.observe(perf_counter() - started, self.backend, "thread")
+        if not acquired:
+            LOCK_TIMEOUTS.inc(self.backend, "thread")
+            raise LockTimeout(f"Timed out after {self.timeout:g}s waiting for write lock stripe {stripe} of the {self.backend} backend")
+    
+    def _lock_file(self, stripe: int) -> Any:
+        """Return the open lock file of a stripe, opening it on first use."""
+        with self._files_lock:
+            handle = self._files.get(stripe)
+            if handle is None:
+                handle = open(self.directory / f"{self.backend}-{stripe}.lock", "a+b")
+                self._files[stripe] = handle
+            return handle
+    
+    def _acquire_file_lock(self, stripe: int, deadline: float) -> None:
+        # flock() cannot time out, so a held lock is polled with a growing pause
+        descriptor = self._lock_file(stripe).fileno()
+        started = perf_counter()
+        pause = 0.001
+        contended = False
+        while True:
+            try:
+                fcntl.flock(descriptor, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                pass
+            
+            if not contended:
+                LOCK_CONTENDED.inc(self.backend, "process")
+                contended = True
+            remaining = deadline - monotonic()
+            if remaining <= 0:
+                LOCK_WAIT_SECONDS.observe(perf_counter() - started, self.backend, "process")
+                LOCK_TIMEOUTS.inc(self.backend, "process")
+                raise LockTimeout(f"Timed out after {self.timeout:g}s waiting for lock file {stripe} of the {self.backend} backend")
+            sleep(min(pause, remaining))
+            pause = min(pause * 2, MAX_FILE_POLL_SECONDS)
+        
+        LOCK_WAIT_SECONDS.observe(perf_counter() - started, self.backend, "process")
@@ -0,0 +1,139 @@
+"""
+Sorted slot index used for overlap checks and start time lookups.
+"""
+from bisect import bisect_left, bisect_right
+from typing import Iterable, Iterator, List, Optional, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from app.integrations.base import TimeSlot
+
+
+class SlotIndex:
+    """
+    Slots of one therapist kept sorted by start time.
+    
+    Times are compared as epoch seconds, the compact form slots carry, so no
+    datetime is built while checking overlaps or looking slots up.
+    
+    Alongside the sorted start times the index keeps the running maximum of
+    the end times, so an overlap check is a single bisect even if the stored
+    slots were ever allowed to overlap each other.
+    """
+    
+    def __init__(self, slots: Iterable['TimeSlot'] = ()):
+        """
+        Initialize the index.
+        
+        Args:
+            slots: Slots to index, in any order. Backends return them sorted,
+                   which makes building the index linear.
+        """
+        self._rebuild(sorted(slots, key=lambda slot: slot.start))
+    
+    def _rebuild(self, sorted_slots: List['TimeSlot']) -> None:
+        """Recompute the lookup arrays from a list of slots sorted by start time."""
+        self._slots = sorted_slots
+        self._starts = [slot.start for slot in sorted_slots]
+        self._max_ends = []
+        max_end = None
+        for slot in sorted_slots:
+            if max_end is None or slot.end > max_end:
+                max_end = slot.end
+            self._max_ends.append(max_end)
+    
+    def __len__(self) -> int:
+        return len(self._slots)
+    
+    def __iter__(self) -> Iterator['TimeSlot']:
+        return iter(self._slots)
+    
+    def find(self, start: int) -> Optional['TimeSlot']:
+        """
+        Find the slot starting at a given time.
+        
+        Args:
+            start: Start time of the slot in epoch seconds
+        
+        Returns:
+            The slot, or None if no slot starts at that time
+        """
+        i = bisect_left(self._starts, start)
+        if i < len(self._starts) and self._starts[i] == start:
+            return self._slots[i]
+        return None
+    
+    def overlaps(self, start: int, end: int) -> bool:
+        """
+        Check whether a time range overlaps any indexed slot.
+        
+        Args:
+            start: Start of the range in epoch seconds
+            end: End of the range in epoch seconds
+        
+        Returns:
+            bool: True if an indexed slot overlaps the range
+        """
+        # Slots starting before the range ends are candidates; one of them
+        # overlaps if the latest end among them is after the range starts
+        i = bisect_left(self._starts, end)
+        return i > 0 and self._max_ends[i - 1] > start
+    
+    def between(self, start: int, end: int) -> List['TimeSlot']:
+        """
+        Get the slots starting within a time range.
+        
+        Args:
+            start: Start of the range in epoch seconds (inclusive)
+            end: End of the range in epoch seconds (exclusive)
+        
+        Returns:
+            List of slots ordered by start time
+        """
+        return self._slots[bisect_left(self._starts, start):bisect_left(self._starts, end)]
+    
+    def add(self, slot: 'TimeSlot') -> None:
+        """Insert a single slot, keeping the index sorted."""
+        i = bisect_right(self._starts, slot.start)
+        self._rebuild(self._slots[:i] + [slot] + self._slots[i:])
+    
+    def merge(self, candidates: Iterable['TimeSlot']) -> Tuple[List['TimeSlot'], List['TimeSlot']]:
+        """
+        Insert non-overlapping slots sorted by start time in a single merge sweep.
+        
+        Candidates overlapping an indexed slot are skipped. The candidates
+        themselves must not overlap each other, as is the case for a
+        generated availability range.
+        
+        Args:
+            candidates: Slots to insert, sorted by start time
+        
+        Returns:
+            Tuple of (inserted slots, skipped slots)
+        """
+        merged = []
+        inserted = []
+        skipped = []
+        existing = self._slots
+        max_ends = self._max_ends
+        i = 0
+        
+        for candidate in candidates:
+            # Existing slots starting before the candidate ends are the only
+            # ones that can overlap it; move past them
+            while i < len(existing) and existing[i].start < candidate.end:
+                merged.append(existing[i])
+                i += 1
+            
+            if i > 0 and max_ends[i - 1] > candidate.start:
+                skipped.append(candidate)
+                continue
+            
+            # Every slot merged so far ends before the candidate starts
+            merged.append(candidate)
+            inserted.append(candidate)
+        
+        merged.extend(existing[i:])
+        if inserted:
+            self._rebuild(merged)
+        
+        return inserted, skipped
@@ -0,0 +1,439 @@
+from datetime import datetime, date, timedelta
+from contextlib import contextmanager
+from pathlib import Path
+from typing import List, Dict, Iterator, Optional
+import json
+import logging
+import sqlite3
+import threading
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+from app.config import active_config
+from app.integrations.archive import encode_slots, decode_slots
+from app.integrations.base import StorageBackend, TimeSlot, BookingResult, AvailabilityRule, STATUS_CODES, _BatchRejected
+from app.utils.date_utils import to_epoch, date_to_epoch
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS slots (
+    therapist_id TEXT NOT NULL,
+    start_time INTEGER NOT NULL,
+    end_time INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT 'free'
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_slots_therapist_start ON slots (therapist_id, start_time);
+CREATE INDEX IF NOT EXISTS idx_slots_start_status ON slots (start_time, status);
+CREATE TABLE IF NOT EXISTS slot_stats (
+    therapist_id TEXT NOT NULL,
+    day INTEGER NOT NULL,
+    free INTEGER NOT NULL DEFAULT 0,
+    busy INTEGER NOT NULL DEFAULT 0,
+    total INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (therapist_id, day)
+);
+CREATE TABLE IF NOT EXISTS availability_rules (
+    therapist_id TEXT NOT NULL,
+    rule_id TEXT NOT NULL,
+    rule TEXT NOT NULL,
+    PRIMARY KEY (therapist_id, rule_id)
+);
+CREATE TABLE IF NOT EXISTS slot_archive (
+    therapist_id TEXT NOT NULL,
+    month INTEGER NOT NULL,
+    slots BLOB NOT NULL,
+    PRIMARY KEY (therapist_id, month)
+);
+"""
+
+
+class SQLiteBackend(StorageBackend):
+    """
+    Local SQLite backend.
+    
+    Slots live in a single indexed table of a WAL-mode database file, so it
+    needs no network and readers never block the writer. Times are stored as
+    epoch seconds, which keeps range scans on the indexes cheap.
+    """
+    
+    name = "sqlite"
+    
+    # A slot row holds two integers and a status
+    slot_payload_bytes = 20
+    
+    # Every therapist lives in the same database file
+    atomic_batches = True
+    
+    def __init__(self, path: str = None):
+        """
+        Initialize the backend and create the schema if needed.
+        
+        Args:
+            path: Path of the database file. Defaults to SQLITE_PATH from app/config.py.
+        """
+        super().__init__()
+        self.path = path or active_config.SQLITE_PATH
+        if self.path != ":memory:":
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        
+        # One connection per thread, sqlite3 connections must not be shared
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        
+        self._connection().executescript(_SCHEMA)
+        logger.info(f"SQLite database ready at {self.path}")
+    
+    def _connection(self) -> sqlite3.Connection:
+        """Return the calling thread's connection, opening it on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Autocommit mode, transactions are opened explicitly in _transaction_scope
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+    
+    def close(self) -> None:
+        """Close every connection opened by the backend."""
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+        self._local = threading.local()
+    
+    def _after_fork(self) -> None:
+        """Forget the connections of the parent process; each thread of the child opens its own."""
+        super()._after_fork()
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+    
+    @contextmanager
+    def _transaction_scope(self, therapist_id: str) -> Iterator[None]:
+        """
+        Run a read-modify-write operation in one IMMEDIATE transaction.
+        
+        The write lock is taken up front, so the overlap check cannot be
+        invalidated by another writer before the insert commits. A scope
+        opened within another one runs in a savepoint, so it can roll back
+        its own writes and leave the enclosing transaction going.
+        """
+        conn = self._connection()
+        if conn.in_transaction:
+            conn.execute("SAVEPOINT nested_scope")
+            try:
+                yield
+            except BaseException:
+                conn.execute("ROLLBACK TO nested_scope")
+                conn.execute("RELEASE nested_scope")
+                raise
+            conn.execute("RELEASE nested_scope")
+            return
+        
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+    
+    def _get_therapist_slots(self, therapist_id: str, first_day: date, last_day: date) -> List[TimeSlot]:
+        """
+        Get the slots of a therapist that start within a range of days.
+        
+        Args:
+            therapist_id: Unique identifier for the therapist
+            first_day: First day of the range (inclusive)
+            last_day: Last day of the range (inclusive)
+        
+        Returns:
+            List of slots ordered by start time
+        """
+        rows = self._connection().execute(
+            "SELECT start_time, end_time, status FROM slots "
+            "WHERE therapist_id = ? AND start_time >= ? AND start_time < ? "
+            "ORDER BY start_time",
+            (therapist_id, date_to_epoch(first_day), date_to_epoch(last_day + timedelta(days=1)))
+        ).fetchall()
+        
+        return [
+            TimeSlot.from_epoch(start, end, STATUS_CODES[status])
+            for start, end, status in rows
+        ]
+    
+    def _add_day_stats(self, therapist_id: str, stats_delta: Dict[date, Dict[str, int]]) -> None:
+        """Add amounts to the per-day counters of a therapist. Caller runs it in a write scope."""
+        self._connection().executemany(
+            "INSERT INTO slot_stats (therapist_id, day, free, busy, total) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (therapist_id, day) DO UPDATE SET "
+            "free = free + excluded.free, busy = busy + excluded.busy, total = total + excluded.total",
+            [
+                (therapist_id, date_to_epoch(day), delta.get("free", 0), delta.get("busy", 0), delta.get("total", 0))
+                for day, delta in stats_delta.items()
+            ]
+        )
+    
+    def _save_therapist_slots(self, therapist_id: str, slots: List[TimeSlot], stats_delta: Dict[date, Dict[str, int]]) -> None:
+        """
+        Insert or update slots for a therapist and their counters in one transaction.
+        
+        Args:
+            therapist_id: Unique identifier for the therapist
+            slots: List of slots to save
+            stats_delta: Amounts to add to the per-day counters
+        
+        Raises:
+            sqlite3.Error: If there's an error saving the slots
+        """
+        try:
+            with self._write_scope(therapist_id):
+                self._connection().executemany(
+                    "INSERT INTO slots (therapist_id, start_time, end_time, status) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (therapist_id, start_time) DO UPDATE SET "
+                    "end_time = excluded.end_time, status = excluded.status",
+                    [
+                        (therapist_id, slot.start, slot.end, slot.status)
+                        for slot in slots
+                    ]
+                )
+                self._add_day_stats(therapist_id, stats_delta)
+        except sqlite3.Error as e:
+            logger.error(f"Error saving slots for therapist {therapist_id}: {e}")
+            raise
+    
+    def _transition_slot(self, therapist_id: str, slot_time: datetime, from_status: str, to_status: str) -> BookingResult:
+        """
+        Atomically move a slot from one status to another with a conditional update.
+        
+        Args:
+            therapist_id: Unique identifier for the therapist
+            slot_time: Start time of the slot
+            from_status: Status the slot must have for the transition to apply
+            to_status: Status to set
+        
+        Returns:
+            BookingResult: SUCCESS, NOT_FOUND or CONFLICT
+        """
+        with self._write_scope(therapist_id):
+            return self._apply_transition(therapist_id, slot_time, from_status, to_status)
+    
+    def _transition_slots(self, therapist_id: str, slot_times: List[datetime], from_status: str, to_status: str, all_or_nothing: bool) -> List[BookingResult]:
+        """
+        Move several slots of one therapist from one status to another in one transaction.
+        
+        Args:
+            therapist_id: Unique identifier for the therapist
+            slot_times: Start times of the slots
+            from_status: Status the slots must have for the transition to apply
+            to_status: Status to set
+            all_or_nothing: If True, roll the transaction back unless all succeed
+        
+        Returns:
+            List[BookingResult]: Outcome of each slot; in all-or-nothing mode the
+            slots rolled back because of another failure are ABORTED
+        """
+        results = []
+        try:
+            with self._write_scope(therapist_id):
+                for slot_time in slot_times:
+                    results.append(self._apply_transition(therapist_id, slot_time, from_status, to_status))
+                if all_or_nothing and not all(results):
+                    raise _BatchRejected()
+        except _BatchRejected:
+            return [BookingResult.ABORTED if result else result for result in results]
+        
+        return results
+    
+    def _apply_transition(self, therapist_id: str, slot_time: datetime, from_status: str, to_status: str) -> BookingResult:
+        """Run the conditional update of one slot and its counters. Caller runs it in a write scope."""
+        conn = self._connection()
+        updated = conn.execute(
+            "UPDATE slots SET status = ? WHERE therapist_id = ? AND start_time = ? AND status = ?",
+            (to_status, therapist_id, to_epoch(slot_time), from_status)
+        ).rowcount
+        if updated:
+            self._add_day_stats(therapist_id, {slot_time.date(): {from_status: -1, to_status: 1}})
+            return BookingResult.SUCCESS
+        
+        exists = conn.execute(
+            "SELECT 1 FROM slots WHERE therapist_id = ? AND start_time = ?",
+            (therapist_id, to_epoch(slot_time))
+        ).fetchone()
+        
+        return BookingResult.CONFLICT if exists else BookingResult.NOT_FOUND
+    
+    def _remove_free_slots(self, therapist_id: str, slots: List[TimeSlot]) -> List[TimeSlot]:
+        """
+        Delete the given slots of a therapist that are still free, with their counters, in one transaction.
+        
+        Args:
+            therapist_id: Unique identifier for the therapist
+            slots: Slots to delete
+        
+        Returns:
+            List[TimeSlot]: Slots actually deleted
+        """
+        conn = self._connection()
+        removed = []
+        stats_delta: Dict[date, Dict[str, int]] = {}
+        with self._write_scope(therapist_id):
+            for slot in slots:
+                deleted = conn.execute(
+                    "DELETE FROM slots WHERE therapist_id = ? AND start_time = ? AND status = 'free'",
+                    (therapist_id, slot.start)
+                ).rowcount
+                if deleted:
+                    removed.append(slot)
+                    delta = stats_delta.setdefault(slot.start_date, {"free": 0, "total": 0})
+                    delta["free"] -= 1
+                    delta["total"] -= 1
+            self._add_day_stats(therapist_id, stats_delta)
+        return removed
+    
+    def _get_day_stats(self, therapist_id: str, day: date) -> Optional[Dict[str, int]]:
+        """
+        Get the counters of a therapist on a day.
+        
+        Args:
+            therapist_id: Unique identifier for the therapist
+            day: Day of the counters
+        
+        Returns:
+            Dict with free, busy and total counts, or None if the day has no counters
+        """
+        row = self._connection().execute(
+            "SELECT free, busy, total FROM slot_stats WHERE therapist_id = ? AND day = ?",
+            (therapist_id, date_to_epoch(day))
+        ).fetchone()
+        
+        if row is None:
+            return None
+        return {"free": row[0], "busy": row[1], "total": row[2]}
+    
+    def _replace_day_stats(self, therapist_id: str, first_day: date, last_day: date, stats: Dict[date, Dict[str, int]]) -> None:
+        """
+        Replace every counter of a therapist within a range of days.
+        
+        Args:
+            therapist_id: Unique identifier for the therapist
+            first_day: First day of the range (inclusive)
+            last_day: Last day of the range (inclusive)
+            stats: New counters by day; days of the range missing from it lose their counters
+        """
+        conn = self._connection()
+        with self._write_scope(therapist_id):
+            conn.execute(
+                "DELETE FROM slot_stats WHERE therapist_id = ? AND day >= ? AND day <= ?",
+                (therapist_id, date_to_epoch(first_day), date_to_epoch(last_day))
+            )
+            self._add_day_stats(therapist_id, stats)
+    
+    def _get_rules(self, therapist_id: str) -> List[AvailabilityRule]:
+        """
+        Get the availability rules of a therapist.
+        
+        Rules are stored as JSON documents, since they are always read whole.
+        
+        Args:
+            therapist_id: Unique identifier for the therapist
+        
+        Returns:
+            List of rules in creation order
+        """
+        rows = self._connection().execute(
+            "SELECT rule FROM availability_rules WHERE therapist_id = ? ORDER BY rowid",
+            (therapist_id,)
+        ).fetchall()
+        return [AvailabilityRule.from_dict(json.loads(rule)) for (rule,) in rows]
+    
+    def _save_rule(self, therapist_id: str, rule: AvailabilityRule) -> None:
+        """
+        Save an availability rule of a therapist, replacing a rule with the same identifier.
+        
+        Args:
+            therapist_id: Unique identifier for the therapist
+            rule: Rule to save
+        """
+        with self._write_scope(therapist_id):
+            self._connection().execute(
+                "INSERT INTO availability_rules (therapist_id, rule_id, rule) VALUES (?, ?, ?) "
+                "ON CONFLICT (therapist_id, rule_id) DO UPDATE SET rule = excluded.rule",
+                (therapist_id, rule.rule_id, json.dumps(rule.to_dict()))
+            )
+    
+    def _delete_rule(self, therapist_id: str, rule_id: str) -> bool:
+        """
+        Delete an availability rule of a therapist.
+        
+        Args:
+            therapist_id: Unique identifier for the therapist
+            rule_id: Unique identifier of the rule
+        
+        Returns:
+            bool: True if the rule existed
+        """
+        with self._write_scope(therapist_id):
+            deleted = self._connection().execute(
+                "DELETE FROM availability_rules WHERE therapist_id = ? AND rule_id = ?",
+                (therapist_id, rule_id)
+            ).rowcount
+        return deleted > 0
+    
+    def _get_archived_slots(self, therapist_id: str, first_month: date, last_month: date) -> List[TimeSlot]:
+        """
+        Get the archived slots of a therapist within a range of months.
+        
+        Args:
+            therapist_id: Unique identifier for the therapist
+            first_month: First day of the first month (inclusive)
+            last_month: First day of the last month (inclusive)
+        
+        Returns:
+            List of slots ordered by start time
+        """
+        rows = self._connection().execute(
+            "SELECT slots FROM slot_archive WHERE therapist_id = ? AND month >= ? AND month <= ? ORDER BY month",
+            (therapist_id, date_to_epoch(first_month), date_to_epoch(last_month))
+        ).fetchall()
+        return [slot for (data,) in rows for slot in decode_slots(data)]
+    
+    def _archive_month(self, therapist_id: str, month: date, archive: List[TimeSlot], archived_slots: List[TimeSlot]) -> None:
+        """
+        Replace the archive of a month and delete the archived rows in one transaction.
+        
+        Args:
+            therapist_id: Unique identifier for the therapist
+            month: First day of the month
+            archive: Every slot of the month's archive, ordered by start time
+            archived_slots: Slots of the working set moved into the archive
+        """
+        conn = self._connection()
+        with self._write_scope(therapist_id):
+            conn.execute(
+                "INSERT INTO slot_archive (therapist_id, month, slots) VALUES (?, ?, ?) "
+                "ON CONFLICT (therapist_id, month) DO UPDATE SET slots = excluded.slots",
+                (therapist_id, date_to_epoch(month), encode_slots(archive))
+            )
+            conn.executemany(
+                "DELETE FROM slots WHERE therapist_id = ? AND start_time = ?",
+                [(therapist_id, slot.start) for slot in archived_slots]
+            )
+    
+    def _list_therapist_ids(self) -> List[str]:
+        """
+        List every therapist with stored slots, counters or rules.
+        
+        Returns:
+            List of therapist identifiers
+        """
+        rows = self._connection().execute(
+            "SELECT therapist_id FROM slots UNION SELECT therapist_id FROM slot_stats "
+            "UNION SELECT therapist_id FROM availability_rules UNION SELECT therapist_id FROM slot_archive "
+            "ORDER BY therapist_id"
+        ).fetchall()
+        return [therapist_id for (therapist_id,) in rows]
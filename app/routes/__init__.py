@@ -1,3 +1,4 @@
 from app.routes.appointment_routes import appointment_bp
+from app.routes.metrics_routes import metrics_bp
 
-__all__ = ["appointment_bp"]
+__all__ = ["appointment_bp", "metrics_bp"]
@@ -1,18 +1,24 @@
-from datetime import datetime
-from typing import Dict, Any, List, Tuple, Union
+from array import array
+from datetime import datetime, date, time, timedelta
+from typing import Dict, Any, Callable, Iterable, List, Tuple, Union
+import hashlib
+import json
 import logging
 
-from flask import Blueprint, request, jsonify, Response
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 
+from app.config import active_config
+from app.integrations import BookingResult, TimeSlot, TooManySubscribers
 from app.services.appointment_service import AppointmentService
+from app.services.event_stream import iter_sse
+from app.services.export_service import iter_export_lines, gzip_stream
+from app.services.serialization import encode_slots_response, encode_tagged_slots_response
 from app.schemas.time_slot import (
     TimeSlotCreate, 
-    TimeSlotResponse, 
     TimeSlotBook,
-    TimeSlotCancel,
-    TimeSlotList
+    TimeSlotCancel
 )
-from app.utils.date_utils import is_valid_appointment_slot, is_valid_booking_time
+from app.utils.date_utils import is_valid_appointment_slot, is_valid_booking_time, parse_weekdays
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -22,6 +28,64 @@ appointment_bp = Blueprint('appointments', __name__, url_prefix='/api/appointmen
 appointment_service = AppointmentService()
 
 
+def _parse_range_bound(value: str, is_end: bool) -> datetime:
+    """
+    Parse a from/to query parameter given as a date (YYYY-MM-DD) or a datetime.
+    
+    A date-only end bound includes the whole day, so from=2023-06-05&to=2023-06-11
+    covers that week.
+    """
+    if len(value) == len("YYYY-MM-DD"):
+        day = date.fromisoformat(value)
+        return datetime.combine(day + timedelta(days=1) if is_end else day, datetime.min.time())
+    return datetime.fromisoformat(value)
+
+
+def _slots_etag(view: str, slots: Iterable[TimeSlot]) -> str:
+    """
+    Return a strong ETag for a listing of slots.
+    
+    The hash covers the view (endpoint and parameters) and the compact start,
+    end and status of every slot, so it is computed without building a single
+    datetime or serializing the response.
+    """
+    digest = hashlib.blake2b(view.encode("utf-8"), digest_size=16)
+    digest.update(array("q", [value for slot in slots for value in (slot.start, slot.end, slot.status_code)]).tobytes())
+    return digest.hexdigest()
+
+
+def _payload_etag(payload: Dict[str, Any]) -> str:
+    """Return a strong ETag for a small response, hashed from its canonical JSON."""
+    return hashlib.blake2b(json.dumps(payload, sort_keys=True, separators=(",", ":")).encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _conditional_json(etag: str, build: Callable[[], Union[Dict[str, Any], bytes]]) -> Tuple[Response, int]:
+    """
+    Answer a GET request with its ETag and Cache-Control headers.
+    
+    build() returns the payload, or its already encoded JSON bytes. If the
+    client already holds this version (If-None-Match), the response is an
+    empty 304 and build() is never called.
+    """
+    if request.if_none_match.contains_weak(etag):
+        response, status = Response(status=304), 304
+    else:
+        body = build()
+        response = Response(body, mimetype='application/json') if isinstance(body, bytes) else jsonify(body)
+        status = 200
+    
+    max_age = active_config.HTTP_CACHE_MAX_AGE_SECONDS
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = f"private, max-age={max_age}" if max_age > 0 else "private, no-cache"
+    return response, status
+
+
+def _uncacheable(response: Response, status: int) -> Tuple[Response, int]:
+    """Mark a GET response that must never be reused, e.g. partial or live data."""
+    response.headers['Cache-Control'] = "no-store"
+    return response, status
+
+
 @appointment_bp.route('/therapist/slots', methods=['POST'])
 def create_slot() -> Tuple[Response, int]:
     """
@@ -47,7 +111,7 @@ def create_slot() -> Tuple[Response, int]:
         if not is_valid:
             logger.warning(f"Invalid slot creation attempt: {error_msg}")
             return jsonify({"success": False, "message": error_msg}), 400
-            
+        
         # Create slot
         success = appointment_service.create_slot(
             slot_data.therapist_id,
@@ -61,7 +125,7 @@ def create_slot() -> Tuple[Response, int]:
         else:
             logger.warning(f"Failed to create slot for therapist {slot_data.therapist_id}")
             return jsonify({"success": False, "message": "Failed to create slot. The slot may overlap with existing slots."}), 400
-            
+    
     except Exception as e:
         logger.error(f"Error in create_slot: {str(e)}")
         return jsonify({"success": False, "message": str(e)}), 400
@@ -94,7 +158,7 @@ def create_availability_range() -> Tuple[Response, int]:
                 "success": False, 
                 "message": "Start time must be before end time"
             }), 400
-            
+        
         # Validate slot duration
         if slot_duration_minutes < 15 or slot_duration_minutes > 120:
             logger.warning(f"Invalid slot duration: {slot_duration_minutes} minutes")
@@ -102,7 +166,7 @@ def create_availability_range() -> Tuple[Response, int]:
                 "success": False, 
                 "message": "Slot duration must be between 15 and 120 minutes"
             }), 400
-            
+        
         # Create the range of slots
         success = appointment_service.create_availability_range(
             therapist_id,
@@ -123,49 +187,263 @@ def create_availability_range() -> Tuple[Response, int]:
                 "success": False, 
                 "message": "Failed to create availability range. There may be overlapping slots."
             }), 400
-            
+    
     except Exception as e:
         logger.error(f"Error in create_availability_range: {str(e)}")
         return jsonify({"success": False, "message": str(e)}), 400
 
 
+@appointment_bp.route('/availability/template', methods=['POST'])
+def apply_availability_template() -> Tuple[Response, int]:
+    """
+    Apply one weekly availability template to several therapists over a date range.
+    
+    Every therapist's new slots are committed together in a single write.
+    Slots overlapping a therapist's existing slots are skipped.
+    
+    Request body:
+    {
+        "therapist_ids": ["123", "456"],
+        "from": "2023-06-01",
+        "to": "2023-08-31",
+        "weekdays": ["mon", "tue", "wed", "thu", "fri"],
+        "start_time": "09:00",
+        "end_time": "17:00",
+        "slot_duration_minutes": 60
+    }
+    """
+    try:
+        data = request.get_json()
+        if not isinstance(data.get('therapist_ids'), list):
+            return jsonify({"success": False, "message": "therapist_ids must be a list"}), 400
+        therapist_ids = [str(tid).strip() for tid in data['therapist_ids'] if str(tid).strip()]
+        first_day = date.fromisoformat(data['from'])
+        last_day = date.fromisoformat(data['to'])
+        weekdays = parse_weekdays(data.get('weekdays', range(5)))
+        start_time = time.fromisoformat(data['start_time'])
+        end_time = time.fromisoformat(data['end_time'])
+        slot_duration_minutes = int(data.get('slot_duration_minutes', 60))
+        
+        if not therapist_ids:
+            return jsonify({"success": False, "message": "therapist_ids must list at least one therapist"}), 400
+        if len(therapist_ids) > active_config.TEMPLATE_MAX_THERAPISTS:
+            return jsonify({
+                "success": False,
+                "message": f"A template is applied to at most {active_config.TEMPLATE_MAX_THERAPISTS} therapists"
+            }), 400
+        
+        # Validate date range
+        if first_day > last_day:
+            return jsonify({"success": False, "message": "from must not be after to"}), 400
+        if (last_day - first_day).days + 1 > active_config.TEMPLATE_MAX_DAYS:
+            return jsonify({
+                "success": False,
+                "message": f"A template covers at most {active_config.TEMPLATE_MAX_DAYS} days"
+            }), 400
+        
+        # Validate time range
+        if start_time >= end_time:
+            logger.warning(f"Invalid time range: start_time must be before end_time")
+            return jsonify({"success": False, "message": "Start time must be before end time"}), 400
+        
+        # Validate slot duration
+        if slot_duration_minutes < 15 or slot_duration_minutes > 120:
+            logger.warning(f"Invalid slot duration: {slot_duration_minutes} minutes")
+            return jsonify({
+                "success": False, 
+                "message": "Slot duration must be between 15 and 120 minutes"
+            }), 400
+        
+        created = appointment_service.apply_availability_template(
+            therapist_ids,
+            first_day,
+            last_day,
+            weekdays,
+            start_time,
+            end_time,
+            slot_duration_minutes
+        )
+        
+        total = sum(created.values())
+        logger.info(f"Applied availability template to {len(therapist_ids)} therapists, {total} slots created")
+        return jsonify({
+            "success": True,
+            "slots_created": total,
+            "therapists": created
+        }), 201
+    
+    except Exception as e:
+        logger.error(f"Error in apply_availability_template: {str(e)}")
+        return jsonify({"success": False, "message": str(e)}), 400
+
+
+@appointment_bp.route('/therapist/<therapist_id>/rules', methods=['POST'])
+def create_availability_rule(therapist_id: str) -> Tuple[Response, int]:
+    """
+    Create a recurring weekly availability rule for a therapist.
+    
+    Only the rule is stored; its free slots are generated for the days being
+    listed, and a slot is stored once it gets booked.
+    
+    Request body:
+    {
+        "weekdays": ["mon", "tue", "wed", "thu", "fri"],
+        "start_time": "09:00",
+        "end_time": "17:00",
+        "slot_duration_minutes": 60,
+        "valid_from": "2023-06-01",
+        "valid_to": "2023-12-31",
+        "exceptions": ["2023-08-15"]
+    }
+    """
+    try:
+        data = request.get_json()
+        weekdays = parse_weekdays(data.get('weekdays', range(5)))
+        start_time = time.fromisoformat(data['start_time'])
+        end_time = time.fromisoformat(data['end_time'])
+        slot_duration_minutes = int(data.get('slot_duration_minutes', 60))
+        valid_from = date.fromisoformat(data['valid_from']) if data.get('valid_from') else None
+        valid_to = date.fromisoformat(data['valid_to']) if data.get('valid_to') else None
+        exceptions = [date.fromisoformat(day) for day in data.get('exceptions', [])]
+        
+        # Validate slot duration
+        if slot_duration_minutes < 15 or slot_duration_minutes > 120:
+            logger.warning(f"Invalid slot duration: {slot_duration_minutes} minutes")
+            return jsonify({
+                "success": False, 
+                "message": "Slot duration must be between 15 and 120 minutes"
+            }), 400
+        
+        rule = appointment_service.create_availability_rule(
+            therapist_id,
+            weekdays,
+            start_time,
+            end_time,
+            slot_duration_minutes,
+            valid_from,
+            valid_to,
+            exceptions
+        )
+        
+        logger.info(f"Created availability rule {rule['rule_id']} for therapist {therapist_id}")
+        return jsonify({"success": True, "rule": rule}), 201
+    
+    except Exception as e:
+        logger.error(f"Error in create_availability_rule: {str(e)}")
+        return jsonify({"success": False, "message": str(e)}), 400
+
+
+@appointment_bp.route('/therapist/<therapist_id>/rules', methods=['GET'])
+def list_availability_rules(therapist_id: str) -> Tuple[Response, int]:
+    """
+    List the availability rules of a therapist.
+    """
+    try:
+        rules = appointment_service.list_availability_rules(therapist_id)
+        payload = {"success": True, "therapist_id": therapist_id, "rules": rules}
+        return _conditional_json(_payload_etag(payload), lambda: payload)
+    
+    except Exception as e:
+        logger.error(f"Error in list_availability_rules: {str(e)}")
+        return jsonify({"success": False, "message": str(e)}), 400
+
+
+@appointment_bp.route('/therapist/<therapist_id>/rules/<rule_id>', methods=['DELETE'])
+def delete_availability_rule(therapist_id: str, rule_id: str) -> Tuple[Response, int]:
+    """
+    Delete an availability rule of a therapist.
+    
+    Its free slots disappear; slots booked from it stay booked.
+    """
+    try:
+        if appointment_service.delete_availability_rule(therapist_id, rule_id):
+            return jsonify({"success": True, "message": "Availability rule deleted successfully"}), 200
+        return jsonify({"success": False, "message": "Availability rule not found"}), 404
+    
+    except Exception as e:
+        logger.error(f"Error in delete_availability_rule: {str(e)}")
+        return jsonify({"success": False, "message": str(e)}), 400
+
+
 @appointment_bp.route('/therapist/<therapist_id>/slots', methods=['GET'])
 def list_slots(therapist_id: str) -> Tuple[Response, int]:
     """
-    List all slots for a therapist.
+    List all slots for a therapist on a date or within a range.
     
     Query parameters:
     - date: Date to list slots for (YYYY-MM-DD)
+    - from, to: Range to list slots for instead of a single date, as dates
+      (YYYY-MM-DD, both days included) or datetimes (YYYY-MM-DDTHH:MM:SS, end excluded)
+    - status: Only list 'free' or 'busy' slots within a range (optional)
     """
     try:
+        from_str = request.args.get('from')
+        to_str = request.args.get('to')
         date_str = request.args.get('date')
-        if not date_str:
+        status = None
+        
+        if from_str or to_str:
+            if not (from_str and to_str):
+                logger.warning("Incomplete range in list_slots request")
+                return jsonify({"success": False, "message": "Both from and to parameters are required"}), 400
+            
+            start_time = _parse_range_bound(from_str, is_end=False)
+            end_time = _parse_range_bound(to_str, is_end=True)
+            status = request.args.get('status')
+        elif date_str:
+            # All slots (both free and busy) starting on that date
+            start_time = datetime.combine(datetime.fromisoformat(date_str).date(), datetime.min.time())
+            end_time = start_time + timedelta(days=1)
+        else:
             logger.warning("Date parameter missing in list_slots request")
             return jsonify({"success": False, "message": "Date parameter is required"}), 400
-            
-        date_obj = datetime.fromisoformat(date_str)
         
-        # Get all slots (both free and busy)
-        slots = appointment_service.list_all_slots(therapist_id, date_obj.date())
-        
-        # Convert to dict for response
-        slots_data = [
-            {
-                "therapist_id": slot.therapist_id,
-                "start_time": slot.start_time.isoformat(),
-                "end_time": slot.end_time.isoformat(),
-                "status": slot.status
-            } for slot in slots
-        ]
+        # Get the whole range in a single read
+        slots = appointment_service.get_slots_in_range(therapist_id, start_time, end_time, status)
+        etag = _slots_etag(f"slots:{therapist_id}:{start_time.isoformat()}:{end_time.isoformat()}:{status}", slots)
         
-        logger.info(f"Retrieved {len(slots_data)} slots for therapist {therapist_id}")
-        return jsonify({"success": True, "slots": slots_data}), 200
+        def build() -> bytes:
+            # Trusted backend data goes straight to JSON, without response models
+            logger.info(f"Retrieved {len(slots)} slots for therapist {therapist_id}")
+            return encode_slots_response(therapist_id, slots)
         
+        return _conditional_json(etag, build)
+    
     except Exception as e:
         logger.error(f"Error in list_slots: {str(e)}")
         return jsonify({"success": False, "message": str(e)}), 400
 
 
+@appointment_bp.route('/therapist/<therapist_id>/events', methods=['GET'])
+def slot_events(therapist_id: str) -> Union[Response, Tuple[Response, int]]:
+    """
+    Stream the slot changes of a therapist as Server-Sent Events.
+    
+    Each event is named after its type (created, booked, cancelled or
+    resync) and carries {"type", "therapist_id", "slots"} as JSON, with the
+    slots in the format of the slot listing. Clients apply the slots to the
+    listing they fetched by start_time, and fetch the listing again on a
+    resync event or after reconnecting.
+    """
+    try:
+        subscription = appointment_service.subscribe_slot_events(therapist_id)
+    except TooManySubscribers as e:
+        logger.warning(f"Refusing an event stream for therapist {therapist_id}: {e}")
+        return jsonify({"success": False, "message": str(e)}), 503
+    except Exception as e:
+        logger.error(f"Error in slot_events: {str(e)}")
+        return jsonify({"success": False, "message": str(e)}), 400
+    
+    response = Response(
+        iter_sse(subscription, active_config.EVENTS_KEEPALIVE_SECONDS),
+        mimetype='text/event-stream',
+        headers={"Cache-Control": "no-store", "X-Accel-Buffering": "no"}
+    )
+    # Also closes the subscription of a client gone before the stream started
+    response.call_on_close(subscription.close)
+    return response
+
+
 @appointment_bp.route('/therapist/<therapist_id>/stats', methods=['GET'])
 def get_therapist_stats(therapist_id: str) -> Tuple[Response, int]:
     """
@@ -179,18 +457,19 @@ def get_therapist_stats(therapist_id: str) -> Tuple[Response, int]:
         if not date_str:
             logger.warning("Date parameter missing in get_therapist_stats request")
             return jsonify({"success": False, "message": "Date parameter is required"}), 400
-            
+        
         date_obj = datetime.fromisoformat(date_str)
         
         # Get therapist stats
         stats = appointment_service.get_therapist_stats(therapist_id, date_obj.date())
         
         logger.info(f"Retrieved stats for therapist {therapist_id}")
-        return jsonify({
+        payload = {
             "success": True, 
             "stats": stats
-        }), 200
-        
+        }
+        return _conditional_json(_payload_etag(payload), lambda: payload)
+    
     except Exception as e:
         logger.error(f"Error in get_therapist_stats: {str(e)}")
         return jsonify({"success": False, "message": str(e)}), 400
@@ -210,22 +489,22 @@ def list_therapists() -> Tuple[Response, int]:
         if not date_str:
             logger.warning("Date parameter missing in list_therapists request")
             return jsonify({"success": False, "message": "Date parameter is required"}), 400
-            
+        
         date_obj = datetime.fromisoformat(date_str)
         
         # Get list of therapist IDs (comma-separated string)
         therapist_ids_str = request.args.get('therapist_ids', '')
         
         # If therapist_ids is provided, split and process them
-        therapist_stats = []
         if therapist_ids_str:
-            therapist_ids = [tid.strip() for tid in therapist_ids_str.split(',')]
+            therapist_ids = [tid.strip() for tid in therapist_ids_str.split(',') if tid.strip()]
             
-            # Get stats for each therapist
-            for therapist_id in therapist_ids:
-                stats = appointment_service.get_therapist_stats(therapist_id, date_obj.date())
-                if stats["total_slots"] > 0:  # Only include therapists with slots
-                    therapist_stats.append(stats)
+            # Fetch all therapists concurrently; slow ones are reported in errors
+            result = appointment_service.get_therapists_stats(therapist_ids, date_obj.date())
+            therapist_stats = [
+                stats for stats in result["therapists"]
+                if stats["total_slots"] > 0  # Only include therapists with slots
+            ]
         else:
             # If no therapist IDs were provided, we could return an error or
             # we could implement a way to discover all therapists in the system
@@ -235,18 +514,137 @@ def list_therapists() -> Tuple[Response, int]:
                 "message": "Please provide a comma-separated list of therapist IDs using the therapist_ids parameter"
             }), 400
         
-        logger.info(f"Retrieved stats for {len(therapist_stats)} therapists")
-        return jsonify({
+        logger.info(f"Retrieved stats for {len(therapist_stats)} therapists, {len(result['errors'])} failed")
+        payload = {
             "success": True,
             "date": date_obj.date().isoformat(),
-            "therapists": therapist_stats
-        }), 200
+            "therapists": therapist_stats,
+            "partial": bool(result["errors"]),
+            "errors": result["errors"]
+        }
         
+        # A partial listing is not a version of the view, so it gets no ETag
+        if payload["partial"]:
+            return _uncacheable(jsonify(payload), 200)
+        return _conditional_json(_payload_etag(payload), lambda: payload)
+    
     except Exception as e:
         logger.error(f"Error in list_therapists: {str(e)}")
         return jsonify({"success": False, "message": str(e)}), 400
 
 
+@appointment_bp.route('/search/earliest', methods=['GET'])
+def find_earliest_available() -> Tuple[Response, int]:
+    """
+    Find the first available slots with any of several therapists, in time order.
+    
+    Query parameters:
+    - therapist_ids: Comma-separated list of therapist IDs to search
+    - from: Start of the search window, as a date or a datetime (default: now)
+    - to: End of the search window, as a date (included) or a datetime (excluded)
+      (default: SEARCH_WINDOW_DAYS after the start)
+    - limit: Maximum number of slots to return (default: 10)
+    """
+    try:
+        therapist_ids = [tid.strip() for tid in request.args.get('therapist_ids', '').split(',') if tid.strip()]
+        if not therapist_ids:
+            logger.warning("No therapist IDs provided in find_earliest_available request")
+            return jsonify({
+                "success": False,
+                "message": "Please provide a comma-separated list of therapist IDs using the therapist_ids parameter"
+            }), 400
+        
+        from_str = request.args.get('from')
+        to_str = request.args.get('to')
+        start_time = _parse_range_bound(from_str, is_end=False) if from_str else datetime.now()
+        end_time = _parse_range_bound(to_str, is_end=True) if to_str else start_time + timedelta(days=active_config.SEARCH_WINDOW_DAYS)
+        
+        limit = int(request.args.get('limit', 10))
+        if not 0 < limit <= active_config.SEARCH_MAX_RESULTS:
+            return jsonify({
+                "success": False,
+                "message": f"limit must be between 1 and {active_config.SEARCH_MAX_RESULTS}"
+            }), 400
+        
+        # Merge the therapists' free slots, reading only as far as needed
+        tagged_slots = appointment_service.find_earliest_available(therapist_ids, start_time, end_time, limit)
+        logger.info(f"Found {len(tagged_slots)} available slots across {len(therapist_ids)} therapists")
+        
+        # The therapist of each slot is part of the view, so the ETag changes when it does
+        view = f"earliest:{','.join(therapist_id for therapist_id, _ in tagged_slots)}"
+        etag = _slots_etag(view, [slot for _, slot in tagged_slots])
+        return _conditional_json(etag, lambda: encode_tagged_slots_response(tagged_slots))
+    
+    except Exception as e:
+        logger.error(f"Error in find_earliest_available: {str(e)}")
+        return jsonify({"success": False, "message": str(e)}), 400
+
+
+@appointment_bp.route('/export', methods=['GET'])
+def export_slots() -> Union[Response, Tuple[Response, int]]:
+    """
+    Stream slots as NDJSON for a set of therapists and a date range.
+    
+    The response is generated slot by slot, so memory stays flat whatever
+    the size of the export.
+    
+    Query parameters:
+    - from: First day to export (YYYY-MM-DD)
+    - to: Last day to export (YYYY-MM-DD)
+    - therapist_ids: Comma-separated list of therapist IDs (default: every therapist)
+    - gzip: Set to true to download a gzip-compressed file
+    """
+    try:
+        from_str = request.args.get('from')
+        to_str = request.args.get('to')
+        if not (from_str and to_str):
+            logger.warning("Date range missing in export_slots request")
+            return jsonify({"success": False, "message": "Both from and to parameters are required"}), 400
+        
+        first_day = date.fromisoformat(from_str)
+        last_day = date.fromisoformat(to_str)
+        if first_day > last_day:
+            return jsonify({"success": False, "message": "from must not be after to"}), 400
+        
+        therapist_ids_str = request.args.get('therapist_ids')
+        therapist_ids = [tid.strip() for tid in therapist_ids_str.split(',') if tid.strip()] if therapist_ids_str else None
+        compress = request.args.get('gzip', 'false').lower() in ('1', 'true', 'yes')
+        
+        lines = iter_export_lines(therapist_ids, first_day, last_day)
+        filename = f"slots-{first_day.isoformat()}-{last_day.isoformat()}.ndjson"
+        
+        logger.info(f"Exporting slots from {first_day} to {last_day}")
+        if compress:
+            return Response(
+                stream_with_context(gzip_stream(lines)),
+                mimetype='application/gzip',
+                headers={"Content-Disposition": f'attachment; filename="{filename}.gz"'}
+            )
+        return Response(
+            stream_with_context(lines),
+            mimetype='application/x-ndjson',
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+        )
+    
+    except Exception as e:
+        logger.error(f"Error in export_slots: {str(e)}")
+        return jsonify({"success": False, "message": str(e)}), 400
+
+
+@appointment_bp.route('/cache/stats', methods=['GET'])
+def get_cache_stats() -> Tuple[Response, int]:
+    """
+    Get the hit, miss and eviction counters of the slot cache.
+    """
+    try:
+        stats = appointment_service.get_cache_stats()
+        return _uncacheable(jsonify({"success": True, "cache": stats}), 200)
+    
+    except Exception as e:
+        logger.error(f"Error in get_cache_stats: {str(e)}")
+        return jsonify({"success": False, "message": str(e)}), 400
+
+
 @appointment_bp.route('/book', methods=['POST'])
 def book_slot() -> Tuple[Response, int]:
     """
@@ -270,20 +668,23 @@ def book_slot() -> Tuple[Response, int]:
         if not is_valid:
             logger.warning(f"Invalid booking attempt: {error_msg}")
             return jsonify({"success": False, "message": error_msg}), 400
-            
+        
         # Book slot
-        success = appointment_service.book_slot(
+        result = appointment_service.book_slot(
             booking_data.therapist_id,
             booking_data.slot_time
         )
         
-        if success:
+        if result:
             logger.info(f"Slot booked for therapist {booking_data.therapist_id}")
             return jsonify({"success": True, "message": "Slot booked successfully"}), 200
+        elif result is BookingResult.CONFLICT:
+            logger.warning(f"Booking conflict for therapist {booking_data.therapist_id}")
+            return jsonify({"success": False, "conflict": True, "message": "Failed to book slot. The slot is already booked."}), 409
         else:
             logger.warning(f"Failed to book slot for therapist {booking_data.therapist_id}")
-            return jsonify({"success": False, "message": "Failed to book slot. The slot may not exist or is already booked."}), 400
-            
+            return jsonify({"success": False, "message": "Failed to book slot. The slot does not exist."}), 400
+    
     except Exception as e:
         logger.error(f"Error in book_slot: {str(e)}")
         return jsonify({"success": False, "message": str(e)}), 400
@@ -308,18 +709,140 @@ def cancel_booking() -> Tuple[Response, int]:
         )
         
         # Cancel booking
-        success = appointment_service.cancel_booking(
+        result = appointment_service.cancel_booking(
             cancel_data.therapist_id,
             cancel_data.slot_time
         )
         
-        if success:
+        if result:
             logger.info(f"Booking canceled for therapist {cancel_data.therapist_id}")
             return jsonify({"success": True, "message": "Booking canceled successfully"}), 200
+        elif result is BookingResult.CONFLICT:
+            logger.warning(f"Cancellation conflict for therapist {cancel_data.therapist_id}")
+            return jsonify({"success": False, "conflict": True, "message": "Failed to cancel booking. The slot is not booked."}), 409
         else:
             logger.warning(f"Failed to cancel booking for therapist {cancel_data.therapist_id}")
-            return jsonify({"success": False, "message": "Failed to cancel booking. The slot may not exist or is not booked."}), 400
-            
+            return jsonify({"success": False, "message": "Failed to cancel booking. The slot does not exist."}), 400
+    
     except Exception as e:
         logger.error(f"Error in cancel_booking: {str(e)}")
-        return jsonify({"success": False, "message": str(e)}), 400 
\ No newline at end of file
+        return jsonify({"success": False, "message": str(e)}), 400 
+
+
+def _run_batch(action: str, schema: type) -> Tuple[Response, int]:
+    """
+    Parse, validate and apply a batch booking or cancellation request.
+    
+    Args:
+        action: 'book' or 'cancel'
+        schema: Pydantic model validating each item
+    
+    Returns:
+        Tuple of the JSON response and its status code: 200 if every item
+        succeeded, 207 if only some did, 409 if an all-or-nothing batch was rejected
+    """
+    data = request.get_json()
+    all_or_nothing = bool(data.get('all_or_nothing', False))
+    raw_items = data.get('items')
+    if not isinstance(raw_items, list) or not raw_items:
+        return jsonify({"success": False, "message": "items must be a non-empty list"}), 400
+    if len(raw_items) > active_config.BATCH_MAX_ITEMS:
+        return jsonify({"success": False, "message": f"A batch holds at most {active_config.BATCH_MAX_ITEMS} items"}), 400
+    
+    items = [
+        schema(therapist_id=item['therapist_id'], slot_time=datetime.fromisoformat(item['slot_time']))
+        for item in raw_items
+    ]
+    
+    # Validate booking times up front; invalid items are never sent to the backend
+    errors: Dict[int, str] = {}
+    if action == 'book':
+        for i, item in enumerate(items):
+            is_valid, error_msg = is_valid_booking_time(item.slot_time)
+            if not is_valid:
+                errors[i] = error_msg
+    
+    valid = [i for i in range(len(items)) if i not in errors]
+    if all_or_nothing and errors:
+        outcomes = {}
+    else:
+        apply = appointment_service.book_slots if action == 'book' else appointment_service.cancel_bookings
+        outcomes = dict(zip(valid, apply([(items[i].therapist_id, items[i].slot_time) for i in valid], all_or_nothing)))
+    
+    results = []
+    for i, item in enumerate(items):
+        result = {"therapist_id": item.therapist_id, "slot_time": item.slot_time.isoformat()}
+        if i in errors:
+            result.update(status="invalid", message=errors[i])
+        else:
+            result["status"] = outcomes.get(i, BookingResult.ABORTED).value
+        results.append(result)
+    
+    succeeded = sum(1 for result in results if result["status"] == BookingResult.SUCCESS.value)
+    logger.info(f"Batch {action}: {succeeded} of {len(items)} items succeeded")
+    
+    if succeeded == len(items):
+        status_code = 200
+    elif all_or_nothing:
+        status_code = 409
+    else:
+        status_code = 207
+    
+    return jsonify({
+        "success": succeeded == len(items),
+        "all_or_nothing": all_or_nothing,
+        "succeeded": succeeded,
+        "results": results
+    }), status_code
+
+
+@appointment_bp.route('/book/batch', methods=['POST'])
+def book_slots_batch() -> Tuple[Response, int]:
+    """
+    Book several slots in one request, e.g. the sessions of a treatment plan.
+    
+    Items are grouped by therapist and each therapist's slots are written
+    together. Each item gets its own status: success, not_found, conflict,
+    invalid, or aborted when all_or_nothing is set and another item failed.
+    
+    Request body:
+    {
+        "all_or_nothing": false,
+        "items": [
+            {"therapist_id": "123", "slot_time": "2023-06-01T10:00:00"},
+            {"therapist_id": "123", "slot_time": "2023-06-08T10:00:00"}
+        ]
+    }
+    """
+    try:
+        return _run_batch('book', TimeSlotBook)
+    
+    except Exception as e:
+        logger.error(f"Error in book_slots_batch: {str(e)}")
+        return jsonify({"success": False, "message": str(e)}), 400
+
+
+@appointment_bp.route('/cancel/batch', methods=['POST'])
+def cancel_bookings_batch() -> Tuple[Response, int]:
+    """
+    Cancel several booked slots in one request.
+    
+    Items are grouped by therapist and each therapist's slots are written
+    together. Each item gets its own status: success, not_found, conflict,
+    or aborted when all_or_nothing is set and another item failed.
+    
+    Request body:
+    {
+        "all_or_nothing": false,
+        "items": [
+            {"therapist_id": "123", "slot_time": "2023-06-01T10:00:00"},
+            {"therapist_id": "123", "slot_time": "2023-06-08T10:00:00"}
+        ]
+    }
+    """
+    try:
+        return _run_batch('cancel', TimeSlotCancel)
+    
+    except Exception as e:
+        logger.error(f"Error in cancel_bookings_batch: {str(e)}")
+        return jsonify({"success": False, "message": str(e)}), 400
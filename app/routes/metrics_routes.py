@@ -0,0 +1,112 @@
+from time import perf_counter
+import logging
+
+from flask import Blueprint, Response, g, request
+
+from app.integrations import get_cache_stats
+from app.utils.metrics import REGISTRY, SLOTS_PARSED, COUNT_BUCKETS
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Create Blueprint
+metrics_bp = Blueprint('metrics', __name__)
+
+# Content type of the Prometheus text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Label of requests that matched no route, so unknown URLs cannot add series
+UNMATCHED_ROUTE = "unmatched"
+
+REQUESTS = REGISTRY.counter(
+    "http_requests_total",
+    "HTTP requests handled, per route and status code",
+    ("method", "route", "status")
+)
+REQUEST_SECONDS = REGISTRY.histogram(
+    "http_request_duration_seconds",
+    "Time to produce the response of an HTTP request, per route and status code",
+    ("method", "route", "status")
+)
+REQUESTS_IN_FLIGHT = REGISTRY.gauge(
+    "http_requests_in_flight",
+    "HTTP requests being handled"
+)
+REQUEST_SLOTS_PARSED = REGISTRY.histogram(
+    "http_request_slots_parsed",
+    "Slots decoded from the storage backend to answer an HTTP request, per route",
+    ("method", "route"),
+    buckets=COUNT_BUCKETS
+)
+CACHE_EVENTS = REGISTRY.counter(
+    "slot_cache_events_total",
+    "Slot cache lookups and evictions, per event (hit, miss or eviction)",
+    ("event",)
+)
+CACHE_ENTRIES = REGISTRY.gauge(
+    "slot_cache_entries",
+    "Days of slots held in the slot cache"
+)
+
+
+def _collect_cache_stats() -> None:
+    """Mirror the slot cache counters into the registry before a scrape."""
+    try:
+        stats = get_cache_stats()
+    except Exception as e:
+        logger.warning(f"Cannot collect slot cache metrics: {e}")
+        return
+    CACHE_EVENTS.set(stats["hits"], "hit")
+    CACHE_EVENTS.set(stats["misses"], "miss")
+    CACHE_EVENTS.set(stats["evictions"], "eviction")
+    CACHE_ENTRIES.set(stats["entries"])
+
+
+REGISTRY.add_collector(_collect_cache_stats)
+
+
+@metrics_bp.before_app_request
+def _start_request() -> None:
+    """Count the request as in flight and start its timer and slot tally."""
+    g.metrics_started = perf_counter()
+    REQUESTS_IN_FLIGHT.inc()
+    SLOTS_PARSED.start()
+
+
+@metrics_bp.after_app_request
+def _record_request(response: Response) -> Response:
+    """
+    Record the count, latency and slots parsed of a request.
+    
+    Error responses are recorded too, as Flask turns unhandled exceptions
+    into a 500 response before this runs. For streamed responses, such as
+    the export, the latency covers producing the response, not sending it.
+    """
+    started = g.get('metrics_started')
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else UNMATCHED_ROUTE
+        status = str(response.status_code)
+        REQUESTS.inc(request.method, route, status)
+        REQUEST_SECONDS.observe(perf_counter() - started, request.method, route, status)
+        REQUEST_SLOTS_PARSED.observe(SLOTS_PARSED.finish() or 0, request.method, route)
+    return response
+
+
+@metrics_bp.teardown_app_request
+def _finish_request(error: BaseException = None) -> None:
+    """Stop counting the request as in flight, whatever happened to it."""
+    if g.pop('metrics_started', None) is not None:
+        REQUESTS_IN_FLIGHT.dec()
+
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def metrics() -> Response:
+    """
+    Expose the metrics of this process in the Prometheus text format.
+    
+    Reports HTTP request counts and latency histograms per route and status
+    code, requests in flight, slots parsed per request, storage backend call
+    latency and payload size per operation and therapist, and the slot cache
+    counters.
+    """
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
@@ -1,21 +1,56 @@
-from datetime import datetime, date, timedelta
-from typing import List, Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, date, time, timedelta
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+import logging
+
+from app.config import active_config
 
 from app.integrations import (
     create_free_slot,
     create_availability_range,
+    apply_availability_template,
+    create_availability_rule,
+    list_availability_rules,
+    delete_availability_rule,
     list_available_slots,
     list_all_slots,
+    list_slots_in_range,
+    find_earliest_available,
+    get_day_stats,
     book_slot,
     cancel_booking,
-    TimeSlot
+    book_slots,
+    cancel_bookings,
+    get_cache_stats,
+    subscribe_slot_events,
+    SlotSubscription,
+    TimeSlot,
+    BookingResult
 )
 from app.schemas.time_slot import TimeSlotResponse
+from app.utils.concurrency import fan_out
+
+# Configure logging
+logger = logging.getLogger(__name__)
 
 
 class AppointmentService:
     """Service for managing therapist appointments and slots."""
     
+    def __init__(self, max_workers: int = None):
+        """
+        Initialize the service.
+        
+        Args:
+            max_workers: Size of the worker pool used to fetch several therapists
+                         at once. Defaults to FANOUT_MAX_WORKERS from app/config.py.
+        """
+        # Threads are only started when the first fan-out runs
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers or active_config.FANOUT_MAX_WORKERS,
+            thread_name_prefix="therapist-fanout"
+        )
+    
     def create_slot(self, therapist_id: str, start_time: datetime, end_time: datetime) -> bool:
         """
         Create a new available slot for a therapist.
@@ -24,7 +59,7 @@ class AppointmentService:
             therapist_id: Unique identifier for the therapist
             start_time: Start time of the slot
             end_time: End time of the slot
-            
+        
         Returns:
             bool: True if slot was created successfully, False otherwise
         """
@@ -44,12 +79,75 @@ class AppointmentService:
             start_time: Start time of the availability range
             end_time: End time of the availability range
             slot_duration_minutes: Duration of each slot in minutes (default is 60)
-            
+        
         Returns:
             bool: True if slots were created successfully, False otherwise
         """
         return create_availability_range(therapist_id, start_time, end_time, slot_duration_minutes)
     
+    def apply_availability_template(self, therapist_ids: List[str], first_day: date, last_day: date, weekdays: Iterable[int], start_time: time, end_time: time, slot_duration_minutes: int = 60) -> Dict[str, int]:
+        """
+        Apply a clinic-wide weekly availability template to several therapists in a single write.
+        
+        Args:
+            therapist_ids: Unique identifiers of the therapists
+            first_day: First day of the date range (inclusive)
+            last_day: Last day of the date range (inclusive)
+            weekdays: Days of the week to create slots on (Monday is 0)
+            start_time: Time of day the availability starts
+            end_time: Time of day the availability ends
+            slot_duration_minutes: Duration of each slot in minutes (default is 60)
+        
+        Returns:
+            Dict mapping each therapist to the number of slots created
+        """
+        return apply_availability_template(therapist_ids, first_day, last_day, weekdays, start_time, end_time, slot_duration_minutes)
+    
+    def create_availability_rule(self, therapist_id: str, weekdays: Iterable[int], start_time: time, end_time: time, slot_duration_minutes: int = 60, valid_from: Optional[date] = None, valid_to: Optional[date] = None, exceptions: Iterable[date] = ()) -> Dict[str, Any]:
+        """
+        Create a recurring weekly availability rule for a therapist.
+        
+        Args:
+            therapist_id: Unique identifier for the therapist
+            weekdays: Days of the week the rule applies on (Monday is 0)
+            start_time: Time of day the availability starts
+            end_time: Time of day the availability ends
+            slot_duration_minutes: Duration of each slot in minutes (default is 60)
+            valid_from: First day the rule applies on (default: today)
+            valid_to: Last day the rule applies on (default: no end)
+            exceptions: Days the rule does not apply on
+        
+        Returns:
+            Dict describing the new rule
+        """
+        rule = create_availability_rule(therapist_id, weekdays, start_time, end_time, slot_duration_minutes, valid_from, valid_to, exceptions)
+        return rule.to_dict()
+    
+    def list_availability_rules(self, therapist_id: str) -> List[Dict[str, Any]]:
+        """
+        List the availability rules of a therapist.
+        
+        Args:
+            therapist_id: Unique identifier for the therapist
+        
+        Returns:
+            List of dicts describing the rules
+        """
+        return [rule.to_dict() for rule in list_availability_rules(therapist_id)]
+    
+    def delete_availability_rule(self, therapist_id: str, rule_id: str) -> bool:
+        """
+        Delete an availability rule of a therapist.
+        
+        Args:
+            therapist_id: Unique identifier for the therapist
+            rule_id: Unique identifier of the rule
+        
+        Returns:
+            bool: True if the rule was deleted, False if there is no such rule
+        """
+        return delete_availability_rule(therapist_id, rule_id)
+    
     def list_available_slots(self, therapist_id: str, search_date: date) -> List[TimeSlotResponse]:
         """
         List available slots for a therapist on a specific date.
@@ -57,7 +155,7 @@ class AppointmentService:
         Args:
             therapist_id: Unique identifier for the therapist
             search_date: Date to search for available slots
-            
+        
         Returns:
             List[TimeSlotResponse]: List of available time slots
         """
@@ -81,7 +179,7 @@ class AppointmentService:
         Args:
             therapist_id: Unique identifier for the therapist
             search_date: Date to search for all slots
-            
+        
         Returns:
             List[TimeSlotResponse]: List of all time slots
         """
@@ -98,6 +196,43 @@ class AppointmentService:
             ) for slot in slots
         ]
     
+    def get_slots_in_range(self, therapist_id: str, start_time: datetime, end_time: datetime, status: Optional[str] = None) -> List[TimeSlot]:
+        """
+        Get the slots of a therapist starting within a time range, e.g. a week or a month.
+        
+        The slots are not converted to response models: the range listing
+        serializes them directly, or not at all for a conditional request.
+        
+        Args:
+            therapist_id: Unique identifier for the therapist
+            start_time: Start of the range (inclusive)
+            end_time: End of the range (exclusive)
+            status: Only list slots with this status - 'free' or 'busy' (default: all)
+        
+        Returns:
+            List[TimeSlot]: Slots ordered by start time
+        """
+        # Get the whole range in one read
+        return list_slots_in_range(therapist_id, start_time, end_time, status)
+    
+    def find_earliest_available(self, therapist_ids: List[str], start_time: datetime, end_time: datetime, limit: int = 10) -> List[Tuple[str, TimeSlot]]:
+        """
+        Find the first available slots with any of several therapists.
+        
+        The slots are not converted to response models: the search route
+        serializes them directly, like the range listing.
+        
+        Args:
+            therapist_ids: Unique identifiers of the therapists
+            start_time: Start of the search window (inclusive)
+            end_time: End of the search window (exclusive)
+            limit: Maximum number of slots to return (default is 10)
+        
+        Returns:
+            List[Tuple[str, TimeSlot]]: (therapist_id, slot) pairs ordered by start time
+        """
+        return find_earliest_available(therapist_ids, start_time, end_time, limit)
+    
     def get_therapist_stats(self, therapist_id: str, search_date: date) -> Dict[str, Any]:
         """
         Get statistics for a therapist's slots on a specific date.
@@ -105,48 +240,141 @@ class AppointmentService:
         Args:
             therapist_id: Unique identifier for the therapist
             search_date: Date to get statistics for
-            
+        
         Returns:
             Dict with therapist ID, total slots, available slots, and booked slots counts
         """
-        # Get all slots
-        all_slots = self.list_all_slots(therapist_id, search_date)
-        
-        # Count by status
-        free_slots = [slot for slot in all_slots if slot.status == "free"]
-        busy_slots = [slot for slot in all_slots if slot.status == "busy"]
+        # Read the day's counters, maintained by every write
+        stats = get_day_stats(therapist_id, search_date)
         
         # Create stats object
         return {
             "therapist_id": therapist_id,
-            "total_slots": len(all_slots),
-            "available_slots": len(free_slots),
-            "booked_slots": len(busy_slots),
+            "total_slots": stats["total"],
+            "available_slots": stats["free"],
+            "booked_slots": stats["busy"],
             "date": search_date.isoformat()
         }
     
-    def book_slot(self, therapist_id: str, slot_time: datetime) -> bool:
+    def get_therapists_stats(self, therapist_ids: List[str], search_date: date, timeout: float = None, deadline: float = None) -> Dict[str, Any]:
+        """
+        Get statistics for several therapists on a specific date, fetching them concurrently.
+        
+        Args:
+            therapist_ids: Unique identifiers of the therapists
+            search_date: Date to get statistics for
+            timeout: Maximum seconds for a single therapist's fetch.
+                     Defaults to FANOUT_TIMEOUT_SECONDS from app/config.py.
+            deadline: Maximum seconds for the whole request.
+                      Defaults to FANOUT_DEADLINE_SECONDS from app/config.py.
+        
+        Returns:
+            Dict with "therapists", the stats of each therapist fetched in time
+            in request order, and "errors", a {therapist_id, error} marker for
+            each therapist that timed out or failed
+        """
+        results = fan_out(
+            self._executor,
+            lambda therapist_id: self.get_therapist_stats(therapist_id, search_date),
+            therapist_ids,
+            item_timeout=timeout if timeout is not None else active_config.FANOUT_TIMEOUT_SECONDS,
+            deadline=deadline if deadline is not None else active_config.FANOUT_DEADLINE_SECONDS
+        )
+        
+        therapists = []
+        errors = []
+        for therapist_id in dict.fromkeys(therapist_ids):
+            ok, value = results[therapist_id]
+            if ok:
+                therapists.append(value)
+            else:
+                logger.warning(f"Could not get stats for therapist {therapist_id}: {value}")
+                errors.append({"therapist_id": therapist_id, "error": value})
+        
+        return {"therapists": therapists, "errors": errors}
+    
+    def book_slot(self, therapist_id: str, slot_time: datetime) -> BookingResult:
         """
         Book a slot with a therapist.
         
         Args:
             therapist_id: Unique identifier for the therapist
             slot_time: Start time of the slot to book
-            
+        
         Returns:
-            bool: True if booking was successful, False otherwise
+            BookingResult: SUCCESS, NOT_FOUND or CONFLICT if the slot is already booked
         """
         return book_slot(therapist_id, slot_time)
     
-    def cancel_booking(self, therapist_id: str, slot_time: datetime) -> bool:
+    def cancel_booking(self, therapist_id: str, slot_time: datetime) -> BookingResult:
         """
         Cancel a booked slot.
         
         Args:
             therapist_id: Unique identifier for the therapist
             slot_time: Start time of the booked slot
-            
+        
+        Returns:
+            BookingResult: SUCCESS, NOT_FOUND or CONFLICT if the slot is not booked
+        """
+        return cancel_booking(therapist_id, slot_time)
+    
+    def book_slots(self, items: List[Tuple[str, datetime]], all_or_nothing: bool = False) -> List[BookingResult]:
+        """
+        Book several slots at once, e.g. the sessions of a treatment plan.
+        
+        Items are grouped by therapist and each group is written together.
+        With all_or_nothing, a SQLite batch is one transaction; on Firebase a
+        failed batch is undone afterwards, so other requests can briefly see
+        part of it.
+        
+        Args:
+            items: (therapist_id, slot_time) of each slot to book
+            all_or_nothing: If True, book nothing unless every slot can be booked
+        
+        Returns:
+            List[BookingResult]: Outcome of each item, in the order of items
+        """
+        return book_slots(items, all_or_nothing)
+    
+    def cancel_bookings(self, items: List[Tuple[str, datetime]], all_or_nothing: bool = False) -> List[BookingResult]:
+        """
+        Cancel several booked slots at once.
+        
+        Items are grouped by therapist and each group is written together.
+        With all_or_nothing, a SQLite batch is one transaction; on Firebase a
+        failed batch is undone afterwards, so other requests can briefly see
+        part of it.
+        
+        Args:
+            items: (therapist_id, slot_time) of each booked slot
+            all_or_nothing: If True, cancel nothing unless every booking can be cancelled
+        
+        Returns:
+            List[BookingResult]: Outcome of each item, in the order of items
+        """
+        return cancel_bookings(items, all_or_nothing)
+    
+    def subscribe_slot_events(self, therapist_id: str) -> SlotSubscription:
+        """
+        Subscribe to the slot changes of a therapist.
+        
+        Args:
+            therapist_id: Unique identifier for the therapist
+        
+        Returns:
+            SlotSubscription: Queue of the created, booked and cancelled slots from now on
+        
+        Raises:
+            TooManySubscribers: If the maximum number of subscriptions is open
+        """
+        return subscribe_slot_events(therapist_id)
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """
+        Get the counters of the slot cache.
+        
         Returns:
-            bool: True if cancellation was successful, False otherwise
+            Dict with hits, misses, evictions, current entries and cache settings
         """
-        return cancel_booking(therapist_id, slot_time) 
\ No newline at end of file
+        return get_cache_stats()
\ No newline at end of file
@@ -0,0 +1,61 @@
+"""
+In-process schedule of the slot archival job.
+"""
+from typing import Optional
+import logging
+import threading
+
+from app.integrations import archive_slots
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+_scheduler: Optional[threading.Thread] = None
+_stop = threading.Event()
+_scheduler_lock = threading.Lock()
+
+
+def run_archive_job() -> None:
+    """Archive the past slots of every therapist once, logging instead of raising errors."""
+    try:
+        archived = archive_slots()
+        logger.info(f"Archive job moved {sum(archived.values())} slots of {len(archived)} therapists")
+    except Exception as e:
+        logger.error(f"Error in archive job: {e}")
+
+
+def start_archive_scheduler(interval_seconds: float) -> threading.Thread:
+    """
+    Run the archival job every interval in a daemon thread.
+    
+    The first run happens one interval after the start, so it never slows
+    down the application start. Only one scheduler runs per process; later
+    calls return the running one.
+    
+    Args:
+        interval_seconds: Time between two runs
+    
+    Returns:
+        threading.Thread: The scheduler thread
+    """
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None or not _scheduler.is_alive():
+            _stop.clear()
+            
+            def loop() -> None:
+                while not _stop.wait(interval_seconds):
+                    run_archive_job()
+            
+            _scheduler = threading.Thread(target=loop, name="slot-archiver", daemon=True)
+            _scheduler.start()
+            logger.info(f"Archive job scheduled every {interval_seconds:g}s")
+    return _scheduler
+
+
+def stop_archive_scheduler() -> None:
+    """Stop the scheduler thread after its current run, if any."""
+    global _scheduler
+    with _scheduler_lock:
+        _stop.set()
+        _scheduler = None
@@ -0,0 +1,48 @@
+"""
+Server-Sent Events stream of the slot changes of a therapist.
+"""
+from typing import Iterator
+import logging
+
+from app.integrations import SlotSubscription
+from app.services.serialization import dumps
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Milliseconds browsers wait before reconnecting a dropped stream
+RETRY_MILLISECONDS = 3000
+
+
+def iter_sse(subscription: SlotSubscription, keepalive_seconds: float) -> Iterator[bytes]:
+    """
+    Stream the events of a subscription in the Server-Sent Events format.
+    
+    Each event is sent with its type as the SSE event name and its payload as
+    JSON data. A comment is sent after keepalive_seconds without events, so
+    proxies keep the connection open and a client that went away is noticed
+    at the next write. The stream ends when the subscription is closed, e.g.
+    on shutdown, and closes the subscription when it ends otherwise.
+    
+    Args:
+        subscription: Subscription to the slot events of a therapist
+        keepalive_seconds: Seconds of silence before a keep-alive comment
+    
+    Yields:
+        bytes: One SSE message at a time
+    """
+    sent = 0
+    try:
+        yield f"retry: {RETRY_MILLISECONDS}\n\n".encode("ascii")
+        while True:
+            event = subscription.get(timeout=keepalive_seconds)
+            if subscription.closed:
+                break
+            if event is None:
+                yield b": keepalive\n\n"
+                continue
+            sent += 1
+            yield b"id: %d\nevent: %s\ndata: %s\n\n" % (event.event_id, event.event_type.encode("ascii"), dumps(event.to_dict()))
+    finally:
+        subscription.close()
+        logger.info(f"Closed the event stream of therapist {subscription.therapist_id} after {sent} events")
@@ -0,0 +1,64 @@
+"""
+Streaming NDJSON export of slots.
+"""
+from datetime import date
+from typing import Iterable, Iterator, List, Optional
+import logging
+import zlib
+
+from app.integrations import iter_slots, list_therapist_ids
+from app.services.serialization import dumps, slot_row
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Uncompressed bytes collected before a gzip block is flushed to the client
+GZIP_FLUSH_BYTES = 64 * 1024
+
+
+def iter_export_lines(therapist_ids: Optional[List[str]], first_day: date, last_day: date) -> Iterator[bytes]:
+    """
+    Stream slots as NDJSON, one JSON object per line.
+    
+    Therapists are exported one after the other, each in start time order,
+    and only a chunk of days of one therapist is held in memory at a time.
+    
+    Args:
+        therapist_ids: Therapists to export, or None for every therapist
+        first_day: First day of the range (inclusive)
+        last_day: Last day of the range (inclusive)
+    
+    Yields:
+        bytes: One line per slot
+    """
+    count = 0
+    for therapist_id in (list_therapist_ids() if therapist_ids is None else therapist_ids):
+        for slot in iter_slots(therapist_id, first_day, last_day):
+            count += 1
+            yield dumps(slot_row(therapist_id, slot)) + b"\n"
+    
+    logger.info(f"Exported {count} slots from {first_day} to {last_day}")
+
+
+def gzip_stream(chunks: Iterable[bytes], flush_bytes: int = GZIP_FLUSH_BYTES) -> Iterator[bytes]:
+    """
+    Gzip a stream of bytes incrementally.
+    
+    Args:
+        chunks: Uncompressed bytes
+        flush_bytes: Uncompressed bytes collected before compressed data is emitted
+    
+    Yields:
+        bytes: A gzip file, block by block
+    """
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    pending = 0
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        pending += len(chunk)
+        if pending >= flush_bytes:
+            data += compressor.flush(zlib.Z_SYNC_FLUSH)
+            pending = 0
+        if data:
+            yield data
+    yield compressor.flush()
@@ -0,0 +1,281 @@
+"""
+Streaming import of slots from CSV and iCalendar files.
+"""
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+import csv
+import io
+import json
+import logging
+import os
+import time
+
+from app.integrations import get_backend, TimeSlot
+from app.integrations.base import STATUS_CODES
+from app.utils.date_utils import is_valid_appointment_slot, to_epoch, epoch_to_datetime
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Columns of an import CSV file; status is optional and defaults to free
+CSV_COLUMNS = ("therapist_id", "start_time", "end_time", "status")
+
+
+def _parse_ics_datetime(value: str) -> str:
+    """
+    Convert an iCalendar DATE-TIME value to ISO format.
+    
+    UTC values (ending in Z) keep their offset; floating and TZID values are
+    taken as they are, like every naive datetime of the application.
+    """
+    value = value.strip()
+    utc = value.endswith("Z")
+    if utc:
+        value = value[:-1]
+    parsed = datetime.strptime(value, "%Y%m%dT%H%M%S")
+    return parsed.isoformat() + ("+00:00" if utc else "")
+
+
+def read_csv_slots(path: str, offset: int = 0) -> Iterator[Tuple[Dict[str, str], int]]:
+    """
+    Stream the rows of an import CSV file.
+    
+    The first line is a header naming at least therapist_id, start_time and
+    end_time. Only one row is held in memory at a time.
+    
+    Args:
+        path: Path of the CSV file
+        offset: Byte offset to resume from, as returned with an earlier row
+    
+    Yields:
+        Tuple of (row fields, byte offset just after the row)
+    """
+    with open(path, "rb") as f:
+        header = next(csv.reader([f.readline().decode("utf-8-sig")]), [])
+        missing = [column for column in CSV_COLUMNS[:3] if column not in header]
+        if missing:
+            raise ValueError(f"CSV header is missing columns: {', '.join(missing)}")
+        
+        if offset:
+            f.seek(offset)
+        
+        lines = (raw.decode("utf-8") for raw in f)
+        for row in csv.reader(lines):
+            if row:
+                yield dict(zip(header, row)), f.tell()
+
+
+def read_ics_slots(path: str, offset: int = 0, therapist_id: Optional[str] = None) -> Iterator[Tuple[Dict[str, str], int]]:
+    """
+    Stream the events of an iCalendar file as slot rows.
+    
+    Each VEVENT becomes a row from its DTSTART and DTEND. The therapist is
+    read from an X-THERAPIST-ID property, falling back to the given one, and
+    the status from an X-SLOT-STATUS property, defaulting to free. Only one
+    event is held in memory at a time.
+    
+    Args:
+        path: Path of the .ics file
+        offset: Byte offset to resume from, as returned with an earlier event
+        therapist_id: Therapist of events without an X-THERAPIST-ID property
+    
+    Yields:
+        Tuple of (row fields, byte offset just after the event)
+    """
+    def logical_lines(f: io.BufferedReader) -> Iterator[Tuple[str, int]]:
+        # Unfold continuation lines; each logical line comes with the offset where it ends
+        current = None
+        while True:
+            line_start = f.tell()
+            raw = f.readline()
+            line = raw.decode("utf-8").rstrip("\r\n")
+            if raw and line[:1] in (" ", "\t") and current is not None:
+                current += line[1:]
+                continue
+            if current is not None:
+                yield current, line_start
+            if not raw:
+                return
+            current = line
+    
+    with open(path, "rb") as f:
+        f.seek(offset)
+        event = None
+        for line, end_offset in logical_lines(f):
+            name, _, value = line.partition(":")
+            name = name.split(";", 1)[0].upper()
+            
+            if name == "BEGIN" and value.upper() == "VEVENT":
+                event = {}
+            elif name == "END" and value.upper() == "VEVENT" and event is not None:
+                row = {
+                    "therapist_id": event.get("X-THERAPIST-ID", therapist_id or ""),
+                    "start_time": event.get("DTSTART", ""),
+                    "end_time": event.get("DTEND", ""),
+                    "status": event.get("X-SLOT-STATUS", "free")
+                }
+                for field in ("start_time", "end_time"):
+                    try:
+                        row[field] = _parse_ics_datetime(row[field])
+                    except ValueError:
+                        pass  # Left as is, the row is rejected when validated
+                yield row, end_offset
+                event = None
+            elif event is not None:
+                event[name] = value
+
+
+def parse_slot_row(row: Dict[str, str], allow_past: bool = False) -> Tuple[str, TimeSlot]:
+    """
+    Validate an import row with the appointment slot rules.
+    
+    Args:
+        row: Fields of the row
+        allow_past: Accept slots on past days
+    
+    Returns:
+        Tuple of (therapist_id, slot)
+    
+    Raises:
+        ValueError: If the row is not a valid slot
+    """
+    therapist_id = (row.get("therapist_id") or "").strip()
+    if not therapist_id:
+        raise ValueError("Missing therapist_id")
+    
+    # Aware times are converted to the naive UTC wall time used everywhere else
+    start_time = epoch_to_datetime(to_epoch(datetime.fromisoformat(row.get("start_time", "").strip())))
+    end_time = epoch_to_datetime(to_epoch(datetime.fromisoformat(row.get("end_time", "").strip())))
+    
+    is_valid, error_msg = is_valid_appointment_slot(start_time, end_time, allow_past=allow_past)
+    if not is_valid:
+        raise ValueError(error_msg)
+    
+    status = (row.get("status") or "free").strip().lower()
+    if status not in STATUS_CODES:
+        raise ValueError(f"Invalid status: {status}")
+    
+    return therapist_id, TimeSlot(start_time=start_time, end_time=end_time, status=status)
+
+
+def import_slots(
+    path: str,
+    file_format: Optional[str] = None,
+    chunk_size: int = 1000,
+    checkpoint_path: Optional[str] = None,
+    resume: bool = False,
+    rejects_path: Optional[str] = None,
+    therapist_id: Optional[str] = None,
+    allow_past: bool = False,
+    progress: Optional[Callable[[Dict[str, Any]], None]] = None
+) -> Dict[str, Any]:
+    """
+    Import slots from a CSV or iCalendar file in constant memory.
+    
+    Rows are validated and buffered into chunks of chunk_size rows. Each chunk
+    is grouped by therapist and written with one insert_slots() call, after
+    which a checkpoint records the byte offset reached, so an interrupted
+    import resumes after the last written chunk. Slots overlapping existing
+    ones or each other are skipped.
+    
+    Args:
+        path: Path of the file to import
+        file_format: 'csv' or 'ics' (default: from the file extension)
+        chunk_size: Number of rows written at once
+        checkpoint_path: Checkpoint file (default: <path>.checkpoint)
+        resume: Continue from the checkpoint instead of the start of the file
+        rejects_path: File to write rejected rows to, one JSON object per line
+        therapist_id: Therapist of .ics events without an X-THERAPIST-ID property
+        allow_past: Accept slots on past days, for historical data
+        progress: Called with the running totals after each chunk
+    
+    Returns:
+        Dict with the rows read, imported, skipped and rejected, the elapsed
+        seconds and the rows per second
+    """
+    file_format = (file_format or Path(path).suffix.lstrip(".")).lower()
+    if file_format not in ("csv", "ics"):
+        raise ValueError(f"Unknown import format '{file_format}'. Use csv or ics.")
+    if chunk_size <= 0:
+        raise ValueError("chunk_size must be positive")
+    
+    checkpoint_path = checkpoint_path or f"{path}.checkpoint"
+    totals = {"rows": 0, "imported": 0, "skipped": 0, "rejected": 0}
+    offset = 0
+    
+    if resume and os.path.exists(checkpoint_path):
+        with open(checkpoint_path) as f:
+            checkpoint = json.load(f)
+        if checkpoint.get("path") != os.path.abspath(path):
+            raise ValueError(f"Checkpoint {checkpoint_path} belongs to another file: {checkpoint.get('path')}")
+        offset = checkpoint["offset"]
+        totals.update({key: checkpoint[key] for key in totals})
+        logger.info(f"Resuming import of {path} at row {totals['rows']}")
+    
+    if file_format == "csv":
+        rows = read_csv_slots(path, offset)
+    else:
+        rows = read_ics_slots(path, offset, therapist_id)
+    
+    backend = get_backend()
+    started = time.perf_counter()
+    rows_at_start = totals["rows"]
+    rejects = open(rejects_path, "a" if resume else "w") if rejects_path else None
+    
+    def write_chunk(chunk: List[Tuple[str, TimeSlot]], chunk_offset: int) -> None:
+        slots_by_therapist: Dict[str, List[TimeSlot]] = {}
+        for slot_therapist_id, slot in chunk:
+            slots_by_therapist.setdefault(slot_therapist_id, []).append(slot)
+        
+        for inserted, skipped in backend.insert_slots(slots_by_therapist).values():
+            totals["imported"] += len(inserted)
+            totals["skipped"] += len(skipped)
+        
+        # Only record progress once the chunk is committed
+        with open(checkpoint_path, "w") as f:
+            json.dump({"path": os.path.abspath(path), "offset": chunk_offset, **totals}, f)
+        
+        if rejects:
+            rejects.flush()
+        if progress:
+            progress(_summary(totals, started, rows_at_start))
+    
+    try:
+        chunk: List[Tuple[str, TimeSlot]] = []
+        chunk_offset = offset
+        
+        for row, row_offset in rows:
+            totals["rows"] += 1
+            chunk_offset = row_offset
+            try:
+                chunk.append(parse_slot_row(row, allow_past))
+            except ValueError as e:
+                totals["rejected"] += 1
+                if rejects:
+                    rejects.write(json.dumps({"row": totals["rows"], "error": str(e), "data": row}) + "\n")
+            
+            if len(chunk) >= chunk_size:
+                write_chunk(chunk, chunk_offset)
+                chunk = []
+        
+        # The last chunk also records rows that were all rejected
+        write_chunk(chunk, chunk_offset)
+    finally:
+        if rejects:
+            rejects.close()
+    
+    os.remove(checkpoint_path)
+    summary = _summary(totals, started, rows_at_start)
+    logger.info(f"Imported {summary['imported']} of {summary['rows']} rows from {path} at {summary['rows_per_second']:.0f} rows/s")
+    return summary
+
+
+def _summary(totals: Dict[str, int], started: float, rows_at_start: int) -> Dict[str, Any]:
+    """Return the running totals with the elapsed time and the rate of this run."""
+    elapsed = time.perf_counter() - started
+    return {
+        **totals,
+        "elapsed_seconds": elapsed,
+        "rows_per_second": (totals["rows"] - rows_at_start) / elapsed if elapsed > 0 else 0.0
+    }
@@ -0,0 +1,149 @@
+"""
+Fast JSON serialization of slots.
+
+Slots read from the storage backend are trusted, so large listings skip the
+pydantic response models: each slot goes straight from its compact epoch
+fields to a dict of strings and the whole response is encoded to bytes at
+once. The JSON encoder is pluggable; orjson is used when installed and the
+standard library json module otherwise.
+"""
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+import importlib
+import json
+import logging
+import threading
+
+from app.config import active_config
+from app.integrations import TimeSlot
+from app.integrations.base import STATUS_NAMES
+from app.utils.date_utils import epoch_to_iso
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+def _json_dumps(obj: Any) -> bytes:
+    """Encode with the standard library, as compact UTF-8."""
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+# Encoder name -> (module, attribute) of a function encoding an object to bytes;
+# a module of None means the attribute is defined here
+ENCODERS = {
+    'orjson': ('orjson', 'dumps'),
+    'json': (None, '_json_dumps'),
+}
+
+# Encoders tried in order when JSON_ENCODER is 'auto'
+AUTO_ENCODERS = ('orjson', 'json')
+
+_encoder: Optional[Callable[[Any], bytes]] = None
+_encoder_lock = threading.Lock()
+
+
+def create_encoder(name: str) -> Callable[[Any], bytes]:
+    """
+    Load a JSON encoder by name.
+    
+    Args:
+        name: One of the keys of ENCODERS, or 'auto' for the first one installed
+    
+    Returns:
+        Callable[[Any], bytes]: Function encoding an object to JSON bytes
+    
+    Raises:
+        ValueError: If the name is not a known encoder
+        ImportError: If the named encoder is not installed
+    """
+    if name == 'auto':
+        for candidate in AUTO_ENCODERS:
+            try:
+                return create_encoder(candidate)
+            except ImportError:
+                continue
+    if name not in ENCODERS:
+        raise ValueError(f"Unknown JSON encoder '{name}'. Choose one of: auto, {', '.join(ENCODERS)}")
+    
+    module_name, attribute = ENCODERS[name]
+    encoder = getattr(importlib.import_module(module_name), attribute) if module_name else globals()[attribute]
+    logger.info(f"Using {name} JSON encoder")
+    return encoder
+
+
+def get_encoder() -> Callable[[Any], bytes]:
+    """Return the active JSON encoder, loading the configured one on first use."""
+    global _encoder
+    if _encoder is None:
+        with _encoder_lock:
+            if _encoder is None:
+                _encoder = create_encoder(active_config.JSON_ENCODER)
+    return _encoder
+
+
+def set_encoder(name: str) -> None:
+    """Replace the active JSON encoder, e.g. to compare encoders in a benchmark."""
+    global _encoder
+    encoder = create_encoder(name)
+    with _encoder_lock:
+        _encoder = encoder
+
+
+def dumps(obj: Any) -> bytes:
+    """
+    Encode an object to JSON bytes with the active encoder.
+    
+    Args:
+        obj: Dicts, lists, strings, numbers, booleans and None
+    
+    Returns:
+        bytes: Compact UTF-8 JSON
+    """
+    return get_encoder()(obj)
+
+
+def slot_row(therapist_id: str, slot: TimeSlot) -> Dict[str, str]:
+    """
+    Convert a slot to the dict of a slot listing, without validating it.
+    
+    The fields match TimeSlotResponse serialized with isoformat() datetimes.
+    
+    Args:
+        therapist_id: Therapist the slot belongs to
+        slot: Slot as read from the storage backend
+    
+    Returns:
+        Dict with therapist_id, start_time, end_time and status
+    """
+    return {
+        "therapist_id": therapist_id,
+        "start_time": epoch_to_iso(slot.start),
+        "end_time": epoch_to_iso(slot.end),
+        "status": STATUS_NAMES[slot.status_code]
+    }
+
+
+def encode_slots_response(therapist_id: str, slots: Iterable[TimeSlot]) -> bytes:
+    """
+    Encode a slot listing response ({"success": true, "slots": [...]}) to JSON bytes.
+    
+    Args:
+        therapist_id: Therapist the slots belong to
+        slots: Slots as read from the storage backend
+    
+    Returns:
+        bytes: Body of the response
+    """
+    return dumps({"success": True, "slots": [slot_row(therapist_id, slot) for slot in slots]})
+
+
+def encode_tagged_slots_response(tagged_slots: Iterable[Tuple[str, TimeSlot]]) -> bytes:
+    """
+    Encode a slot listing response of several therapists to JSON bytes.
+    
+    Args:
+        tagged_slots: (therapist_id, slot) pairs as read from the storage backend
+    
+    Returns:
+        bytes: Body of the response
+    """
+    return dumps({"success": True, "slots": [slot_row(therapist_id, slot) for therapist_id, slot in tagged_slots]})
@@ -0,0 +1,134 @@
+"""
+Life cycle of the worker processes of the production server.
+
+The WSGI app is loaded once by the server's master process, which then forks
+the workers. Nothing holding connections or threads is created before the
+fork: each worker creates its own storage backend, warms it up and starts its
+background jobs in init_worker(), and releases them in shutdown_worker().
+See gunicorn.conf.py for the server hooks calling these functions.
+"""
+from pathlib import Path
+from time import perf_counter
+from typing import Optional
+import logging
+import os
+import signal
+import threading
+
+from flask import Flask
+
+from app.config import active_config
+from app.integrations import list_therapist_ids, close_backend, close_slot_event_streams
+from app.services.archive_service import start_archive_scheduler, stop_archive_scheduler
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Lock files of the workers' writes when WRITE_LOCK_DIR is not set
+DEFAULT_LOCK_DIR = Path(__file__).resolve().parent.parent.parent / 'data' / 'locks'
+
+
+def worker_count() -> int:
+    """Return the number of workers to start: SERVER_WORKERS, or one per CPU core available to the process."""
+    if active_config.SERVER_WORKERS > 0:
+        return active_config.SERVER_WORKERS
+    if hasattr(os, 'sched_getaffinity'):
+        # Honours CPU sets, e.g. the cores a container is limited to
+        return max(1, len(os.sched_getaffinity(0)))
+    return max(1, os.cpu_count() or 1)
+
+
+def configure_server(workers: int, threads: int) -> None:
+    """
+    Adjust the configuration to the server, before any worker starts.
+    
+    Writes of different workers only exclude each other through lock files,
+    so with several workers WRITE_LOCK_DIR defaults to data/locks. An event
+    stream holds a thread of its worker until the client leaves, so each
+    worker accepts at most half as many streams as it has threads, keeping
+    the other half for the other requests.
+    
+    Args:
+        workers: Number of worker processes
+        threads: Number of threads per worker
+    """
+    if workers > 1 and not active_config.WRITE_LOCK_DIR:
+        active_config.WRITE_LOCK_DIR = str(DEFAULT_LOCK_DIR)
+        logger.info(f"Sharing the write locks of {workers} workers through {DEFAULT_LOCK_DIR}")
+    
+    max_streams = max(1, threads // 2)
+    if active_config.EVENTS_MAX_SUBSCRIBERS > max_streams:
+        logger.info(f"Limiting event streams to {max_streams} per worker, half of its {threads} threads")
+        active_config.EVENTS_MAX_SUBSCRIBERS = max_streams
+
+
+def warm_up(app: Flask) -> None:
+    """
+    Prepare a worker before it serves its first request.
+    
+    Creates the storage backend and makes one cheap read, which opens its
+    connection (and, on Firebase, fetches an access token), then compiles the
+    page templates. A failed warm-up is logged, not raised: the worker still
+    serves, and the backend connects on first use instead.
+    
+    Args:
+        app: The Flask application served by the worker
+    """
+    started = perf_counter()
+    therapist_count: Optional[int] = None
+    try:
+        therapist_count = len(list_therapist_ids())
+    except Exception as e:
+        logger.warning(f"Storage backend warm-up failed in worker {os.getpid()}, connecting on first use: {e}")
+    
+    for name in app.jinja_env.list_templates():
+        app.jinja_env.get_template(name)
+    
+    logger.info(f"Worker {os.getpid()} warmed up in {(perf_counter() - started) * 1000:.0f}ms ({therapist_count} therapists)")
+
+
+def init_worker(app: Flask) -> None:
+    """
+    Initialize a worker process after it was forked.
+    
+    Args:
+        app: The Flask application served by the worker
+    """
+    if active_config.SERVER_WARMUP:
+        warm_up(app)
+    
+    # Every worker runs the job; runs are serialized per therapist by the write locks
+    if active_config.ARCHIVE_INTERVAL_SECONDS > 0:
+        start_archive_scheduler(active_config.ARCHIVE_INTERVAL_SECONDS)
+
+
+def end_event_streams_on_signal(signum: int = signal.SIGTERM) -> None:
+    """
+    End the open event streams when the process receives a signal, then run its previous handler.
+    
+    A server shutting down gracefully waits for its requests to finish, which
+    event streams otherwise only do when their clients leave.
+    
+    Args:
+        signum: Signal that starts the shutdown
+    """
+    previous = signal.getsignal(signum)
+    
+    def handler(received: int, frame) -> None:
+        # The interrupted code may hold the locks of the subscriptions, so another thread closes them
+        threading.Thread(target=close_slot_event_streams, name="end-event-streams", daemon=True).start()
+        if callable(previous):
+            previous(received, frame)
+    
+    signal.signal(signum, handler)
+
+
+def shutdown_worker() -> None:
+    """Stop the background jobs, end the event streams and close the storage backend of a worker."""
+    stop_archive_scheduler()
+    try:
+        closed = close_slot_event_streams()
+        close_backend()
+        logger.info(f"Worker {os.getpid()} shut down ({closed} event streams ended)")
+    except Exception as e:
+        logger.error(f"Error shutting down worker {os.getpid()}: {e}")
@@ -1,11 +1,28 @@
 from app.utils.date_utils import (
     is_valid_appointment_slot,
     is_valid_booking_time,
-    format_time_slot
+    format_time_slot,
+    to_epoch,
+    epoch_to_datetime,
+    epoch_to_iso,
+    epoch_to_date,
+    date_to_epoch,
+    month_start,
+    parse_weekdays
 )
+from app.utils.concurrency import fan_out, TIMEOUT
 
 __all__ = [
     "is_valid_appointment_slot",
     "is_valid_booking_time",
-    "format_time_slot"
+    "format_time_slot",
+    "to_epoch",
+    "epoch_to_datetime",
+    "epoch_to_iso",
+    "epoch_to_date",
+    "date_to_epoch",
+    "month_start",
+    "parse_weekdays",
+    "fan_out",
+    "TIMEOUT"
 ]
@@ -0,0 +1,87 @@
+"""
+Helpers for running independent blocking calls concurrently.
+"""
+from concurrent.futures import Executor, Future, wait, FIRST_COMPLETED
+from typing import Any, Callable, Dict, Hashable, Iterable, Tuple
+import contextvars
+import threading
+import time
+
+from app.utils.profiler import profile_call
+
+TIMEOUT = "timeout"
+
+
+def fan_out(
+    executor: Executor,
+    func: Callable[[Any], Any],
+    keys: Iterable[Hashable],
+    item_timeout: float,
+    deadline: float
+) -> Dict[Hashable, Tuple[bool, Any]]:
+    """
+    Call a function once per key on an executor and collect what finishes in time.
+    
+    Each call may run for item_timeout seconds from the moment a worker picks
+    it up, and nothing is waited for once the request deadline has passed.
+    Calls still queued at that point are cancelled; calls already running
+    cannot be interrupted, so they finish in the background and their result
+    is discarded.
+    
+    Args:
+        executor: Executor running the calls, whose size bounds the concurrency
+        func: Function called with each key
+        keys: Keys to call the function with; duplicates are called once
+        item_timeout: Maximum time in seconds for a single call
+        deadline: Maximum time in seconds to wait for all calls
+    
+    Returns:
+        Dict mapping each key to (True, result) on success, or to (False, error)
+        where error is TIMEOUT or the message of the exception raised
+    """
+    clock = time.monotonic
+    deadline_at = clock() + deadline
+    started: Dict[Hashable, float] = {}
+    started_lock = threading.Lock()
+    
+    def run(key: Hashable) -> Any:
+        with started_lock:
+            started[key] = clock()
+        return profile_call(func, key)
+    
+    futures: Dict[Future, Hashable] = {}
+    for key in dict.fromkeys(keys):
+        # Each call runs in a copy of the caller's context, e.g. its per-request metrics
+        futures[executor.submit(contextvars.copy_context().run, run, key)] = key
+    
+    results: Dict[Hashable, Tuple[bool, Any]] = {}
+    pending = set(futures)
+    
+    while pending:
+        now = clock()
+        if now >= deadline_at:
+            break
+        
+        # Wake up for the first completion, the deadline, or the earliest
+        # running call reaching its own timeout
+        with started_lock:
+            running_since = [started[futures[f]] for f in pending if futures[f] in started]
+        wake_at = min([deadline_at] + [t + item_timeout for t in running_since])
+        done, pending = wait(pending, timeout=max(wake_at - now, 0), return_when=FIRST_COMPLETED)
+        
+        for future in done:
+            error = future.exception()
+            results[futures[future]] = (False, str(error)) if error else (True, future.result())
+        
+        now = clock()
+        with started_lock:
+            expired = {f for f in pending if futures[f] in started and now - started[futures[f]] >= item_timeout}
+        for future in expired:
+            results[futures[future]] = (False, TIMEOUT)
+        pending -= expired
+    
+    for future in pending:
+        future.cancel()
+        results[futures[future]] = (False, TIMEOUT)
+    
+    return results
@@ -0,0 +1,282 @@
+"""
+In-process metrics in the Prometheus text exposition format.
+
+Counters, gauges and histograms are kept in memory, per label values, and
+rendered on demand by the /metrics endpoint. Nothing is sent anywhere: a
+Prometheus server (or curl) scrapes the endpoint.
+"""
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import math
+import threading
+
+# Prometheus default latency buckets, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Payload size buckets, in bytes (256 B to 16 MiB)
+BYTES_BUCKETS = tuple(256 * 4 ** i for i in range(9))
+# Buckets of per-request item counts
+COUNT_BUCKETS = (0, 1, 10, 100, 1000, 10000, 100000)
+
+# Label value of therapists beyond the label limit
+OTHER_LABEL = "_other"
+
+
+def _escape(value: str) -> str:
+    """Escape a label value for the text exposition format."""
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_value(value: float) -> str:
+    """Format a sample value, with +Inf for infinity and integers without a decimal point."""
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    """Format a label set, e.g. {route="/api",status="200"}, or nothing without labels."""
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    """State shared by every metric type: name, help text, label names and a lock."""
+    
+    kind = "untyped"
+    
+    def __init__(self, name: str, documentation: str, label_names: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+    
+    def _key(self, labels: Tuple[str, ...]) -> Tuple[str, ...]:
+        """Check and normalize label values given in label name order."""
+        if len(labels) != len(self.label_names):
+            raise ValueError(f"{self.name} expects labels {self.label_names}, got {labels}")
+        return tuple(str(value) for value in labels)
+    
+    def render(self) -> List[str]:
+        """Return the HELP, TYPE and sample lines of the metric."""
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+    
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """A value that only goes up, e.g. a number of requests."""
+    
+    kind = "counter"
+    
+    def __init__(self, name: str, documentation: str, label_names: Iterable[str] = ()):
+        super().__init__(name, documentation, label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+    
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        """Add an amount (default 1) to the counter of the given label values."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+    
+    def set(self, value: float, *labels: str) -> None:
+        """Set the counter of the given label values, to mirror a counter kept elsewhere."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+    
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}" for key, value in values]
+
+
+class Gauge(_Metric):
+    """A value that goes up and down, e.g. requests in flight."""
+    
+    kind = "gauge"
+    
+    def __init__(self, name: str, documentation: str, label_names: Iterable[str] = ()):
+        super().__init__(name, documentation, label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+    
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        """Add an amount (default 1) to the gauge of the given label values."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+    
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        """Subtract an amount (default 1) from the gauge of the given label values."""
+        self.inc(*labels, amount=-amount)
+    
+    def set(self, value: float, *labels: str) -> None:
+        """Set the gauge of the given label values."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+    
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}" for key, value in values]
+
+
+class Histogram(_Metric):
+    """
+    Observations counted into cumulative buckets, e.g. request latencies.
+    
+    Quantiles such as the p99 are computed by the Prometheus server from the
+    buckets (histogram_quantile), so the buckets should bracket the values
+    of interest.
+    """
+    
+    kind = "histogram"
+    
+    def __init__(self, name: str, documentation: str, label_names: Iterable[str] = (), buckets: Iterable[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets))
+        # Label values -> (count per bucket, the last one being +Inf, sum of observations)
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+    
+    def observe(self, value: float, *labels: str) -> None:
+        """Record an observation for the given label values."""
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = ([0] * (len(self.buckets) + 1), [0.0])
+            entry[0][index] += 1
+            entry[1][0] += value
+    
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = sorted((key, (list(counts), total[0])) for key, (counts, total) in self._values.items())
+        
+        lines = []
+        for key, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {cumulative}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    The metrics of a process, rendered together.
+    
+    Collectors are called before rendering, to refresh gauges that mirror
+    state kept elsewhere, e.g. cache counters.
+    """
+    
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+    
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.label_names != metric.label_names:
+                    raise ValueError(f"Metric {metric.name} is already registered differently")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+    
+    def counter(self, name: str, documentation: str, label_names: Iterable[str] = ()) -> Counter:
+        """Create a counter, or return the one already registered under that name."""
+        return self._register(Counter(name, documentation, label_names))
+    
+    def gauge(self, name: str, documentation: str, label_names: Iterable[str] = ()) -> Gauge:
+        """Create a gauge, or return the one already registered under that name."""
+        return self._register(Gauge(name, documentation, label_names))
+    
+    def histogram(self, name: str, documentation: str, label_names: Iterable[str] = (), buckets: Iterable[float] = LATENCY_BUCKETS) -> Histogram:
+        """Create a histogram, or return the one already registered under that name."""
+        return self._register(Histogram(name, documentation, label_names, buckets))
+    
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        """Call a function before every rendering."""
+        with self._lock:
+            self._collectors.append(collector)
+    
+    def render(self) -> str:
+        """Return every metric in the text exposition format (version 0.0.4)."""
+        with self._lock:
+            collectors = list(self._collectors)
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        for collector in collectors:
+            collector()
+        return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
+
+
+class BoundedLabel:
+    """
+    Keep a label with unbounded values, such as a therapist id, to a fixed
+    number of distinct values.
+    
+    The first values seen keep their own label; later ones share OTHER_LABEL,
+    so a large clinic cannot blow up the number of series.
+    """
+    
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._seen: set = set()
+        self._lock = threading.Lock()
+    
+    def __call__(self, value: str) -> str:
+        if value in self._seen:
+            return value
+        with self._lock:
+            if len(self._seen) < self.limit:
+                self._seen.add(value)
+                return value
+        return OTHER_LABEL
+
+
+class RequestTally:
+    """
+    A running total for the current request, e.g. of slots parsed.
+    
+    The total lives in a context variable, so concurrent requests never mix,
+    and code running on worker threads adds to the request that started it
+    as long as it runs in a copy of the request's context.
+    """
+    
+    def __init__(self, name: str):
+        self._total = ContextVar(name, default=None)
+    
+    def start(self) -> None:
+        """Start counting for the current request."""
+        self._total.set([0])
+    
+    def add(self, amount: int) -> None:
+        """Add to the total of the current request; a no-op outside of a request."""
+        total = self._total.get()
+        if total is not None:
+            total[0] += amount
+    
+    def finish(self) -> Optional[int]:
+        """Stop counting and return the total, or None if counting never started."""
+        total = self._total.get()
+        self._total.set(None)
+        return total[0] if total is not None else None
+
+
+# Metrics of this process
+REGISTRY = MetricsRegistry()
+
+# Slots decoded from the storage backend while handling the current request
+SLOTS_PARSED = RequestTally("slots_parsed")
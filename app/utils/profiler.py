@@ -0,0 +1,196 @@
+"""
+On-demand profiling of sampled or flagged requests.
+
+A profiled request runs under cProfile, and optionally tracemalloc, and its
+results are written to a local directory as a pstats file (.prof) and a
+tracemalloc snapshot (.tracemalloc), named after the time, the route and the
+therapist of the request. When profiling is disabled no hook is installed,
+so requests pay nothing for it.
+
+Open the results with the standard library, e.g.:
+
+    python -m pstats data/profiles/<name>.prof
+    tracemalloc.Snapshot.load("data/profiles/<name>.tracemalloc").statistics("lineno")
+"""
+from contextvars import ContextVar
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Optional
+import cProfile
+import logging
+import pstats
+import random
+import re
+import threading
+import time
+import tracemalloc
+
+from flask import Flask, Response, g, request
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Response header naming the files of a profiled request
+RESULT_HEADER = "X-Profile-Id"
+
+# Frames kept per traced allocation
+TRACEMALLOC_FRAMES = 10
+
+# Only one request is profiled at a time: profilers and tracemalloc are
+# process-wide from Python 3.12 on, and concurrent profiles would skew each other
+_active_lock = threading.Lock()
+
+# Profiles of fan_out() calls made on worker threads for the profiled request
+_worker_profiles = ContextVar("worker_profiles", default=None)
+
+
+def _slug(value: str, max_length: int = 60) -> str:
+    """Turn a route or an id into a short string safe in a file name."""
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", value).strip("_.")[:max_length] or "none"
+
+
+def _request_therapist_id() -> Optional[str]:
+    """Return the therapist a request is about, from its URL, query string or JSON body."""
+    therapist_id = (request.view_args or {}).get("therapist_id") or request.args.get("therapist_id")
+    if therapist_id is None and request.is_json:
+        body = request.get_json(silent=True)
+        if isinstance(body, dict):
+            therapist_id = body.get("therapist_id")
+    return str(therapist_id) if therapist_id is not None else None
+
+
+def profile_call(func: Callable[..., Any], *args: Any) -> Any:
+    """
+    Call a function, profiling it when it runs on behalf of a profiled request.
+    
+    Used for calls that a request hands to worker threads, which the request's
+    own profiler does not see. Outside of a profiled request this is a plain
+    call.
+    """
+    profiles = _worker_profiles.get()
+    if profiles is None:
+        return func(*args)
+    
+    profile = cProfile.Profile()
+    try:
+        profile.enable()
+    except ValueError:
+        # Another profiler is active in this process (Python 3.12+)
+        return func(*args)
+    try:
+        return func(*args)
+    finally:
+        profile.disable()
+        profiles.append(profile)
+
+
+def init_profiler(
+    app: Flask,
+    directory: str,
+    sample_rate: float = 0.0,
+    token: str = "",
+    header: str = "X-Profile-Token",
+    trace_memory: bool = False
+) -> bool:
+    """
+    Install request profiling hooks on an application, if profiling is enabled.
+    
+    A request is profiled when it carries the header with the configured
+    token, or else with a probability of sample_rate. The response of a
+    profiled request names its result files in the X-Profile-Id header.
+    
+    Args:
+        app: Application to profile
+        directory: Directory the results are written to, created if needed
+        sample_rate: Fraction of requests to profile, from 0 to 1
+        token: Secret that triggers profiling when sent in the header; empty disables the header
+        header: Name of the request header carrying the token
+        trace_memory: Also record allocations with tracemalloc and write a snapshot
+    
+    Returns:
+        bool: True if the hooks were installed, False if profiling is disabled
+    """
+    if sample_rate <= 0 and not token:
+        return False
+    
+    output_dir = Path(directory)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    
+    @app.before_request
+    def _start_profile() -> None:
+        flagged = bool(token) and request.headers.get(header) == token
+        if not (flagged or (sample_rate > 0 and random.random() < sample_rate)):
+            return
+        if not _active_lock.acquire(blocking=False):
+            logger.info(f"Not profiling {request.path}: another request is being profiled")
+            return
+        
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError as e:
+            _active_lock.release()
+            logger.warning(f"Not profiling {request.path}: {e}")
+            return
+        
+        g.profile = profile
+        g.profile_started = time.perf_counter()
+        g.profile_workers = []
+        _worker_profiles.set(g.profile_workers)
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+            g.profile_memory = True
+    
+    def finish_profile() -> Optional[str]:
+        # Stop profiling the current request and write its results; returns their name
+        profile = g.pop("profile", None)
+        if profile is None:
+            return None
+        
+        try:
+            profile.disable()
+            elapsed_ms = (time.perf_counter() - g.profile_started) * 1000
+            _worker_profiles.set(None)
+            snapshot = None
+            if g.pop("profile_memory", False):
+                snapshot = tracemalloc.take_snapshot()
+                tracemalloc.stop()
+            
+            route = request.url_rule.rule if request.url_rule else request.path
+            name = "-".join((
+                datetime.now().strftime("%Y%m%dT%H%M%S.%f"),
+                request.method.lower(),
+                _slug(route),
+                _slug(_request_therapist_id() or "none"),
+                f"{elapsed_ms:.0f}ms"
+            ))
+            
+            stats = pstats.Stats(profile)
+            for worker_profile in list(g.profile_workers):
+                stats.add(worker_profile)
+            stats.dump_stats(str(output_dir / f"{name}.prof"))
+            if snapshot is not None:
+                snapshot.dump(str(output_dir / f"{name}.tracemalloc"))
+            
+            logger.info(f"Profiled {request.method} {request.path} in {elapsed_ms:.1f} ms: {output_dir / name}.prof")
+            return name
+        except Exception as e:
+            logger.error(f"Error writing the profile of {request.path}: {e}")
+            return None
+        finally:
+            _active_lock.release()
+    
+    @app.after_request
+    def _stop_profile(response: Response) -> Response:
+        name = finish_profile()
+        if name is not None:
+            response.headers[RESULT_HEADER] = name
+        return response
+    
+    @app.teardown_request
+    def _abort_profile(error: Optional[BaseException] = None) -> None:
+        # Requests that failed before after_request still release the profiler
+        finish_profile()
+    
+    logger.info(f"Profiling requests (sample rate {sample_rate:g}, header {'on' if token else 'off'}) into {output_dir}")
+    return True
@@ -0,0 +1,3 @@
+"""
+Benchmarks of the scheduling operations, run as scripts (see README.md).
+"""
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark of the slot listing serialization.
+
+Compares the response model path (TimeSlotResponse models, dicts with
+isoformat() datetimes, then jsonify) with the fast path of
+app.services.serialization, once per available JSON encoder, and checks that
+every path produces the same JSON document.
+
+Usage:
+    python benchmarks/bench_serialization.py [--sizes 1000 10000] [--repeat 5]
+"""
+
+import argparse
+import json
+import logging
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from flask import Flask, jsonify
+
+from app.integrations import TimeSlot
+from app.schemas.time_slot import TimeSlotResponse
+from app.services.serialization import ENCODERS, encode_slots_response, set_encoder
+
+THERAPIST_ID = "therapist-1"
+# First slot of the generated listings, on an hour boundary
+FIRST_START = 1_900_000_000 // 3600 * 3600
+
+
+def make_slots(count: int) -> List[TimeSlot]:
+    """Return count consecutive one hour slots, alternately free and busy."""
+    return [
+        TimeSlot.from_epoch(FIRST_START + i * 3600, FIRST_START + (i + 1) * 3600, i % 2)
+        for i in range(count)
+    ]
+
+
+def to_responses(therapist_id: str, slots: List[TimeSlot]) -> List[TimeSlotResponse]:
+    """Convert slots of a therapist to response models, as list_slots did before the fast path."""
+    return [
+        TimeSlotResponse(
+            therapist_id=therapist_id,
+            start_time=slot.start_time,
+            end_time=slot.end_time,
+            status=slot.status
+        ) for slot in slots
+    ]
+
+
+def model_path(slots: List[TimeSlot]) -> bytes:
+    """Serialize slots the way list_slots did before the fast path."""
+    slots_data = [
+        {
+            "therapist_id": slot.therapist_id,
+            "start_time": slot.start_time.isoformat(),
+            "end_time": slot.end_time.isoformat(),
+            "status": slot.status
+        } for slot in to_responses(THERAPIST_ID, slots)
+    ]
+    return jsonify({"success": True, "slots": slots_data}).get_data()
+
+
+def best_time(func: Callable[[], bytes], repeat: int) -> float:
+    """Return the fastest of repeat runs, in seconds."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark slot listing serialization")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000], help="Numbers of slots to serialize")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement; the fastest is reported")
+    args = parser.parse_args()
+    logging.getLogger("app").setLevel(logging.WARNING)
+    
+    encoders = []
+    for name in ENCODERS:
+        try:
+            set_encoder(name)
+            encoders.append(name)
+        except ImportError:
+            print(f"Skipping {name} encoder: not installed")
+    
+    app = Flask(__name__)
+    with app.app_context():
+        print(f"{'slots':>8}  {'path':<16}{'ms':>10}{'speedup':>10}")
+        for size in args.sizes:
+            slots = make_slots(size)
+            expected = json.loads(model_path(slots))
+            baseline = best_time(lambda: model_path(slots), args.repeat)
+            print(f"{size:>8}  {'models+jsonify':<16}{baseline * 1000:>10.2f}{1.0:>9.1f}x")
+            
+            results: Dict[str, float] = {}
+            for name in encoders:
+                set_encoder(name)
+                if json.loads(encode_slots_response(THERAPIST_ID, slots)) != expected:
+                    print(f"Output of the fast path with {name} differs from the model path")
+                    return 1
+                results[name] = best_time(lambda: encode_slots_response(THERAPIST_ID, slots), args.repeat)
+                print(f"{size:>8}  {'fast+' + name:<16}{results[name] * 1000:>10.2f}{baseline / results[name]:>9.1f}x")
+    
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
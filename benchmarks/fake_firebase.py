@@ -0,0 +1,277 @@
+"""
+In-memory stand-in for a Firebase Realtime Database reference.
+
+Implements the subset of firebase_admin.db.Reference used by FirebaseBackend
+(child, get, set, update, delete, transaction, listen and order_by_key range
+queries) over a tree of dicts, so the real backend code runs without a network. Data
+goes in and out as JSON text, as it would over the wire, so reads pay for
+decoding like they do against a live database and callers never share
+objects with the tree. Like the database, the fake stores lists as dicts
+keyed by index, returns such dicts as lists when most indexes are present,
+and rejects transactions whose update returns None.
+"""
+from typing import Any, Callable, Dict, List, Optional
+import json
+import queue
+import threading
+
+
+class InMemoryDatabase:
+    """The tree of a fake database, shared by all its references."""
+    
+    def __init__(self):
+        self.root: Dict[str, Any] = {}
+        self.lock = threading.RLock()
+        self.listeners: List["InMemoryListener"] = []
+    
+    def reference(self, path: str = "") -> "InMemoryReference":
+        """Return a reference to a path of this database."""
+        return InMemoryReference(self, path)
+    
+    def notify(self, parts: List[str], event_type: str, data: Any) -> None:
+        """
+        Queue the events of a write at a path for the listeners it concerns.
+        
+        Listeners at or above the path get the change itself. Listeners below
+        it get the part of a multi-path update that falls within their node as
+        a patch, and a put of their whole node otherwise. Caller holds the lock.
+        """
+        for listener in self.listeners:
+            if parts[:len(listener.parts)] == listener.parts:
+                listener.queue.put(InMemoryEvent(event_type, "/" + "/".join(parts[len(listener.parts):]), json.loads(json.dumps(data))))
+            elif listener.parts[:len(parts)] == parts and event_type == "patch" and not any(
+                listener.parts[len(parts):][:len(_split(path))] == _split(path) for path in data
+            ):
+                relative = listener.parts[len(parts):]
+                below = {
+                    "/".join(_split(path)[len(relative):]): child
+                    for path, child in data.items()
+                    if _split(path)[:len(relative)] == relative
+                }
+                if below:
+                    listener.queue.put(InMemoryEvent("patch", "/", json.loads(json.dumps(below))))
+            elif listener.parts[:len(parts)] == parts:
+                node = InMemoryReference(self, "/".join(listener.parts))._node()
+                listener.queue.put(InMemoryEvent("put", "/", json.loads(json.dumps(node))))
+
+
+class InMemoryEvent:
+    """A change reported to a listener, like firebase_admin.db.Event."""
+    
+    def __init__(self, event_type: str, path: str, data: Any):
+        self.event_type = event_type
+        self.path = path
+        self.data = data
+
+
+class InMemoryListener:
+    """A listener on a path, calling its callback from its own thread like a ListenerRegistration."""
+    
+    def __init__(self, database: InMemoryDatabase, parts: List[str], callback: Callable[[InMemoryEvent], None]):
+        self.database = database
+        self.parts = parts
+        self.queue: "queue.Queue[Optional[InMemoryEvent]]" = queue.Queue()
+        self._callback = callback
+        self._thread = threading.Thread(target=self._run, name="fake-firebase-listener", daemon=True)
+        self._thread.start()
+    
+    def _run(self) -> None:
+        while True:
+            event = self.queue.get()
+            if event is None:
+                return
+            self._callback(event)
+    
+    def close(self) -> None:
+        with self.database.lock:
+            if self in self.database.listeners:
+                self.database.listeners.remove(self)
+        self.queue.put(None)
+        if threading.current_thread() is not self._thread:
+            self._thread.join()
+
+
+def _split(path: str) -> List[str]:
+    return [part for part in path.split("/") if part]
+
+
+def _resolve_increments(current: Any, value: Any) -> Any:
+    """Apply server-side increments ({".sv": {"increment": n}}) of a value against the current data."""
+    if isinstance(value, dict):
+        if ".sv" in value:
+            return (current if isinstance(current, (int, float)) else 0) + value[".sv"]["increment"]
+        return {key: _resolve_increments(current.get(key) if isinstance(current, dict) else None, child) for key, child in value.items()}
+    return value
+
+
+def _prune(value: Any) -> Any:
+    """Drop None values and empty dicts, which the database does not store, and store lists as dicts keyed by index."""
+    if isinstance(value, list):
+        value = {str(index): child for index, child in enumerate(value)}
+    if isinstance(value, dict):
+        pruned = {key: _prune(child) for key, child in value.items()}
+        pruned = {key: child for key, child in pruned.items() if child is not None}
+        return pruned or None
+    return value
+
+
+def _as_returned(value: Any) -> Any:
+    """
+    Return a decoded copy of stored data the way the database returns it, converting it in place.
+    
+    A dict whose keys are all integers comes back as a list, with None for
+    the missing indexes, when more than half of the indexes up to the
+    largest one are present.
+    """
+    if not isinstance(value, dict):
+        return value
+    for key, child in value.items():
+        if isinstance(child, dict):
+            value[key] = _as_returned(child)
+    if value and all(key.isdigit() for key in value):
+        size = max(int(key) for key in value) + 1
+        if len(value) * 2 > size:
+            return [value.get(str(index)) for index in range(size)]
+    return value
+
+
+def _copy(value: Any) -> Any:
+    """Return a copy of stored data as the database returns it."""
+    return _as_returned(json.loads(json.dumps(value))) if value is not None else None
+
+
+class InMemoryQuery:
+    """An order_by_key() query with optional start_at() and end_at() bounds."""
+    
+    def __init__(self, reference: "InMemoryReference"):
+        self._reference = reference
+        self._start: Optional[str] = None
+        self._end: Optional[str] = None
+    
+    def start_at(self, key: str) -> "InMemoryQuery":
+        self._start = key
+        return self
+    
+    def end_at(self, key: str) -> "InMemoryQuery":
+        self._end = key
+        return self
+    
+    def get(self) -> Optional[Dict[str, Any]]:
+        database = self._reference.database
+        with database.lock:
+            node = self._reference._node()
+            if not isinstance(node, dict):
+                return None
+            selected = {
+                key: child for key, child in node.items()
+                if (self._start is None or key >= self._start) and (self._end is None or key <= self._end)
+            }
+            encoded = json.dumps(dict(sorted(selected.items()))) if selected else None
+        return {key: _as_returned(child) for key, child in json.loads(encoded).items()} if encoded else None
+
+
+class InMemoryReference:
+    """A reference to a path of an InMemoryDatabase."""
+    
+    def __init__(self, database: InMemoryDatabase, path: str = ""):
+        self.database = database
+        self.path = "/".join(_split(path))
+    
+    @property
+    def key(self) -> Optional[str]:
+        parts = _split(self.path)
+        return parts[-1] if parts else None
+    
+    def child(self, path: str) -> "InMemoryReference":
+        return InMemoryReference(self.database, f"{self.path}/{path}")
+    
+    def _node(self) -> Any:
+        # Caller holds the lock
+        node: Any = self.database.root
+        for part in _split(self.path):
+            if not isinstance(node, dict) or part not in node:
+                return None
+            node = node[part]
+        return node
+    
+    def _set_at(self, parts: List[str], value: Any) -> None:
+        # Caller holds the lock; value is already resolved and pruned
+        if not parts:
+            self.database.root = value if isinstance(value, dict) else {}
+            return
+        parents = [self.database.root]
+        for part in parts[:-1]:
+            node = parents[-1]
+            if not isinstance(node.get(part), dict):
+                if value is None:
+                    return
+                node[part] = {}
+            parents.append(node[part])
+        if value is None:
+            parents[-1].pop(parts[-1], None)
+        else:
+            parents[-1][parts[-1]] = value
+        # Remove the parents left empty
+        for depth in range(len(parts) - 1, 0, -1):
+            if parents[depth]:
+                break
+            parents[depth - 1].pop(parts[depth - 1], None)
+    
+    def get(self, shallow: bool = False) -> Any:
+        with self.database.lock:
+            node = self._node()
+            if shallow and isinstance(node, dict):
+                return {key: True for key in node}
+            encoded = json.dumps(node) if node is not None else None
+        return _as_returned(json.loads(encoded)) if encoded is not None else None
+    
+    def set(self, value: Any) -> None:
+        value = _prune(json.loads(json.dumps(value)))
+        with self.database.lock:
+            self._set_at(_split(self.path), value)
+            self.database.notify(_split(self.path), "put", value)
+    
+    def update(self, value: Dict[str, Any]) -> None:
+        """Set several paths below this reference at once, like a multi-path update."""
+        value = json.loads(json.dumps(value))
+        with self.database.lock:
+            resolved = {}
+            for path, child in value.items():
+                parts = _split(self.path) + _split(path)
+                current = InMemoryReference(self.database, "/".join(parts))._node()
+                resolved[path] = _prune(_resolve_increments(current, child))
+                self._set_at(parts, resolved[path])
+            self.database.notify(_split(self.path), "patch", resolved)
+    
+    def delete(self) -> None:
+        with self.database.lock:
+            self._set_at(_split(self.path), None)
+            self.database.notify(_split(self.path), "put", None)
+    
+    def transaction(self, transaction_update: Callable[[Any], Any]) -> Any:
+        """
+        Run a transaction on this node; exceptions raised by the update abort it.
+        
+        Transactions run under the database lock, so they never need the
+        retries of the real client. As with the real client, the update must
+        not return None; a node is deleted by returning an empty dict.
+        """
+        with self.database.lock:
+            current = self._node()
+            new_value = transaction_update(_copy(current))
+            if new_value is None:
+                raise ValueError("Value must not be none.")
+            self._set_at(_split(self.path), _prune(json.loads(json.dumps(new_value))))
+            self.database.notify(_split(self.path), "put", new_value)
+            return new_value
+    
+    def listen(self, callback: Callable[[InMemoryEvent], None]) -> InMemoryListener:
+        """Call back with the current data of this node, then with every change of it, until closed."""
+        with self.database.lock:
+            listener = InMemoryListener(self.database, _split(self.path), callback)
+            listener.queue.put(InMemoryEvent("put", "/", _copy(self._node())))
+            self.database.listeners.append(listener)
+        return listener
+    
+    def order_by_key(self) -> InMemoryQuery:
+        return InMemoryQuery(self)
@@ -0,0 +1,438 @@
+#!/usr/bin/env python3
+"""
+HTTP load harness with booking contention and post-run verification.
+
+Serves create_app() from a local HTTP server on a stand-in backend (the real
+FirebaseBackend on an in-memory database, or SQLite in a temporary file),
+and drives a weighted mix of slot listings, /therapists fan-outs, bookings
+and cancellations at it from many client threads, optionally spread over
+several processes. A share of the bookings and cancellations targets the
+same "hot" therapist, so clients keep racing for the same slots.
+
+After the run, every slot is checked against the responses the clients got:
+- a double booking is a slot with more successful bookings than cancellations
+  plus one, i.e. two clients were both told they got it
+- a double cancellation is a slot with more successful cancellations than bookings
+- a lost update is a slot whose final status differs from what the successful
+  bookings and cancellations add up to
+- a counter mismatch is a day whose stats counters differ from its slots
+Slots with a request of unknown outcome (transport error or server error) are
+left out of the slot checks and reported as unverifiable.
+
+Usage:
+    python benchmarks/load.py [--duration 10] [--threads 16] [--processes 1]
+                              [--mix list=40,therapists=10,book=35,cancel=15]
+                              [--backend memory|sqlite] [--output report.json]
+
+The exit status is 1 if verification finds an anomaly, the error rate is
+above --max-error-rate or the throughput is below --min-rps.
+"""
+
+import argparse
+import http.client
+import json
+import logging
+import math
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from werkzeug.serving import make_server
+
+from app import create_app
+from app.integrations import StorageBackend, TimeSlot, set_backend
+
+OPERATIONS = ("list", "therapists", "book", "cancel")
+DEFAULT_MIX = "list=40,therapists=10,book=35,cancel=15"
+
+# Slots are opened from 9:00 to 17:00 on each day, starting tomorrow
+OPENING_HOURS = range(9, 17)
+
+# A sample: (operation, HTTP status or 0 on transport error, latency in seconds,
+# therapist, slot time, monotonic start, monotonic end)
+Sample = Tuple[str, int, float, str, str, float, float]
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    """
+    Parse an operation mix such as "list=40,book=60" into weights.
+    
+    Raises:
+        ValueError: If an operation is unknown or no weight is positive
+    """
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise ValueError(f"Unknown operation '{name}'. Choose from: {', '.join(OPERATIONS)}")
+        mix[name] = float(weight or 1)
+    if sum(mix.values()) <= 0:
+        raise ValueError("The mix needs at least one operation with a positive weight")
+    return mix
+
+
+def create_stand_in_backend(kind: str) -> StorageBackend:
+    """
+    Create an empty local backend.
+    
+    Args:
+        kind: 'memory' for FirebaseBackend on an in-memory database, or 'sqlite'
+              for SQLiteBackend on a temporary file
+    """
+    if kind == "memory":
+        from app.integrations.firebase_db import FirebaseBackend
+        from benchmarks.fake_firebase import InMemoryDatabase
+        return FirebaseBackend(ref=InMemoryDatabase().reference("appointments"))
+    if kind == "sqlite":
+        from app.integrations.sqlite_db import SQLiteBackend
+        handle, path = tempfile.mkstemp(prefix="load-", suffix=".db")
+        os.close(handle)
+        return SQLiteBackend(path=path)
+    raise ValueError(f"Unknown backend '{kind}'. Use memory or sqlite.")
+
+
+def seed_slots(backend: StorageBackend, therapist_ids: List[str], first_day: date, days: int) -> Dict[str, List[str]]:
+    """
+    Open free slots for every therapist during OPENING_HOURS on each day.
+    
+    Returns:
+        Dict mapping each therapist to the ISO start times of its slots
+    """
+    slot_times = {}
+    slots_by_therapist = {}
+    for therapist_id in therapist_ids:
+        starts = [
+            datetime.combine(first_day + timedelta(days=offset), datetime.min.time()) + timedelta(hours=hour)
+            for offset in range(days) for hour in OPENING_HOURS
+        ]
+        slots_by_therapist[therapist_id] = [TimeSlot(start, start + timedelta(hours=1)) for start in starts]
+        slot_times[therapist_id] = [start.isoformat() for start in starts]
+    backend.insert_slots(slots_by_therapist)
+    return slot_times
+
+
+def drive(
+    host: str,
+    port: int,
+    slot_times: Dict[str, List[str]],
+    mix: Dict[str, float],
+    hot_fraction: float,
+    threads: int,
+    duration: float,
+    seed: int
+) -> List[Sample]:
+    """
+    Send requests from client threads until the duration has passed.
+    
+    Runs in the calling process, or in a worker process when several are
+    used, so it only takes plain data.
+    
+    Returns:
+        One sample per request
+    """
+    therapist_ids = sorted(slot_times)
+    days = sorted({slot_time[:10] for times in slot_times.values() for slot_time in times})
+    all_ids = ",".join(therapist_ids)
+    operations, weights = zip(*mix.items())
+    deadline = time.monotonic() + duration
+    samples: List[Sample] = []
+    samples_lock = threading.Lock()
+    
+    def client(client_seed: int) -> None:
+        rng = random.Random(client_seed)
+        connection = http.client.HTTPConnection(host, port, timeout=30)
+        local: List[Sample] = []
+        while time.monotonic() < deadline:
+            operation = rng.choices(operations, weights)[0]
+            therapist_id = therapist_ids[0] if rng.random() < hot_fraction else rng.choice(therapist_ids)
+            slot_time = rng.choice(slot_times[therapist_id])
+            if operation == "list":
+                method, path, body = "GET", f"/api/appointments/therapist/{therapist_id}/slots?date={rng.choice(days)}", None
+            elif operation == "therapists":
+                method, path, body = "GET", f"/api/appointments/therapists?date={rng.choice(days)}&therapist_ids={all_ids}", None
+            else:
+                method, path = "POST", f"/api/appointments/{operation}"
+                body = json.dumps({"therapist_id": therapist_id, "slot_time": slot_time})
+            
+            started = time.monotonic()
+            try:
+                connection.request(method, path, body=body, headers={"Content-Type": "application/json"} if body else {})
+                response = connection.getresponse()
+                response.read()
+                status = response.status
+            except (OSError, http.client.HTTPException):
+                status = 0
+                connection.close()
+                connection = http.client.HTTPConnection(host, port, timeout=30)
+            ended = time.monotonic()
+            local.append((operation, status, ended - started, therapist_id, slot_time, started, ended))
+        connection.close()
+        with samples_lock:
+            samples.extend(local)
+    
+    workers = [threading.Thread(target=client, args=(seed * 1000 + i,)) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return samples
+
+
+def _is_error(operation: str, status: int) -> bool:
+    """Whether a response is an error rather than an expected outcome (a 409 conflict is expected)."""
+    if operation in ("book", "cancel"):
+        return status not in (200, 409)
+    return status not in (200, 304)
+
+
+def verify(backend: StorageBackend, slot_times: Dict[str, List[str]], samples: List[Sample]) -> Dict[str, Any]:
+    """
+    Check the final state of every slot and day against the responses.
+    
+    Returns:
+        Dict with the counts of each anomaly and examples of them
+    """
+    outcomes: Dict[Tuple[str, str], Dict[str, int]] = {}
+    for operation, status, _, therapist_id, slot_time, _, _ in samples:
+        if operation not in ("book", "cancel"):
+            continue
+        counts = outcomes.setdefault((therapist_id, slot_time), {"book": 0, "cancel": 0, "unknown": 0})
+        if status == 200:
+            counts[operation] += 1
+        elif _is_error(operation, status):
+            counts["unknown"] += 1
+    
+    backend.cache.clear()
+    report = {"slots_checked": 0, "unverifiable_slots": 0, "double_bookings": 0, "double_cancellations": 0,
+              "lost_updates": 0, "counter_mismatches": 0, "examples": []}
+    for therapist_id, times in slot_times.items():
+        for day in sorted({date.fromisoformat(slot_time[:10]) for slot_time in times}):
+            slots = {slot.start_time.isoformat(): slot for slot in backend.list_all_slots(therapist_id, day)}
+            
+            busy = sum(1 for slot in slots.values() if slot.status == "busy")
+            expected_stats = {"free": len(slots) - busy, "busy": busy, "total": len(slots)}
+            stats = backend.get_day_stats(therapist_id, day)
+            if any(stats.get(field) != count for field, count in expected_stats.items()):
+                report["counter_mismatches"] += 1
+                report["examples"].append(f"{therapist_id} {day}: counters {stats}, slots {expected_stats}")
+            
+            for slot_time in times:
+                if slot_time[:10] != day.isoformat():
+                    continue
+                counts = outcomes.get((therapist_id, slot_time), {"book": 0, "cancel": 0, "unknown": 0})
+                if counts["unknown"]:
+                    report["unverifiable_slots"] += 1
+                    continue
+                report["slots_checked"] += 1
+                slot = slots.get(slot_time)
+                net = counts["book"] - counts["cancel"]
+                if net > 1:
+                    report["double_bookings"] += 1
+                    report["examples"].append(f"{therapist_id} {slot_time}: booked {counts['book']} times, cancelled {counts['cancel']} times")
+                elif net < 0:
+                    report["double_cancellations"] += 1
+                    report["examples"].append(f"{therapist_id} {slot_time}: cancelled {counts['cancel']} times, booked {counts['book']} times")
+                elif slot is None or (slot.status == "busy") != (net == 1):
+                    report["lost_updates"] += 1
+                    report["examples"].append(f"{therapist_id} {slot_time}: {slot.status if slot else 'missing'} after {counts['book']} bookings and {counts['cancel']} cancellations")
+    
+    report["examples"] = report["examples"][:20]
+    report["anomalies"] = sum(report[key] for key in ("double_bookings", "double_cancellations", "lost_updates", "counter_mismatches"))
+    return report
+
+
+def summarize(samples: List[Sample], elapsed: float) -> Dict[str, Any]:
+    """Return the throughput, latency percentiles and error rates, overall and per operation."""
+    def stats(selected: List[Sample]) -> Dict[str, Any]:
+        latencies = sorted(sample[2] for sample in selected)
+        errors = sum(1 for sample in selected if _is_error(sample[0], sample[1]))
+        
+        def percentile(fraction: float) -> float:
+            return latencies[min(len(latencies) - 1, max(0, math.ceil(fraction * len(latencies)) - 1))] * 1000 if latencies else 0.0
+        
+        statuses: Dict[str, int] = {}
+        for sample in selected:
+            statuses[str(sample[1])] = statuses.get(str(sample[1]), 0) + 1
+        return {
+            "requests": len(selected),
+            "rps": len(selected) / elapsed if elapsed > 0 else 0.0,
+            "p50_ms": percentile(0.50),
+            "p95_ms": percentile(0.95),
+            "p99_ms": percentile(0.99),
+            "max_ms": latencies[-1] * 1000 if latencies else 0.0,
+            "errors": errors,
+            "error_rate": errors / len(selected) if selected else 0.0,
+            "statuses": statuses
+        }
+    
+    return {
+        "elapsed_seconds": elapsed,
+        "total": stats(samples),
+        "operations": {operation: stats([sample for sample in samples if sample[0] == operation]) for operation in OPERATIONS}
+    }
+
+
+def run_load_test(
+    duration: float = 10.0,
+    threads: int = 16,
+    processes: int = 1,
+    therapists: int = 5,
+    days: int = 3,
+    mix: str = DEFAULT_MIX,
+    hot_fraction: float = 0.5,
+    backend: str = "memory",
+    seed: int = 1
+) -> Dict[str, Any]:
+    """
+    Run a load test against a local server and verify the final state.
+    
+    Args:
+        duration: Seconds the clients send requests for
+        threads: Client threads per process
+        processes: Client processes; 1 runs the clients in this process
+        therapists: Number of therapists seeded
+        days: Days of slots seeded per therapist, from tomorrow on
+        mix: Operation weights, e.g. "list=40,therapists=10,book=35,cancel=15"
+        hot_fraction: Share of requests aimed at the first therapist
+        backend: 'memory' or 'sqlite'
+        seed: Seed of the clients' random choices
+    
+    Returns:
+        Dict with the settings, the summary of the samples and the verification
+    """
+    weights = parse_mix(mix)
+    stand_in = create_stand_in_backend(backend)
+    set_backend(stand_in)
+    therapist_ids = [f"load-therapist-{i}" for i in range(therapists)]
+    slot_times = seed_slots(stand_in, therapist_ids, date.today() + timedelta(days=1), days)
+    
+    # Request logs would dominate the run; warnings about conflicts are expected
+    logging.getLogger("app").setLevel(logging.ERROR)
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    
+    server = make_server("127.0.0.1", 0, create_app({"TESTING": True}), threaded=True)
+    server_thread = threading.Thread(target=server.serve_forever, name="load-server", daemon=True)
+    server_thread.start()
+    host, port = "127.0.0.1", server.server_port
+    
+    try:
+        started = time.monotonic()
+        if processes <= 1:
+            samples = drive(host, port, slot_times, weights, hot_fraction, threads, duration, seed)
+        else:
+            # Spawned, not forked: this process runs the server threads
+            with ProcessPoolExecutor(processes, mp_context=multiprocessing.get_context("spawn")) as executor:
+                futures = [
+                    executor.submit(drive, host, port, slot_times, weights, hot_fraction, threads, duration, seed + i)
+                    for i in range(processes)
+                ]
+                samples = [sample for future in futures for sample in future.result()]
+        elapsed = time.monotonic() - started
+    finally:
+        server.shutdown()
+    
+    report = {
+        "settings": {
+            "duration": duration, "threads": threads, "processes": processes, "therapists": therapists,
+            "days": days, "mix": weights, "hot_fraction": hot_fraction, "backend": backend, "seed": seed
+        },
+        "summary": summarize(samples, elapsed),
+        "verification": verify(stand_in, slot_times, samples)
+    }
+    if backend == "sqlite":
+        for suffix in ("", "-wal", "-shm"):
+            Path(stand_in.path + suffix).unlink(missing_ok=True)
+    return report
+
+
+def print_report(report: Dict[str, Any], file: Any = sys.stdout) -> None:
+    """Print a load test report as a table."""
+    summary = report["summary"]
+    print(f"{'operation':<12}{'requests':>10}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}{'errors':>8}", file=file)
+    for name, stats in list(summary["operations"].items()) + [("total", summary["total"])]:
+        if stats["requests"]:
+            print(
+                f"{name:<12}{stats['requests']:>10}{stats['rps']:>10.1f}{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}"
+                f"{stats['p99_ms']:>10.2f}{stats['max_ms']:>10.2f}{stats['error_rate']:>8.1%}",
+                file=file
+            )
+    
+    for name in ("book", "cancel"):
+        statuses = summary["operations"][name]["statuses"]
+        if statuses:
+            print(f"{name}: {statuses.get('200', 0)} succeeded, {statuses.get('409', 0)} conflicts", file=file)
+    
+    verification = report["verification"]
+    print(
+        f"Verified {verification['slots_checked']} slots ({verification['unverifiable_slots']} unverifiable): "
+        f"{verification['double_bookings']} double bookings, {verification['double_cancellations']} double cancellations, "
+        f"{verification['lost_updates']} lost updates, {verification['counter_mismatches']} counter mismatches",
+        file=file
+    )
+    for example in verification["examples"]:
+        print(f"  {example}", file=file)
+
+
+def check_gates(report: Dict[str, Any], max_error_rate: float, min_rps: Optional[float]) -> List[str]:
+    """Return the reasons a report fails the gates, if any."""
+    failures = []
+    if report["verification"]["anomalies"]:
+        failures.append(f"{report['verification']['anomalies']} anomalies found by verification")
+    if report["summary"]["total"]["error_rate"] > max_error_rate:
+        failures.append(f"error rate {report['summary']['total']['error_rate']:.2%} above {max_error_rate:.2%}")
+    if min_rps is not None and report["summary"]["total"]["rps"] < min_rps:
+        failures.append(f"throughput {report['summary']['total']['rps']:.1f} rps below {min_rps:.1f}")
+    return failures
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the load test options to a parser, shared with the load-test command of cli.py."""
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds to send requests for (default: 10)")
+    parser.add_argument("--threads", type=int, default=16, help="Client threads per process (default: 16)")
+    parser.add_argument("--processes", type=int, default=1, help="Client processes (default: 1)")
+    parser.add_argument("--therapists", type=int, default=5, help="Therapists to seed (default: 5)")
+    parser.add_argument("--days", type=int, default=3, help="Days of 9:00-17:00 slots per therapist (default: 3)")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"Operation weights (default: {DEFAULT_MIX})")
+    parser.add_argument("--hot-fraction", type=float, default=0.5, help="Share of requests aimed at one therapist (default: 0.5)")
+    parser.add_argument("--backend", choices=("memory", "sqlite"), default="memory", help="Stand-in backend (default: memory)")
+    parser.add_argument("--seed", type=int, default=1, help="Seed of the clients' random choices")
+    parser.add_argument("--output", help="Also write the report to this JSON file")
+    parser.add_argument("--max-error-rate", type=float, default=0.0, help="Highest error rate that passes (default: 0)")
+    parser.add_argument("--min-rps", type=float, help="Lowest throughput that passes")
+
+
+def run_from_args(args: argparse.Namespace) -> int:
+    """Run a load test from parsed options, print it and return the exit status."""
+    report = run_load_test(
+        duration=args.duration, threads=args.threads, processes=args.processes, therapists=args.therapists,
+        days=args.days, mix=args.mix, hot_fraction=args.hot_fraction, backend=args.backend, seed=args.seed
+    )
+    print_report(report)
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2) + "\n")
+    
+    failures = check_gates(report, args.max_error_rate, args.min_rps)
+    for failure in failures:
+        print(f"FAILED: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Load test the API with booking contention and verify the outcome")
+    add_arguments(parser)
+    return run_from_args(parser.parse_args())
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite of the integration, service and route operations.
+
+Every operation runs against the real FirebaseBackend on an in-memory fake
+of the appointments reference (benchmarks/fake_firebase.py), so no database
+or network is needed. Single-therapist operations run with 10, 1k, 10k and
+100k slots per therapist; fan-out operations run across many therapists.
+
+Each result reports ops/sec, p50 and p99 latency and the peak memory
+allocated by one operation, as JSON. Given a baseline (the JSON of an
+earlier run), the changes are shown and the exit status is 1 if any
+operation got slower or bigger than the threshold.
+
+Usage:
+    python benchmarks/run.py --output benchmarks/baseline.json
+    python benchmarks/run.py --baseline benchmarks/baseline.json [--threshold 0.2]
+    python benchmarks/run.py --sizes 10 1000 --therapists 10 100 --only list_
+"""
+
+import argparse
+import json
+import logging
+import math
+import platform
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from datetime import date, datetime, time as dt_time, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app import create_app
+from app.integrations import TimeSlot, set_backend
+from app.integrations.cache import SlotCache
+from app.integrations.firebase_db import FirebaseBackend
+from app.services.appointment_service import AppointmentService
+from app.utils.date_utils import date_to_epoch
+from benchmarks.fake_firebase import InMemoryDatabase
+
+DEFAULT_SIZES = [10, 1000, 10000, 100000]
+DEFAULT_THERAPISTS = [10, 100, 1000]
+
+# Slots start on the first day of the month after next, so they are never in
+# the past and never archived
+FIRST_DAY = (date.today().replace(day=1) + timedelta(days=62)).replace(day=1)
+
+# Result fields compared with the baseline, and whether higher is better
+COMPARED_FIELDS = {"ops_per_sec": True, "p50_ms": False, "p99_ms": False, "peak_memory_kb": False}
+
+
+@dataclass
+class Benchmark:
+    """
+    An operation to measure.
+    
+    setup() builds the state the operation runs on, outside of the timings;
+    op(state, i) runs the i-th operation. Operations that can only run once
+    on a state (e.g. filling an empty therapist) set fresh_state, and get a
+    new state for every iteration.
+    """
+    
+    name: str
+    setup: Callable[[], Any]
+    op: Callable[[Any, int], Any]
+    iterations: int
+    fresh_state: bool = False
+
+
+def make_backend(cache: bool) -> FirebaseBackend:
+    """Return a Firebase backend on an empty in-memory database, with the slot cache off unless asked for."""
+    backend = FirebaseBackend(ref=InMemoryDatabase().reference("appointments"))
+    if not cache:
+        backend.cache = SlotCache(ttl_seconds=0, max_entries=0)
+    return backend
+
+
+def fill_therapist(backend: FirebaseBackend, therapist_id: str, slot_count: int) -> None:
+    """Create slot_count consecutive one hour slots for a therapist from FIRST_DAY on."""
+    start = datetime.combine(FIRST_DAY, datetime.min.time())
+    backend.create_availability_range(therapist_id, start, start + timedelta(hours=slot_count))
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Return the nearest-rank percentile of sorted values."""
+    return sorted_values[min(len(sorted_values) - 1, max(0, math.ceil(fraction * len(sorted_values)) - 1))]
+
+
+def measure(benchmark: Benchmark, max_seconds: float) -> Dict[str, Any]:
+    """
+    Time the iterations of a benchmark, then trace the memory of one more.
+    
+    Iterations stop early once max_seconds have been spent (at least 3 run).
+    """
+    timings = []
+    state = None if benchmark.fresh_state else benchmark.setup()
+    started = time.perf_counter()
+    for i in range(benchmark.iterations):
+        if benchmark.fresh_state:
+            state = benchmark.setup()
+        op_started = time.perf_counter()
+        benchmark.op(state, i)
+        timings.append(time.perf_counter() - op_started)
+        if i >= 2 and time.perf_counter() - started > max_seconds:
+            break
+    
+    # Peak memory allocated by a single operation, untimed as tracing slows it down
+    if benchmark.fresh_state:
+        state = benchmark.setup()
+    tracemalloc.start()
+    try:
+        benchmark.op(state, len(timings))
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    
+    timings.sort()
+    return {
+        "iterations": len(timings),
+        "ops_per_sec": len(timings) / sum(timings) if sum(timings) > 0 else 0.0,
+        "p50_ms": percentile(timings, 0.50) * 1000,
+        "p99_ms": percentile(timings, 0.99) * 1000,
+        "peak_memory_kb": peak / 1024
+    }
+
+
+def therapist_benchmarks(slot_count: int, iterations: int, cache: bool, client: Any) -> List[Benchmark]:
+    """Benchmarks of one therapist holding slot_count slots."""
+    therapist_id = "therapist-0"
+    span_days = max(1, math.ceil(slot_count / 24))
+    middle_day = FIRST_DAY + timedelta(days=span_days // 2)
+    # A month view around the middle of the slots
+    month_start = datetime.combine(middle_day - timedelta(days=15), datetime.min.time())
+    month_end = month_start + timedelta(days=31)
+    # New slots go after the existing ones, one hour apart
+    after_last = datetime.combine(FIRST_DAY, datetime.min.time()) + timedelta(hours=slot_count + 1)
+    service = AppointmentService()
+    
+    def filled() -> FirebaseBackend:
+        backend = make_backend(cache)
+        fill_therapist(backend, therapist_id, slot_count)
+        set_backend(backend)
+        return backend
+    
+    def empty() -> FirebaseBackend:
+        backend = make_backend(cache)
+        set_backend(backend)
+        return backend
+    
+    def slot_time(i: int) -> datetime:
+        # Start of the i-th slot, spread over the whole range
+        step = max(1, slot_count // (iterations + 1))
+        hour = (i * step) % slot_count
+        return datetime.combine(FIRST_DAY, datetime.min.time()) + timedelta(hours=hour)
+    
+    # Booking and cancelling need a distinct slot per iteration, plus one for the memory pass
+    booking_iterations = max(1, min(iterations, slot_count - 1))
+    
+    def booked() -> FirebaseBackend:
+        backend = filled()
+        for i in range(booking_iterations + 1):
+            backend.book_slot(therapist_id, slot_time(i))
+        return backend
+    
+    month_url = f"/api/appointments/therapist/{therapist_id}/slots?from={month_start.isoformat()}&to={month_end.isoformat()}"
+    
+    return [
+        Benchmark("integration.create_availability_range", empty,
+                  lambda backend, i: fill_therapist(backend, therapist_id, slot_count),
+                  iterations=3, fresh_state=True),
+        Benchmark("integration.create_free_slot", filled,
+                  lambda backend, i: backend.create_free_slot(therapist_id, after_last + timedelta(hours=2 * i), after_last + timedelta(hours=2 * i + 1)),
+                  iterations),
+        Benchmark("integration.list_all_slots", filled,
+                  lambda backend, i: backend.list_all_slots(therapist_id, middle_day),
+                  iterations),
+        Benchmark("integration.list_slots_in_range", filled,
+                  lambda backend, i: backend.list_slots_in_range(therapist_id, month_start, month_end),
+                  iterations),
+        Benchmark("integration.get_day_stats", filled,
+                  lambda backend, i: backend.get_day_stats(therapist_id, middle_day),
+                  iterations),
+        Benchmark("integration.book_slot", filled,
+                  lambda backend, i: backend.book_slot(therapist_id, slot_time(i)),
+                  booking_iterations),
+        Benchmark("integration.cancel_booking", booked,
+                  lambda backend, i: backend.cancel_booking(therapist_id, slot_time(i)),
+                  booking_iterations),
+        Benchmark("integration.repair_stats", filled,
+                  lambda backend, i: backend.repair_stats([therapist_id]),
+                  iterations=3),
+        Benchmark("service.list_all_slots", filled,
+                  lambda backend, i: service.list_all_slots(therapist_id, middle_day),
+                  iterations),
+        Benchmark("service.get_slots_in_range", filled,
+                  lambda backend, i: service.get_slots_in_range(therapist_id, month_start, month_end),
+                  iterations),
+        Benchmark("route.list_slots_month", filled,
+                  lambda backend, i: client.get(month_url),
+                  iterations),
+    ]
+
+
+def fanout_benchmarks(therapist_count: int, slots_per_therapist: int, iterations: int, cache: bool, client: Any) -> List[Benchmark]:
+    """Benchmarks across therapist_count therapists holding slots_per_therapist slots each."""
+    therapist_ids = [f"therapist-{i:05d}" for i in range(therapist_count)]
+    first = datetime.combine(FIRST_DAY, datetime.min.time())
+    start = date_to_epoch(FIRST_DAY)
+    service = AppointmentService()
+    
+    def filled() -> FirebaseBackend:
+        backend = make_backend(cache)
+        backend.insert_slots({
+            therapist_id: [TimeSlot.from_epoch(start + hour * 3600, start + (hour + 1) * 3600) for hour in range(slots_per_therapist)]
+            for therapist_id in therapist_ids
+        })
+        set_backend(backend)
+        return backend
+    
+    def empty() -> FirebaseBackend:
+        backend = make_backend(cache)
+        set_backend(backend)
+        return backend
+    
+    therapists_url = f"/api/appointments/therapists?date={FIRST_DAY.isoformat()}&therapist_ids={','.join(therapist_ids)}"
+    
+    return [
+        Benchmark("integration.apply_availability_template", empty,
+                  lambda backend, i: backend.apply_availability_template(therapist_ids, FIRST_DAY, FIRST_DAY + timedelta(days=6), range(5), dt_time(9), dt_time(17)),
+                  iterations=3, fresh_state=True),
+        Benchmark("integration.find_earliest_available", filled,
+                  lambda backend, i: backend.find_earliest_available(therapist_ids, first, first + timedelta(days=30), 10),
+                  iterations),
+        Benchmark("integration.list_therapist_ids", filled,
+                  lambda backend, i: backend.list_therapist_ids(),
+                  iterations),
+        Benchmark("service.get_therapists_stats", filled,
+                  lambda backend, i: service.get_therapists_stats(therapist_ids, FIRST_DAY),
+                  iterations),
+        Benchmark("route.list_therapists", filled,
+                  lambda backend, i: client.get(therapists_url),
+                  iterations),
+    ]
+
+
+def compare(results: List[Dict[str, Any]], baseline: List[Dict[str, Any]], threshold: float) -> List[str]:
+    """
+    Print the change of every result against the baseline.
+    
+    Returns:
+        Keys of the results that regressed by more than threshold
+    """
+    previous = {result["key"]: result for result in baseline}
+    regressions = []
+    print(f"\n{'benchmark':<68}{'ops/s':>10}{'p50':>10}{'p99':>10}{'memory':>10}", file=sys.stderr)
+    for result in results:
+        old = previous.get(result["key"])
+        if old is None:
+            print(f"{result['key']:<68}{'new':>10}", file=sys.stderr)
+            continue
+        
+        changes = {field: (result[field] - old[field]) / old[field] if old[field] else 0.0 for field in COMPARED_FIELDS}
+        worse = {field: -change if COMPARED_FIELDS[field] else change for field, change in changes.items()}
+        
+        # Throughput and median latency must agree, which filters out most of the
+        # noise of fast operations; memory below 64 KiB is ignored
+        regressed = (
+            (worse["ops_per_sec"] > threshold and worse["p50_ms"] > threshold)
+            or (worse["peak_memory_kb"] > threshold and result["peak_memory_kb"] >= 64)
+        )
+        if regressed:
+            regressions.append(result["key"])
+        columns = "".join(f"{change:>+10.0%}" for change in changes.values())
+        print(f"{result['key']:<68}{columns}" + ("  REGRESSED" if regressed else ""), file=sys.stderr)
+    
+    missing = sorted(set(previous) - {result["key"] for result in results})
+    for key in missing:
+        print(f"{key:<68}{'missing':>10}", file=sys.stderr)
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the scheduling operations on an in-memory backend")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Slots per therapist of the single-therapist benchmarks")
+    parser.add_argument("--therapists", type=int, nargs="+", default=DEFAULT_THERAPISTS, help="Therapist counts of the fan-out benchmarks")
+    parser.add_argument("--therapist-slots", type=int, default=24, help="Slots per therapist of the fan-out benchmarks")
+    parser.add_argument("--iterations", type=int, default=50, help="Maximum operations timed per benchmark")
+    parser.add_argument("--max-seconds", type=float, default=2.0, help="Time after which a benchmark stops iterating")
+    parser.add_argument("--only", help="Only run benchmarks whose name contains this text")
+    parser.add_argument("--cache", action="store_true", help="Keep the slot cache on, as configured")
+    parser.add_argument("--output", help="Write the results to this JSON file instead of standard output")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare with")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Relative slowdown or growth counted as a regression")
+    args = parser.parse_args()
+    logging.getLogger("app").setLevel(logging.WARNING)
+    
+    client = create_app({"TESTING": True}).test_client()
+    results = []
+    
+    def run(benchmarks: List[Benchmark], slots: int, therapists: int) -> None:
+        for benchmark in benchmarks:
+            if args.only and args.only not in benchmark.name:
+                continue
+            result = measure(benchmark, args.max_seconds)
+            key = f"{benchmark.name}[slots={slots},therapists={therapists}]"
+            results.append({"key": key, "name": benchmark.name, "slots_per_therapist": slots, "therapists": therapists, **result})
+            print(
+                f"{key:<68}{result['ops_per_sec']:>10.1f} ops/s  p50 {result['p50_ms']:>9.3f} ms  "
+                f"p99 {result['p99_ms']:>9.3f} ms  {result['peak_memory_kb']:>9.1f} KiB",
+                file=sys.stderr
+            )
+    
+    for size in args.sizes:
+        run(therapist_benchmarks(size, args.iterations, args.cache, client), size, 1)
+    for therapist_count in args.therapists:
+        run(fanout_benchmarks(therapist_count, args.therapist_slots, args.iterations, args.cache, client), args.therapist_slots, therapist_count)
+    
+    report = {
+        "meta": {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cache": args.cache,
+            "iterations": args.iterations
+        },
+        "results": results
+    }
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2) + "\n")
+    else:
+        print(json.dumps(report, indent=2))
+    
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())["results"]
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regressions beyond {args.threshold:.0%}", file=sys.stderr)
+            return 1
+    
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
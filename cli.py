@@ -7,18 +7,28 @@ import argparse
 import datetime
 import json
 import sys
+import time
 from pathlib import Path
 import os
 from typing import Optional, Dict, Any, List
 
 from app.integrations import (
     create_free_slot,
+    apply_availability_template,
+    create_availability_rule,
+    list_availability_rules,
+    delete_availability_rule,
     list_available_slots,
     book_slot,
     cancel_booking,
-    TimeSlot
+    repair_stats,
+    archive_slots,
+    TimeSlot,
+    BookingResult
 )
-from app.utils.date_utils import format_time_slot
+from app.services.export_service import iter_export_lines, gzip_stream
+from app.services.import_service import import_slots
+from app.utils.date_utils import format_time_slot, parse_weekdays, WEEKDAY_NAMES
 
 
 def create_slot_cmd(args: argparse.Namespace) -> None:
@@ -34,7 +44,7 @@ def create_slot_cmd(args: argparse.Namespace) -> None:
             print(f"✅ Slot created successfully: {format_time_slot(start_time, end_time)}")
         else:
             print("❌ Failed to create slot. The slot may overlap with existing slots.")
-            
+    
     except Exception as e:
         print(f"❌ Error: {str(e)}")
         sys.exit(1)
@@ -54,7 +64,7 @@ def list_slots_cmd(args: argparse.Namespace) -> None:
                 print(f"  {i}. {format_time_slot(slot.start_time, slot.end_time)}")
         else:
             print(f"No available slots for therapist {args.therapist_id} on {date_obj.isoformat()}")
-            
+    
     except Exception as e:
         print(f"❌ Error: {str(e)}")
         sys.exit(1)
@@ -66,13 +76,15 @@ def book_slot_cmd(args: argparse.Namespace) -> None:
         slot_time = datetime.datetime.fromisoformat(args.slot_time)
         
         # Book slot using Google Calendar API (backed by Firebase)
-        success = book_slot(args.therapist_id, slot_time)
+        result = book_slot(args.therapist_id, slot_time)
         
-        if success:
+        if result:
             print(f"✅ Slot booked successfully: {slot_time.strftime('%Y-%m-%d %H:%M')}")
+        elif result is BookingResult.CONFLICT:
+            print("❌ Failed to book slot. The slot is already booked.")
         else:
-            print("❌ Failed to book slot. The slot may not exist or is already booked.")
-            
+            print("❌ Failed to book slot. The slot does not exist.")
+    
     except Exception as e:
         print(f"❌ Error: {str(e)}")
         sys.exit(1)
@@ -84,18 +96,226 @@ def cancel_booking_cmd(args: argparse.Namespace) -> None:
         slot_time = datetime.datetime.fromisoformat(args.slot_time)
         
         # Cancel booking using Google Calendar API (backed by Firebase)
-        success = cancel_booking(args.therapist_id, slot_time)
+        result = cancel_booking(args.therapist_id, slot_time)
         
-        if success:
+        if result:
             print(f"✅ Booking canceled successfully: {slot_time.strftime('%Y-%m-%d %H:%M')}")
+        elif result is BookingResult.CONFLICT:
+            print("❌ Failed to cancel booking. The slot is not booked.")
         else:
-            print("❌ Failed to cancel booking. The slot may not exist or is not booked.")
-            
+            print("❌ Failed to cancel booking. The slot does not exist.")
+    
+    except Exception as e:
+        print(f"❌ Error: {str(e)}")
+        sys.exit(1)
+
+
+def apply_template_cmd(args: argparse.Namespace) -> None:
+    """Apply a weekly availability template to several therapists in a single write"""
+    try:
+        therapist_ids = [tid.strip() for tid in args.therapist_ids.split(",") if tid.strip()]
+        first_day = datetime.date.fromisoformat(args.from_date)
+        last_day = datetime.date.fromisoformat(args.to_date)
+        weekdays = parse_weekdays(args.weekdays.split(","))
+        start_time = datetime.time.fromisoformat(args.start)
+        end_time = datetime.time.fromisoformat(args.end)
+        
+        started = time.perf_counter()
+        created = apply_availability_template(
+            therapist_ids, first_day, last_day, weekdays, start_time, end_time, args.duration
+        )
+        elapsed = time.perf_counter() - started
+        
+        for therapist_id, count in created.items():
+            print(f"  {therapist_id}: {count} slots created")
+        print(f"✅ Created {sum(created.values())} slots for {len(created)} therapists in {elapsed:.2f}s")
+    
+    except Exception as e:
+        print(f"❌ Error: {str(e)}")
+        sys.exit(1)
+
+
+def add_rule_cmd(args: argparse.Namespace) -> None:
+    """Create a recurring weekly availability rule for a therapist"""
+    try:
+        rule = create_availability_rule(
+            args.therapist_id,
+            parse_weekdays(args.weekdays.split(",")),
+            datetime.time.fromisoformat(args.start),
+            datetime.time.fromisoformat(args.end),
+            args.duration,
+            datetime.date.fromisoformat(args.from_date) if args.from_date else None,
+            datetime.date.fromisoformat(args.to_date) if args.to_date else None,
+            [datetime.date.fromisoformat(day) for day in args.exceptions.split(",") if day.strip()] if args.exceptions else []
+        )
+        print(f"✅ Availability rule {rule.rule_id} created for therapist {args.therapist_id}")
+    
+    except Exception as e:
+        print(f"❌ Error: {str(e)}")
+        sys.exit(1)
+
+
+def list_rules_cmd(args: argparse.Namespace) -> None:
+    """List the availability rules of a therapist"""
+    try:
+        rules = list_availability_rules(args.therapist_id)
+        
+        if not rules:
+            print(f"No availability rules for therapist {args.therapist_id}")
+            return
+        
+        print(f"Availability rules for therapist {args.therapist_id}:")
+        for rule in rules:
+            weekdays = ",".join(WEEKDAY_NAMES[weekday][:3] for weekday in sorted(rule.weekdays))
+            valid_to = rule.valid_to.isoformat() if rule.valid_to else "no end"
+            print(
+                f"  {rule.rule_id}: {weekdays} {rule.start_time.strftime('%H:%M')}-{rule.end_time.strftime('%H:%M')} "
+                f"every {rule.slot_duration_minutes} min, {rule.valid_from.isoformat()} to {valid_to}"
+            )
+            if rule.exceptions:
+                print(f"    except {', '.join(sorted(day.isoformat() for day in rule.exceptions))}")
+    
+    except Exception as e:
+        print(f"❌ Error: {str(e)}")
+        sys.exit(1)
+
+
+def delete_rule_cmd(args: argparse.Namespace) -> None:
+    """Delete an availability rule of a therapist"""
+    try:
+        if delete_availability_rule(args.therapist_id, args.rule_id):
+            print(f"✅ Availability rule {args.rule_id} deleted")
+        else:
+            print(f"❌ Availability rule {args.rule_id} not found for therapist {args.therapist_id}")
+            sys.exit(1)
+    
+    except Exception as e:
+        print(f"❌ Error: {str(e)}")
+        sys.exit(1)
+
+
+def import_cmd(args: argparse.Namespace) -> None:
+    """Stream slots from a CSV or iCalendar file into the storage backend"""
+    try:
+        def report(progress: Dict[str, Any]) -> None:
+            print(
+                f"  {progress['rows']} rows read, {progress['imported']} imported, "
+                f"{progress['skipped']} overlapping, {progress['rejected']} rejected "
+                f"({progress['rows_per_second']:.0f} rows/s)"
+            )
+        
+        summary = import_slots(
+            args.path,
+            file_format=args.format,
+            chunk_size=args.chunk_size,
+            checkpoint_path=args.checkpoint,
+            resume=args.resume,
+            rejects_path=args.rejects,
+            therapist_id=args.therapist_id,
+            allow_past=args.allow_past,
+            progress=report
+        )
+        
+        print(
+            f"✅ Imported {summary['imported']} slots from {summary['rows']} rows in "
+            f"{summary['elapsed_seconds']:.1f}s ({summary['rows_per_second']:.0f} rows/s)"
+        )
+        if summary["skipped"]:
+            print(f"   {summary['skipped']} slots overlapped existing slots and were skipped")
+        if summary["rejected"]:
+            print(f"❌ {summary['rejected']} rows were rejected" + (f", see {args.rejects}" if args.rejects else ""))
+    
+    except Exception as e:
+        print(f"❌ Error: {str(e)}")
+        if os.path.exists(args.checkpoint or f"{args.path}.checkpoint"):
+            print("   Run the same command with --resume to continue after the last written chunk.")
+        sys.exit(1)
+
+
+def export_cmd(args: argparse.Namespace) -> None:
+    """Stream slots as NDJSON to a file or standard output"""
+    try:
+        first_day = datetime.date.fromisoformat(args.from_date)
+        last_day = datetime.date.fromisoformat(args.to_date)
+        compress = args.gzip or (args.output or "").endswith(".gz")
+        
+        chunks = iter_export_lines(args.therapist_ids or None, first_day, last_day)
+        if compress:
+            chunks = gzip_stream(chunks)
+        
+        output = open(args.output, "wb") if args.output else sys.stdout.buffer
+        try:
+            written = 0
+            for chunk in chunks:
+                output.write(chunk)
+                written += len(chunk)
+        finally:
+            if args.output:
+                output.close()
+            else:
+                output.flush()
+        
+        if args.output:
+            print(f"✅ Exported slots to {args.output} ({written} bytes)")
+    
+    except Exception as e:
+        print(f"❌ Error: {str(e)}", file=sys.stderr)
+        sys.exit(1)
+
+
+def repair_stats_cmd(args: argparse.Namespace) -> None:
+    """Recompute the per-day slot counters from the stored slots"""
+    try:
+        first_day = datetime.date.fromisoformat(args.from_date) if args.from_date else None
+        last_day = datetime.date.fromisoformat(args.to_date) if args.to_date else None
+        
+        repaired = repair_stats(args.therapist_ids or None, first_day, last_day)
+        
+        for therapist_id, days in repaired.items():
+            print(f"  {therapist_id}: {days} days with slots")
+        print(f"✅ Repaired stats for {len(repaired)} therapists")
+    
     except Exception as e:
         print(f"❌ Error: {str(e)}")
         sys.exit(1)
 
 
+def archive_cmd(args: argparse.Namespace) -> None:
+    """Move past slots into compressed monthly archives"""
+    try:
+        before = datetime.date.fromisoformat(args.before) if args.before else None
+        if before is not None and before > datetime.date.today():
+            raise ValueError(f"--before {before} is in the future, only past months can be archived")
+        
+        started = time.perf_counter()
+        archived = archive_slots(args.therapist_ids or None, before)
+        elapsed = time.perf_counter() - started
+        
+        for therapist_id, count in archived.items():
+            print(f"  {therapist_id}: {count} slots archived")
+        print(f"✅ Archived {sum(archived.values())} slots of {len(archived)} therapists in {elapsed:.2f}s")
+    
+    except Exception as e:
+        print(f"❌ Error: {str(e)}")
+        sys.exit(1)
+
+
+def load_test_cmd(args: argparse.Namespace) -> None:
+    """Load test the API on a local server and verify the bookings"""
+    from benchmarks.load import run_from_args
+    
+    try:
+        status = run_from_args(args)
+    except Exception as e:
+        print(f"❌ Error: {str(e)}")
+        sys.exit(1)
+    
+    if status:
+        print("❌ Load test failed")
+        sys.exit(status)
+    print("✅ Load test passed")
+
+
 def main() -> None:
     """Main CLI entrypoint"""
     parser = argparse.ArgumentParser(description="Therapist-Client Scheduling CLI")
@@ -126,13 +346,85 @@ def main() -> None:
     cancel_parser.add_argument("slot_time", help="Start time of the booked slot (ISO format: YYYY-MM-DDTHH:MM:SS)")
     cancel_parser.set_defaults(func=cancel_booking_cmd)
     
+    # Apply template command
+    template_parser = subparsers.add_parser("apply-template", help="Apply a weekly availability template to several therapists")
+    template_parser.add_argument("therapist_ids", help="Comma-separated list of therapist IDs")
+    template_parser.add_argument("--from", dest="from_date", required=True, help="First day of the range (ISO format: YYYY-MM-DD)")
+    template_parser.add_argument("--to", dest="to_date", required=True, help="Last day of the range (ISO format: YYYY-MM-DD)")
+    template_parser.add_argument("--weekdays", default="mon,tue,wed,thu,fri", help="Comma-separated days of the week (default: mon,tue,wed,thu,fri)")
+    template_parser.add_argument("--start", default="09:00", help="Time of day the availability starts (default: 09:00)")
+    template_parser.add_argument("--end", default="17:00", help="Time of day the availability ends (default: 17:00)")
+    template_parser.add_argument("--duration", type=int, default=60, help="Duration of each slot in minutes (default: 60)")
+    template_parser.set_defaults(func=apply_template_cmd)
+    
+    # Availability rule commands
+    add_rule_parser = subparsers.add_parser("add-rule", help="Create a recurring weekly availability rule for a therapist")
+    add_rule_parser.add_argument("therapist_id", help="Unique identifier for the therapist")
+    add_rule_parser.add_argument("--weekdays", default="mon,tue,wed,thu,fri", help="Comma-separated days of the week (default: mon,tue,wed,thu,fri)")
+    add_rule_parser.add_argument("--start", default="09:00", help="Time of day the availability starts (default: 09:00)")
+    add_rule_parser.add_argument("--end", default="17:00", help="Time of day the availability ends (default: 17:00)")
+    add_rule_parser.add_argument("--duration", type=int, default=60, help="Duration of each slot in minutes (default: 60)")
+    add_rule_parser.add_argument("--from", dest="from_date", help="First day the rule applies on (ISO format: YYYY-MM-DD, default: today)")
+    add_rule_parser.add_argument("--to", dest="to_date", help="Last day the rule applies on (ISO format: YYYY-MM-DD, default: no end)")
+    add_rule_parser.add_argument("--except", dest="exceptions", help="Comma-separated days the rule does not apply on")
+    add_rule_parser.set_defaults(func=add_rule_cmd)
+    
+    list_rules_parser = subparsers.add_parser("list-rules", help="List the availability rules of a therapist")
+    list_rules_parser.add_argument("therapist_id", help="Unique identifier for the therapist")
+    list_rules_parser.set_defaults(func=list_rules_cmd)
+    
+    delete_rule_parser = subparsers.add_parser("delete-rule", help="Delete an availability rule of a therapist")
+    delete_rule_parser.add_argument("therapist_id", help="Unique identifier for the therapist")
+    delete_rule_parser.add_argument("rule_id", help="Identifier of the rule, as shown by list-rules")
+    delete_rule_parser.set_defaults(func=delete_rule_cmd)
+    
+    # Import command
+    import_parser = subparsers.add_parser("import", help="Import slots from a CSV or iCalendar (.ics) file")
+    import_parser.add_argument("path", help="File to import. CSV files have a therapist_id,start_time,end_time[,status] header")
+    import_parser.add_argument("--format", choices=["csv", "ics"], help="File format (default: from the file extension)")
+    import_parser.add_argument("--chunk-size", type=int, default=1000, help="Number of rows written at once (default: 1000)")
+    import_parser.add_argument("--resume", action="store_true", help="Continue an interrupted import from its checkpoint")
+    import_parser.add_argument("--checkpoint", help="Checkpoint file (default: <path>.checkpoint)")
+    import_parser.add_argument("--rejects", help="File to write rejected rows to, one JSON object per line")
+    import_parser.add_argument("--therapist-id", help="Therapist of .ics events without an X-THERAPIST-ID property")
+    import_parser.add_argument("--allow-past", action="store_true", help="Accept slots on past days, for historical data")
+    import_parser.set_defaults(func=import_cmd)
+    
+    # Export command
+    export_parser = subparsers.add_parser("export", help="Export slots as NDJSON")
+    export_parser.add_argument("therapist_ids", nargs="*", help="Therapists to export (default: every therapist)")
+    export_parser.add_argument("--from", dest="from_date", required=True, help="First day to export (ISO format: YYYY-MM-DD)")
+    export_parser.add_argument("--to", dest="to_date", required=True, help="Last day to export (ISO format: YYYY-MM-DD)")
+    export_parser.add_argument("--output", "-o", help="File to write (default: standard output)")
+    export_parser.add_argument("--gzip", action="store_true", help="Compress the output with gzip (default for .gz files)")
+    export_parser.set_defaults(func=export_cmd)
+    
+    # Repair stats command
+    repair_parser = subparsers.add_parser("repair-stats", help="Recompute the per-day slot counters from the stored slots")
+    repair_parser.add_argument("therapist_ids", nargs="*", help="Therapists to repair (default: every therapist)")
+    repair_parser.add_argument("--from", dest="from_date", help="First day to repair (ISO format: YYYY-MM-DD)")
+    repair_parser.add_argument("--to", dest="to_date", help="Last day to repair (ISO format: YYYY-MM-DD)")
+    repair_parser.set_defaults(func=repair_stats_cmd)
+    
+    # Archive command
+    archive_parser = subparsers.add_parser("archive", help="Move past slots into compressed monthly archives")
+    archive_parser.add_argument("therapist_ids", nargs="*", help="Therapists to archive (default: every therapist)")
+    archive_parser.add_argument("--before", help="Archive the months before the one of this day (ISO format: YYYY-MM-DD, default: RETENTION_DAYS days ago)")
+    archive_parser.set_defaults(func=archive_cmd)
+    
+    # Load test command
+    from benchmarks.load import add_arguments as add_load_test_arguments
+    load_test_parser = subparsers.add_parser("load-test", help="Load test the API on a local server with booking contention")
+    add_load_test_arguments(load_test_parser)
+    load_test_parser.set_defaults(func=load_test_cmd)
+    
     # Parse arguments
     args = parser.parse_args()
     
     if args.command is None:
         parser.print_help()
         sys.exit(1)
-        
+    
     # Run command
     args.func(args)
 
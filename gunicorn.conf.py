@@ -0,0 +1,40 @@
+"""
+Configuration of the production server, read by gunicorn from the working directory:
+
+    gunicorn wsgi:app
+
+Every setting comes from app/config.py (SERVER_*). The app is loaded once in
+the master process and shared copy-on-write by the worker processes, each of
+which serves requests from a pool of threads and creates its own storage
+backend after the fork.
+"""
+import gc
+import signal
+
+from app.config import active_config
+from app.services import worker_service
+
+bind = active_config.SERVER_BIND
+workers = worker_service.worker_count()
+worker_class = "gthread"
+threads = active_config.SERVER_THREADS
+timeout = active_config.SERVER_TIMEOUT_SECONDS
+graceful_timeout = active_config.SERVER_GRACEFUL_TIMEOUT_SECONDS
+preload_app = True
+
+worker_service.configure_server(workers, threads)
+
+
+def when_ready(server):
+    # Keep the garbage collector of the workers off the objects of the loaded
+    # app, so collections do not copy the pages they share with the master
+    gc.freeze()
+
+
+def post_worker_init(worker):
+    worker_service.end_event_streams_on_signal(signal.SIGTERM)
+    worker_service.init_worker(worker.wsgi)
+
+
+def worker_exit(server, worker):
+    worker_service.shutdown_worker()
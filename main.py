@@ -7,5 +7,5 @@ if __name__ == "__main__":
     app.run(
         host=os.environ.get("FLASK_HOST", "0.0.0.0"),
         port=int(os.environ.get("FLASK_PORT", "5001")),
-        debug=os.environ.get("FLASK_DEBUG", "True").lower() in ["true", "1", "t"]
+        debug=os.environ.get("FLASK_DEBUG", "False").lower() in ["true", "1", "t"]
     )
@@ -0,0 +1,40 @@
+"""
+Fixtures shared by the tests: empty backends of each kind, with no network.
+
+The firebase backend runs on the in-memory database of benchmarks/fake_firebase.py.
+"""
+from datetime import date, datetime, time
+from typing import Iterator
+
+import pytest
+from flask.testing import FlaskClient
+
+from app import create_app
+from app.integrations import StorageBackend, set_backend
+from app.integrations.firebase_db import FirebaseBackend
+from app.integrations.sqlite_db import SQLiteBackend
+from benchmarks.fake_firebase import InMemoryDatabase
+
+
+def at(day: date, hour: int) -> datetime:
+    """Return the datetime of an hour of a day."""
+    return datetime.combine(day, time(hour))
+
+
+@pytest.fixture(params=["firebase", "sqlite"])
+def backend(request: pytest.FixtureRequest, tmp_path) -> Iterator[StorageBackend]:
+    """An empty backend, once per kind, also installed as the active backend."""
+    if request.param == "firebase":
+        backend = FirebaseBackend(ref=InMemoryDatabase().reference("appointments"))
+    else:
+        backend = SQLiteBackend(path=str(tmp_path / "appointments.db"))
+    set_backend(backend)
+    yield backend
+    set_backend(None)
+    backend.close()
+
+
+@pytest.fixture
+def client(backend: StorageBackend) -> FlaskClient:
+    """A test client of the app, served by the backend fixture."""
+    return create_app({"TESTING": True}, background_jobs=False).test_client()
@@ -0,0 +1,18 @@
+"""
+Tests of the API index, which must keep listing every endpoint.
+"""
+import re
+
+from app import create_app
+
+
+def test_api_index_lists_every_endpoint():
+    app = create_app({"TESTING": True}, background_jobs=False)
+    listed = set(app.test_client().get("/api").get_json()["endpoints"].values())
+    
+    for rule in app.url_map.iter_rules():
+        if not rule.rule.startswith(("/api/", "/metrics")):
+            continue
+        path = re.sub(r"<(?:\w+:)?(\w+)>", r"{\1}", rule.rule)
+        for method in rule.methods - {"HEAD", "OPTIONS"}:
+            assert any(entry.split("?")[0].split(" ")[:2] == [method, path] for entry in listed), f"{method} {path}"
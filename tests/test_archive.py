@@ -0,0 +1,55 @@
+"""
+Tests of the monthly archives of past slots.
+"""
+import argparse
+from datetime import date, timedelta
+
+import pytest
+
+import cli
+from app.config import active_config
+from app.integrations import BookingResult
+from app.utils.date_utils import month_start
+from tests.conftest import at
+
+
+def test_archived_slots_stay_visible_but_cannot_be_booked(backend):
+    day = month_start(date.today()) - timedelta(days=40)
+    assert backend.create_free_slot("t1", at(day, 10), at(day, 11))
+    
+    assert backend.archive_slots(before=date.today()) == {"t1": 1}
+    
+    assert [slot.start_time for slot in backend.list_all_slots("t1", day)] == [at(day, 10)]
+    assert backend.get_day_stats("t1", day)["total"] == 1
+    assert backend.book_slot("t1", at(day, 10)) is BookingResult.NOT_FOUND
+
+
+def test_future_cutoff_leaves_current_month_bookable(backend):
+    today = date.today()
+    next_month = month_start(month_start(today) + timedelta(days=31))
+    assert backend.create_free_slot("t1", at(today, 10), at(today, 11))
+    assert backend.create_free_slot("t1", at(next_month, 10), at(next_month, 11))
+    
+    assert backend.archive_slots(before=today + timedelta(days=62)) == {}
+    
+    assert [slot.start_time for slot in backend.list_all_slots("t1", today)] == [at(today, 10)]
+    assert backend.book_slot("t1", at(today, 10)) is BookingResult.SUCCESS
+    assert backend.book_slot("t1", at(next_month, 10)) is BookingResult.SUCCESS
+    # The slots are still in the working set, so they are not created again
+    assert not backend.create_availability_range("t1", at(next_month, 10), at(next_month, 11))
+    assert len(backend.list_all_slots("t1", next_month)) == 1
+
+
+def test_retention_below_one_day_is_rejected(backend, monkeypatch):
+    monkeypatch.setattr(active_config, "RETENTION_DAYS", 0)
+    with pytest.raises(ValueError, match="RETENTION_DAYS"):
+        backend.archive_slots()
+
+
+def test_cli_rejects_future_cutoff(monkeypatch, capsys):
+    monkeypatch.setattr(cli, "archive_slots", lambda *args: pytest.fail("archive_slots called"))
+    before = (date.today() + timedelta(days=1)).isoformat()
+    
+    with pytest.raises(SystemExit):
+        cli.archive_cmd(argparse.Namespace(therapist_ids=[], before=before))
+    assert "in the future" in capsys.readouterr().out
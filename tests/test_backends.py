@@ -0,0 +1,67 @@
+"""
+Tests of the storage backends against each other.
+"""
+from datetime import date, time, timedelta
+
+import pytest
+
+from app.integrations import create_backend
+from app.integrations.firebase_db import FirebaseBackend
+from app.integrations.sqlite_db import SQLiteBackend
+from benchmarks.fake_firebase import InMemoryDatabase
+from tests.conftest import at
+
+TOMORROW = date.today() + timedelta(days=1)
+
+
+def listing(backend, therapist_id, day):
+    """Return the (start time, status) of every slot of a therapist on a day."""
+    return [(slot.start_time, slot.status) for slot in backend.list_all_slots(therapist_id, day)]
+
+
+def test_backends_agree(tmp_path):
+    def scenario(backend):
+        backend.create_availability_rule("t1", [TOMORROW.weekday()], time(9), time(12))
+        backend.create_availability_range("t2", at(TOMORROW, 8), at(TOMORROW, 11))
+        outcomes = [
+            backend.book_slot("t1", at(TOMORROW, 9)),
+            backend.book_slot("t2", at(TOMORROW, 8)),
+            backend.cancel_booking("t2", at(TOMORROW, 9)),
+            *backend.book_slots([("t1", at(TOMORROW, 11)), ("t2", at(TOMORROW, 8))], all_or_nothing=True),
+            *backend.book_slots([("t1", at(TOMORROW, 11)), ("t2", at(TOMORROW, 9)), ("t3", at(TOMORROW, 9))]),
+            backend.cancel_booking("t1", at(TOMORROW, 9)),
+        ]
+        return (
+            outcomes,
+            {therapist_id: listing(backend, therapist_id, TOMORROW) for therapist_id in ("t1", "t2")},
+            {therapist_id: backend.get_day_stats(therapist_id, TOMORROW) for therapist_id in ("t1", "t2")},
+            sorted(backend.list_therapist_ids()),
+        )
+    
+    firebase = FirebaseBackend(ref=InMemoryDatabase().reference("appointments"))
+    sqlite = SQLiteBackend(path=str(tmp_path / "appointments.db"))
+    try:
+        assert scenario(firebase) == scenario(sqlite)
+    finally:
+        firebase.close()
+        sqlite.close()
+
+
+def test_sqlite_data_outlives_the_backend(tmp_path):
+    path = str(tmp_path / "appointments.db")
+    backend = SQLiteBackend(path=path)
+    assert backend.create_availability_range("t1", at(TOMORROW, 9), at(TOMORROW, 11))
+    backend.book_slot("t1", at(TOMORROW, 9))
+    backend.close()
+    
+    reopened = SQLiteBackend(path=path)
+    try:
+        assert listing(reopened, "t1", TOMORROW) == [(at(TOMORROW, 9), "busy"), (at(TOMORROW, 10), "free")]
+        assert reopened.get_day_stats("t1", TOMORROW) == {"free": 1, "busy": 1, "total": 2}
+    finally:
+        reopened.close()
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        create_backend("postgres")
@@ -0,0 +1,136 @@
+"""
+Tests of the batch bookings and cancellations, in particular the all-or-nothing mode.
+"""
+from datetime import date, time, timedelta
+
+import pytest
+
+from app.integrations import BookingResult
+from app.integrations.sqlite_db import SQLiteBackend
+from tests.conftest import at
+
+TOMORROW = date.today() + timedelta(days=1)
+YESTERDAY = date.today() - timedelta(days=1)
+
+
+def stored_slots(backend, therapist_id, day):
+    """Return the (start time, status) of the slots stored for a therapist on a day, leaving out rule slots."""
+    return [(slot.start_time, slot.status) for slot in backend._get_therapist_slots(therapist_id, day, day)]
+
+
+def item(therapist_id, day, hour):
+    return {"therapist_id": therapist_id, "slot_time": at(day, hour).isoformat()}
+
+
+def test_batch_books_stored_and_rule_slots_of_several_therapists(backend):
+    day = date.today() + timedelta(days=1)
+    assert backend.create_free_slot("t1", at(day, 10), at(day, 11))
+    backend.create_availability_rule("t2", [day.weekday()], time(9), time(12))
+    
+    results = backend.book_slots([("t1", at(day, 10)), ("t2", at(day, 9)), ("t2", at(day, 11))], all_or_nothing=True)
+    
+    assert results == [BookingResult.SUCCESS] * 3
+    assert stored_slots(backend, "t2", day) == [(at(day, 9), "busy"), (at(day, 11), "busy")]
+    assert backend.get_day_stats("t2", day) == {"free": 1, "busy": 2, "total": 3}
+
+
+def test_failed_batch_leaves_the_other_therapists_untouched(backend):
+    day = date.today() + timedelta(days=1)
+    assert backend.create_free_slot("t1", at(day, 10), at(day, 11))
+    assert backend.create_free_slot("t2", at(day, 10), at(day, 11))
+    assert backend.book_slot("t2", at(day, 10)) is BookingResult.SUCCESS
+    
+    results = backend.book_slots([("t1", at(day, 10)), ("t2", at(day, 10))], all_or_nothing=True)
+    
+    assert results == [BookingResult.ABORTED, BookingResult.CONFLICT]
+    assert stored_slots(backend, "t1", day) == [(at(day, 10), "free")]
+    assert backend.get_day_stats("t1", day) == {"free": 1, "busy": 0, "total": 1}
+    assert backend.book_slot("t1", at(day, 10)) is BookingResult.SUCCESS
+
+
+@pytest.mark.parametrize("failing_therapist", ["t1", "t2"])
+def test_failed_batch_removes_the_rule_slots_it_stored(backend, failing_therapist):
+    day = date.today() + timedelta(days=1)
+    backend.create_availability_rule("t1", [day.weekday()], time(9), time(11))
+    assert backend.create_free_slot(failing_therapist, at(day, 14), at(day, 15))
+    assert backend.book_slot(failing_therapist, at(day, 14)) is BookingResult.SUCCESS
+    
+    results = backend.book_slots([("t1", at(day, 9)), (failing_therapist, at(day, 14))], all_or_nothing=True)
+    
+    assert results == [BookingResult.ABORTED, BookingResult.CONFLICT]
+    # The date node is rewritten without the rule slot, keeping the other slots of the day
+    assert stored_slots(backend, "t1", day) == ([(at(day, 14), "busy")] if failing_therapist == "t1" else [])
+    assert (backend._get_day_stats("t1", day) or {}).get("free", 0) == 0
+    assert [slot.start_time for slot in backend.list_available_slots("t1", day)] == [at(day, 9), at(day, 10)]
+    assert backend.get_day_stats("t1", day)["free"] == 2
+
+
+def test_failed_cancellation_batch_keeps_every_booking(backend):
+    day = date.today() + timedelta(days=1)
+    for therapist_id in ("t1", "t2"):
+        assert backend.create_free_slot(therapist_id, at(day, 10), at(day, 11))
+    assert backend.book_slot("t1", at(day, 10)) is BookingResult.SUCCESS
+    
+    results = backend.cancel_bookings([("t1", at(day, 10)), ("t2", at(day, 10)), ("t3", at(day, 10))], all_or_nothing=True)
+    
+    # The batch stops at the first failing therapist, t3 is not tried
+    assert results == [BookingResult.ABORTED, BookingResult.CONFLICT, BookingResult.ABORTED]
+    assert stored_slots(backend, "t1", day) == [(at(day, 10), "busy")]
+
+
+def test_batch_status_codes(client, backend):
+    for therapist_id in ("t1", "t2"):
+        assert backend.create_free_slot(therapist_id, at(TOMORROW, 10), at(TOMORROW, 11))
+    
+    partial = client.post("/api/appointments/book/batch", json={"items": [item("t1", TOMORROW, 10), item("t2", TOMORROW, 11)]})
+    assert partial.status_code == 207
+    assert [result["status"] for result in partial.get_json()["results"]] == ["success", "not_found"]
+    
+    rejected = client.post("/api/appointments/book/batch", json={
+        "all_or_nothing": True,
+        "items": [item("t2", TOMORROW, 10), item("t1", TOMORROW, 10)]
+    })
+    assert rejected.status_code == 409
+    assert [result["status"] for result in rejected.get_json()["results"]] == ["aborted", "conflict"]
+    
+    cancelled = client.post("/api/appointments/cancel/batch", json={"all_or_nothing": True, "items": [item("t1", TOMORROW, 10)]})
+    assert cancelled.status_code == 200
+    assert cancelled.get_json()["succeeded"] == 1
+
+
+def test_invalid_item_rejects_an_all_or_nothing_batch_untouched(client, backend):
+    assert backend.create_free_slot("t1", at(TOMORROW, 10), at(TOMORROW, 11))
+    
+    response = client.post("/api/appointments/book/batch", json={
+        "all_or_nothing": True,
+        "items": [item("t1", TOMORROW, 10), item("t1", YESTERDAY, 10)]
+    })
+    
+    assert response.status_code == 409
+    assert [result["status"] for result in response.get_json()["results"]] == ["aborted", "invalid"]
+    assert backend.get_day_stats("t1", TOMORROW) == {"free": 1, "busy": 0, "total": 1}
+
+
+def test_sqlite_batch_is_rolled_back_as_one_transaction(tmp_path, monkeypatch):
+    backend = SQLiteBackend(path=str(tmp_path / "appointments.db"))
+    day = date.today() + timedelta(days=1)
+    backend.create_availability_rule("t1", [day.weekday()], time(9), time(10))
+    assert backend.create_free_slot("t2", at(day, 10), at(day, 11))
+    
+    transition_group = backend._transition_group
+    
+    def fail_on_t2(therapist_id, *args, **kwargs):
+        if therapist_id == "t2":
+            raise RuntimeError("disk full")
+        return transition_group(therapist_id, *args, **kwargs)
+    
+    monkeypatch.setattr(backend, "_transition_group", fail_on_t2)
+    try:
+        with pytest.raises(RuntimeError):
+            backend.book_slots([("t1", at(day, 9)), ("t2", at(day, 10))], all_or_nothing=True)
+        
+        # Nothing of t1 was committed, not even the rule slot it stored
+        assert stored_slots(backend, "t1", day) == []
+        assert backend._get_day_stats("t1", day) is None
+    finally:
+        backend.close()
@@ -0,0 +1,69 @@
+"""
+Tests of booking and cancelling single slots, on every backend.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+from app.integrations import BookingResult
+from tests.conftest import at
+
+TOMORROW = date.today() + timedelta(days=1)
+YESTERDAY = date.today() - timedelta(days=1)
+
+
+def listing(backend, therapist_id, day):
+    """Return the (start time, status) of every slot of a therapist on a day."""
+    return [(slot.start_time, slot.status) for slot in backend.list_all_slots(therapist_id, day)]
+
+
+def item(therapist_id, day, hour):
+    return {"therapist_id": therapist_id, "slot_time": at(day, hour).isoformat()}
+
+
+def test_slot_moves_between_free_and_busy(backend):
+    assert backend.create_free_slot("t1", at(TOMORROW, 10), at(TOMORROW, 11))
+    
+    assert backend.cancel_booking("t1", at(TOMORROW, 10)) is BookingResult.CONFLICT
+    assert backend.book_slot("t1", at(TOMORROW, 10)) is BookingResult.SUCCESS
+    assert backend.book_slot("t1", at(TOMORROW, 10)) is BookingResult.CONFLICT
+    assert backend.get_day_stats("t1", TOMORROW) == {"free": 0, "busy": 1, "total": 1}
+    
+    assert backend.cancel_booking("t1", at(TOMORROW, 10)) is BookingResult.SUCCESS
+    assert backend.cancel_booking("t1", at(TOMORROW, 10)) is BookingResult.CONFLICT
+    assert listing(backend, "t1", TOMORROW) == [(at(TOMORROW, 10), "free")]
+    assert backend.get_day_stats("t1", TOMORROW) == {"free": 1, "busy": 0, "total": 1}
+
+
+def test_missing_slot_is_not_found(backend):
+    assert backend.book_slot("t1", at(TOMORROW, 10)) is BookingResult.NOT_FOUND
+    assert backend.cancel_booking("t1", at(TOMORROW, 10)) is BookingResult.NOT_FOUND
+    assert not backend.book_slot("t1", at(TOMORROW, 10))
+
+
+def test_concurrent_bookings_of_a_slot_have_one_winner(backend):
+    assert backend.create_free_slot("t1", at(TOMORROW, 10), at(TOMORROW, 11))
+    
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda _: backend.book_slot("t1", at(TOMORROW, 10)), range(16)))
+    
+    assert results.count(BookingResult.SUCCESS) == 1
+    assert set(results) == {BookingResult.SUCCESS, BookingResult.CONFLICT}
+    assert backend.get_day_stats("t1", TOMORROW) == {"free": 0, "busy": 1, "total": 1}
+
+
+def test_booking_a_booked_slot_is_a_conflict(client, backend):
+    assert backend.create_free_slot("t1", at(TOMORROW, 10), at(TOMORROW, 11))
+    
+    assert client.post("/api/appointments/book", json=item("t1", TOMORROW, 10)).status_code == 200
+    response = client.post("/api/appointments/book", json=item("t1", TOMORROW, 10))
+    assert response.status_code == 409
+    assert response.get_json()["conflict"] is True
+    
+    assert client.post("/api/appointments/cancel", json=item("t1", TOMORROW, 10)).status_code == 200
+    assert client.post("/api/appointments/cancel", json=item("t1", TOMORROW, 10)).status_code == 409
+
+
+def test_missing_or_past_slot_is_a_bad_request(client):
+    assert client.post("/api/appointments/book", json=item("t1", TOMORROW, 10)).status_code == 400
+    assert client.post("/api/appointments/cancel", json=item("t1", TOMORROW, 10)).status_code == 400
+    assert client.post("/api/appointments/book", json=item("t1", YESTERDAY, 10)).status_code == 400
@@ -0,0 +1,45 @@
+"""
+Tests of the slot cache.
+"""
+from datetime import date
+
+from app.integrations import TimeSlot
+from app.integrations.cache import SlotCache
+from tests.conftest import at
+
+DAY = date(2030, 1, 7)
+
+
+def test_generations_stay_bounded():
+    cache = SlotCache(ttl_seconds=60, max_entries=3)
+    for i in range(100):
+        cache.invalidate(f"t{i}")
+    
+    assert len(cache._generations) == 3
+
+
+def test_read_racing_an_invalidation_is_not_stored_after_its_generation_is_dropped():
+    cache = SlotCache(ttl_seconds=60, max_entries=3)
+    slots = [TimeSlot(at(DAY, 10), at(DAY, 11))]
+    
+    generation = cache.generation("t1")
+    cache.invalidate("t1")
+    for i in range(10):
+        cache.invalidate(f"other-{i}")
+    assert "t1" not in cache._generations
+    
+    cache.put("t1", DAY, slots, generation)
+    assert cache.get("t1", DAY) is None
+    
+    cache.put("t1", DAY, slots, cache.generation("t1"))
+    assert [slot.start_time for slot in cache.get("t1", DAY)] == [at(DAY, 10)]
+
+
+def test_eviction_keeps_the_least_recently_used_entries_out():
+    cache = SlotCache(ttl_seconds=60, max_entries=2)
+    for day in (9, 10, 11):
+        cache.put("t1", date(2030, 1, day), [])
+    
+    assert cache.get("t1", date(2030, 1, 9)) is None
+    assert cache.get("t1", date(2030, 1, 11)) == []
+    assert cache.stats()["evictions"] == 1
@@ -0,0 +1,64 @@
+"""
+Tests of the ETags and conditional GET requests of the read endpoints.
+"""
+from datetime import date, timedelta
+
+from app.config import active_config
+from tests.conftest import at
+
+TOMORROW = date.today() + timedelta(days=1)
+
+
+def item(therapist_id, day, hour):
+    return {"therapist_id": therapist_id, "slot_time": at(day, hour).isoformat()}
+
+
+def test_range_listing_answers_a_matching_etag_with_not_modified(client, backend):
+    assert backend.create_free_slot("t1", at(TOMORROW, 10), at(TOMORROW, 11))
+    url = f"/api/appointments/therapist/t1/slots?from={TOMORROW}&to={TOMORROW}"
+    
+    first = client.get(url)
+    assert first.status_code == 200
+    assert [slot["status"] for slot in first.get_json()["slots"]] == ["free"]
+    assert client.get(url, headers={"If-None-Match": first.headers["ETag"]}).status_code == 304
+    
+    assert client.post("/api/appointments/book", json=item("t1", TOMORROW, 10)).status_code == 200
+    changed = client.get(url, headers={"If-None-Match": first.headers["ETag"]})
+    assert changed.status_code == 200
+    assert [slot["status"] for slot in changed.get_json()["slots"]] == ["busy"]
+
+
+def test_listing_etag_depends_on_the_view(client, backend):
+    assert backend.create_free_slot("t1", at(TOMORROW, 10), at(TOMORROW, 11))
+    
+    by_date = client.get(f"/api/appointments/therapist/t1/slots?date={TOMORROW}")
+    by_status = client.get(f"/api/appointments/therapist/t1/slots?from={TOMORROW}&to={TOMORROW}&status=free")
+    
+    assert by_date.get_json()["slots"] == by_status.get_json()["slots"]
+    assert by_date.headers["ETag"] != by_status.headers["ETag"]
+
+
+def test_stats_and_therapists_answer_a_matching_etag_with_not_modified(client, backend):
+    assert backend.create_free_slot("t1", at(TOMORROW, 10), at(TOMORROW, 11))
+    
+    for url in (f"/api/appointments/therapist/t1/stats?date={TOMORROW}", f"/api/appointments/therapists?date={TOMORROW}&therapist_ids=t1"):
+        first = client.get(url)
+        assert first.status_code == 200
+        assert client.get(url, headers={"If-None-Match": first.headers["ETag"]}).status_code == 304
+        assert client.get(url, headers={"If-None-Match": f'W/{first.headers["ETag"]}'}).status_code == 304
+        
+        backend.book_slot("t1", at(TOMORROW, 10))
+        assert client.get(url, headers={"If-None-Match": first.headers["ETag"]}).status_code == 200
+        backend.cancel_booking("t1", at(TOMORROW, 10))
+
+
+def test_cache_control_follows_the_configured_max_age(client, backend, monkeypatch):
+    url = f"/api/appointments/therapist/t1/slots?date={TOMORROW}"
+    assert client.get(url).headers["Cache-Control"] == "private, no-cache"
+    
+    monkeypatch.setattr(active_config, "HTTP_CACHE_MAX_AGE_SECONDS", 60)
+    assert client.get(url).headers["Cache-Control"] == "private, max-age=60"
+    
+    live = client.get("/api/appointments/cache/stats")
+    assert live.headers["Cache-Control"] == "no-store"
+    assert "ETag" not in live.headers
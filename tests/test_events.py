@@ -0,0 +1,177 @@
+"""
+Tests of the slot event subscriptions and of the events published by the backends.
+"""
+import threading
+from datetime import date, time, timedelta
+
+import pytest
+
+from app.integrations.events import SlotEvents, TooManySubscribers
+from app.integrations.firebase_db import FirebaseBackend
+from app.utils.date_utils import month_start
+from benchmarks.fake_firebase import InMemoryDatabase
+from tests.conftest import at
+
+
+class SlowFeeds:
+    """Change feeds; the one of t1 waits until released to start, like a listener doing its initial fetch."""
+    
+    def __init__(self, error: Exception = None):
+        self.release = threading.Event()
+        self.entered = threading.Event()
+        self.error = error
+        self.started = []
+        self.stopped = []
+    
+    def start(self, therapist_id):
+        if therapist_id == "t1":
+            self.entered.set()
+            assert self.release.wait(5)
+        if self.error is not None:
+            raise self.error
+        self.started.append(therapist_id)
+        return f"feed-{therapist_id}"
+    
+    def stop(self, handle):
+        self.stopped.append(handle)
+
+
+def subscribe_in_thread(events, therapist_id):
+    """Subscribe from another thread; returns the thread and a dict receiving its subscription or error."""
+    outcome = {}
+    
+    def run():
+        try:
+            outcome["subscription"] = events.subscribe(therapist_id)
+        except Exception as e:
+            outcome["error"] = e
+    
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread, outcome
+
+
+def test_starting_feed_does_not_block_other_therapists():
+    feeds = SlowFeeds()
+    events = SlotEvents(start_feed=feeds.start, stop_feed=feeds.stop)
+    thread, outcome = subscribe_in_thread(events, "t1")
+    assert feeds.entered.wait(5)
+    
+    # The feed of t1 is still starting: nothing else waits for it
+    def other_work():
+        events.publish("t1", "created", [])
+        events.subscribe("t2").close()
+        done.set()
+    
+    done = threading.Event()
+    threading.Thread(target=other_work, daemon=True).start()
+    finished = done.wait(5)
+    feeds.release.set()
+    thread.join(5)
+    assert finished
+    
+    assert feeds.started == ["t2", "t1"]
+    assert feeds.stopped == ["feed-t2"]
+    assert events._feeds == {"t1": "feed-t1"}
+    outcome["subscription"].close()
+    assert feeds.stopped == ["feed-t2", "feed-t1"]
+
+
+def test_feed_started_after_every_subscriber_left_is_stopped():
+    feeds = SlowFeeds()
+    events = SlotEvents(start_feed=feeds.start, stop_feed=feeds.stop)
+    thread, outcome = subscribe_in_thread(events, "t1")
+    assert feeds.entered.wait(5)
+    
+    # Leaves before its feed is up
+    with events._lock:
+        subscription = next(iter(events._subscriptions["t1"]))
+    subscription.close()
+    assert feeds.stopped == []
+    
+    feeds.release.set()
+    thread.join(5)
+    assert feeds.stopped == ["feed-t1"]
+    assert events._feeds == {}
+
+
+def test_failed_feed_fails_every_waiting_subscriber():
+    feeds = SlowFeeds(error=ConnectionError("offline"))
+    events = SlotEvents(start_feed=feeds.start, stop_feed=feeds.stop)
+    first, first_outcome = subscribe_in_thread(events, "t1")
+    assert feeds.entered.wait(5)
+    second, second_outcome = subscribe_in_thread(events, "t1")
+    
+    feeds.release.set()
+    first.join(5)
+    second.join(5)
+    assert isinstance(first_outcome["error"], ConnectionError)
+    assert isinstance(second_outcome["error"], ConnectionError)
+    assert not events.has_subscribers("t1")
+    assert events._feeds == {}
+
+
+def test_subscribers_are_limited():
+    events = SlotEvents(max_subscribers=1)
+    subscription = events.subscribe("t1")
+    with pytest.raises(TooManySubscribers):
+        events.subscribe("t2")
+    subscription.close()
+    events.subscribe("t2").close()
+
+
+def test_full_queue_turns_into_resync():
+    events = SlotEvents(max_queued=2)
+    with events.subscribe("t1") as subscription:
+        for _ in range(3):
+            events.publish("t1", "created", [])
+        assert subscription.get(timeout=0).event_type == "resync"
+        assert subscription.get(timeout=0) is None
+
+
+def test_closed_subscription_wakes_its_reader():
+    events = SlotEvents()
+    subscription = events.subscribe("t1")
+    threading.Timer(0.05, subscription.close).start()
+    assert subscription.get(timeout=5) is None
+    assert subscription.closed
+
+
+def test_backend_publishes_bookings_and_cancellations(backend):
+    day = date.today()
+    assert backend.create_free_slot("t1", at(day, 10), at(day, 11))
+    
+    with backend.events.subscribe("t1") as subscription:
+        assert backend.book_slot("t1", at(day, 10)).value == "success"
+        assert backend.cancel_booking("t1", at(day, 10)).value == "success"
+        received = [subscription.get(timeout=5) for _ in range(2)]
+    
+    assert [event.event_type for event in received] == ["booked", "cancelled"]
+    assert [event.slots[0]["status"] for event in received] == ["busy", "free"]
+    assert {event.slots[0]["start_time"] for event in received} == {at(day, 10).isoformat()}
+
+
+def test_firebase_listener_downloads_only_the_slots_of_its_therapist():
+    database = InMemoryDatabase()
+    backend = FirebaseBackend(ref=database.reference("appointments"))
+    past_day = month_start(date.today()) - timedelta(days=40)
+    tomorrow = date.today() + timedelta(days=1)
+    try:
+        assert backend.create_free_slot("t1", at(past_day, 10), at(past_day, 11))
+        assert backend.archive_slots(before=date.today()) == {"t1": 1}
+        assert backend.create_free_slot("t1", at(tomorrow, 10), at(tomorrow, 11))
+        backend.create_availability_rule("t2", [tomorrow.weekday()], time(9), time(10))
+        
+        # Counters, rules and archives are kept out of the therapist node
+        assert sorted(database.reference("appointments/t1").get(shallow=True)) == [tomorrow.isoformat()]
+        assert backend.list_therapist_ids() == ["t1", "t2"]
+        
+        with backend.events.subscribe("t1") as subscription:
+            assert backend.create_availability_range("t1", at(tomorrow, 11), at(tomorrow, 12))
+            backend.create_availability_rule("t1", [tomorrow.weekday()], time(14), time(15))
+            received = [subscription.get(timeout=5) for _ in range(2)]
+    finally:
+        backend.close()
+    
+    assert [event.event_type for event in received] == ["created", "resync"]
+    assert [slot["start_time"] for slot in received[0].slots] == [at(tomorrow, 11).isoformat()]
@@ -0,0 +1,82 @@
+"""
+Tests of the streaming NDJSON export, plain and gzip-compressed, on every backend.
+"""
+from datetime import date, timedelta
+import gzip
+import json
+
+import pytest
+
+from app.services.export_service import gzip_stream, iter_export_lines
+from tests.conftest import at
+
+TOMORROW = date.today() + timedelta(days=1)
+LAST_DAY = TOMORROW + timedelta(days=2)
+
+
+@pytest.fixture
+def slots(backend):
+    """Slots of two therapists over three days, the middle one booked."""
+    for therapist_id in ("t1", "t2"):
+        for offset in (2, 0, 1):
+            day = TOMORROW + timedelta(days=offset)
+            assert backend.create_free_slot(therapist_id, at(day, 9), at(day, 10))
+    backend.book_slot("t2", at(TOMORROW + timedelta(days=1), 9))
+    return backend
+
+
+def exported(lines):
+    """Return the (therapist, start time, status) of every NDJSON line."""
+    rows = [json.loads(line) for line in lines]
+    return [(row["therapist_id"], row["start_time"], row["status"]) for row in rows]
+
+
+def expected(*therapist_ids):
+    """Return the exported rows of the slots fixture for therapists, in order."""
+    return [
+        (therapist_id, at(TOMORROW + timedelta(days=offset), 9).isoformat(), "busy" if (therapist_id, offset) == ("t2", 1) else "free")
+        for therapist_id in therapist_ids for offset in range(3)
+    ]
+
+
+def test_export_streams_each_therapist_in_time_order(slots):
+    assert exported(iter_export_lines(["t2", "t1"], TOMORROW, LAST_DAY)) == expected("t2", "t1")
+    assert exported(iter_export_lines(None, TOMORROW, LAST_DAY)) == expected("t1", "t2")
+    assert exported(iter_export_lines(["t1"], LAST_DAY, LAST_DAY)) == [("t1", at(LAST_DAY, 9).isoformat(), "free")]
+
+
+def test_chunked_reads_cover_the_whole_range(slots):
+    slots_by_chunk = list(slots.iter_slots("t1", TOMORROW, LAST_DAY, chunk_days=2))
+    
+    assert [slot.start_time for slot in slots_by_chunk] == [at(TOMORROW + timedelta(days=offset), 9) for offset in range(3)]
+
+
+def test_gzip_stream_flushes_blocks_that_decompress_to_the_input():
+    lines = [f'{{"line": {number}}}\n'.encode() for number in range(200)]
+    
+    blocks = list(gzip_stream(lines, flush_bytes=256))
+    
+    assert len(blocks) > 2
+    assert gzip.decompress(b"".join(blocks)) == b"".join(lines)
+
+
+def test_export_route_serves_ndjson_and_gzip(client, slots):
+    url = f"/api/appointments/export?from={TOMORROW}&to={LAST_DAY}&therapist_ids=t1,t2"
+    
+    plain = client.get(url)
+    assert plain.status_code == 200
+    assert plain.mimetype == "application/x-ndjson"
+    assert exported(plain.data.splitlines()) == expected("t1", "t2")
+    
+    compressed = client.get(url + "&gzip=true")
+    assert compressed.mimetype == "application/gzip"
+    assert compressed.headers["Content-Disposition"].endswith('.ndjson.gz"')
+    assert gzip.decompress(compressed.data) == plain.data
+
+
+@pytest.mark.parametrize("query", [f"from={TOMORROW}", f"from={LAST_DAY}&to={TOMORROW}", "from=tomorrow&to=later"])
+def test_missing_or_reversed_range_is_a_bad_request(client, query):
+    response = client.get(f"/api/appointments/export?{query}")
+    
+    assert response.status_code == 400
+    assert response.get_json()["success"] is False
@@ -0,0 +1,106 @@
+"""
+Tests of the per-process state of the backends: Firebase apps and the reset after a fork.
+"""
+import json
+import os
+from datetime import date
+
+import firebase_admin
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from app import integrations
+from app.config import active_config
+from app.integrations.firebase_db import FirebaseBackend
+from tests.conftest import at
+
+needs_fork = pytest.mark.skipif(not hasattr(os, "fork"), reason="needs os.fork")
+
+
+@pytest.fixture
+def credentials(monkeypatch):
+    """Service account credentials with a generated key; nothing is sent anywhere."""
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption())
+    monkeypatch.setitem(active_config.FIREBASE_CONFIG, "private_key", pem.decode())
+    monkeypatch.setitem(active_config.FIREBASE_CONFIG, "private_key_id", "test")
+    monkeypatch.setitem(active_config.FIREBASE_CONFIG, "client_email", "test@example.iam.gserviceaccount.com")
+    monkeypatch.setitem(active_config.FIREBASE_CONFIG, "client_id", "1")
+
+
+def run_in_child(check) -> dict:
+    """Run a function in a forked child and return the dict it returned."""
+    read_end, write_end = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            result = check()
+        except BaseException as e:
+            result = {"error": repr(e)}
+        os.write(write_end, json.dumps(result).encode())
+        os._exit(0)
+    
+    os.close(write_end)
+    os.waitpid(pid, 0)
+    with os.fdopen(read_end) as output:
+        return json.loads(output.read())
+
+
+def test_closing_a_backend_keeps_the_shared_app_of_the_others(credentials):
+    first, second = FirebaseBackend(), FirebaseBackend()
+    assert first._app is second._app
+    name = first._app.name
+    
+    first.close()
+    assert firebase_admin.get_app(name) is second._app
+    
+    second.close()
+    with pytest.raises(ValueError):
+        firebase_admin.get_app(name)
+
+
+@needs_fork
+def test_forked_child_gets_its_own_firebase_app(credentials):
+    backend = FirebaseBackend()
+    integrations.set_backend(backend)
+    parent_app = backend._app
+    
+    def check():
+        child = integrations.get_backend()
+        result = {"same_backend": child is backend, "app": child._app.name}
+        integrations.close_backend()
+        result["parent_app_alive"] = firebase_admin.get_app(parent_app.name) is parent_app
+        return result
+    
+    try:
+        result = run_in_child(check)
+    finally:
+        integrations.set_backend(None)
+        backend.close()
+    
+    assert result["same_backend"]
+    assert result["app"] != parent_app.name
+    assert result["parent_app_alive"]
+
+
+@needs_fork
+def test_forked_child_starts_without_the_parents_cache_and_subscribers(backend):
+    today = date.today()
+    assert backend.create_free_slot("t1", at(today, 10), at(today, 11))
+    backend.list_all_slots("t1", today)
+    subscription = backend.events.subscribe("t1")
+    
+    def check():
+        child = integrations.get_backend()
+        return {
+            "cached": child.cache.get("t1", today) is not None,
+            "subscribed": child.events.has_subscribers("t1"),
+            "slots": len(child.list_all_slots("t1", today)),
+        }
+    
+    try:
+        assert run_in_child(check) == {"cached": False, "subscribed": False, "slots": 1}
+        assert backend.events.has_subscribers("t1")
+    finally:
+        subscription.close()
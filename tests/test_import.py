@@ -0,0 +1,138 @@
+"""
+Tests of the streaming CSV and iCalendar import, on every backend.
+"""
+from datetime import date, timedelta
+import json
+import os
+
+import pytest
+
+from app.services.import_service import import_slots, read_csv_slots
+from tests.conftest import at
+
+TOMORROW = date.today() + timedelta(days=1)
+YESTERDAY = date.today() - timedelta(days=1)
+
+
+def write_csv(path, rows):
+    """Write an import CSV file with a header and rows of (therapist, day, hour[, status])."""
+    lines = ["therapist_id,start_time,end_time,status"]
+    for therapist_id, day, hour, *status in rows:
+        lines.append(f"{therapist_id},{at(day, hour).isoformat()},{at(day, hour + 1).isoformat()},{''.join(status)}")
+    path.write_text("\n".join(lines) + "\n")
+    return str(path)
+
+
+def listing(backend, therapist_id, day):
+    """Return the (start hour, status) of every slot of a therapist on a day."""
+    return [(slot.start_time.hour, slot.status) for slot in backend.list_all_slots(therapist_id, day)]
+
+
+def test_csv_import_stores_valid_rows_and_reports_the_others(backend, tmp_path):
+    path = write_csv(tmp_path / "slots.csv", [
+        ("t1", TOMORROW, 9),
+        ("t1", TOMORROW, 10, "busy"),
+        ("t2", TOMORROW, 9),
+        ("t1", TOMORROW, 9),
+        ("", TOMORROW, 11),
+        ("t1", YESTERDAY, 9),
+        ("t1", TOMORROW, 12, "pending")
+    ])
+    rejects_path = tmp_path / "rejects.jsonl"
+    
+    summary = import_slots(path, chunk_size=2, rejects_path=str(rejects_path))
+    
+    assert {key: summary[key] for key in ("rows", "imported", "skipped", "rejected")} == {"rows": 7, "imported": 3, "skipped": 1, "rejected": 3}
+    assert listing(backend, "t1", TOMORROW) == [(9, "free"), (10, "busy")]
+    assert listing(backend, "t2", TOMORROW) == [(9, "free")]
+    assert [json.loads(line)["row"] for line in rejects_path.read_text().splitlines()] == [5, 6, 7]
+    assert not os.path.exists(f"{path}.checkpoint")
+
+
+def test_past_rows_are_imported_when_allowed(backend, tmp_path):
+    path = write_csv(tmp_path / "history.csv", [("t1", YESTERDAY, 9, "busy")])
+    
+    assert import_slots(path, allow_past=True)["imported"] == 1
+    assert listing(backend, "t1", YESTERDAY) == [(9, "busy")]
+
+
+def test_csv_rows_resume_from_their_byte_offset(tmp_path):
+    path = write_csv(tmp_path / "slots.csv", [("t1", TOMORROW, hour) for hour in (9, 10, 11)])
+    
+    rows = list(read_csv_slots(path))
+    resumed = list(read_csv_slots(path, rows[0][1]))
+    
+    assert [row["start_time"] for row, _ in resumed] == [at(TOMORROW, hour).isoformat() for hour in (10, 11)]
+    assert [offset for _, offset in resumed] == [offset for _, offset in rows[1:]]
+    assert rows[-1][1] == os.path.getsize(path)
+
+
+def test_interrupted_import_resumes_after_the_last_written_chunk(backend, tmp_path, monkeypatch):
+    path = write_csv(tmp_path / "slots.csv", [("t1", TOMORROW, hour) for hour in range(8, 13)])
+    insert_slots = backend.insert_slots
+    writes = []
+    
+    def failing_insert(slots_by_therapist):
+        writes.append(slots_by_therapist)
+        if len(writes) == 2:
+            raise RuntimeError("connection lost")
+        return insert_slots(slots_by_therapist)
+    
+    monkeypatch.setattr(backend, "insert_slots", failing_insert)
+    with pytest.raises(RuntimeError):
+        import_slots(path, chunk_size=2)
+    
+    with open(f"{path}.checkpoint") as f:
+        checkpoint = json.load(f)
+    assert (checkpoint["rows"], checkpoint["imported"]) == (2, 2)
+    
+    monkeypatch.setattr(backend, "insert_slots", insert_slots)
+    summary = import_slots(path, chunk_size=2, resume=True)
+    
+    assert (summary["rows"], summary["imported"], summary["skipped"]) == (5, 5, 0)
+    assert listing(backend, "t1", TOMORROW) == [(hour, "free") for hour in range(8, 13)]
+    assert not os.path.exists(f"{path}.checkpoint")
+
+
+def test_checkpoint_of_another_file_is_rejected(backend, tmp_path):
+    path = write_csv(tmp_path / "slots.csv", [("t1", TOMORROW, 9)])
+    (tmp_path / "slots.csv.checkpoint").write_text(json.dumps({"path": "/elsewhere/slots.csv", "offset": 0}))
+    
+    with pytest.raises(ValueError):
+        import_slots(path, resume=True)
+
+
+def test_ics_import_unfolds_lines_and_converts_utc_times(backend, tmp_path):
+    start, end = at(TOMORROW, 9), at(TOMORROW, 10)
+    path = tmp_path / "calendar.ics"
+    path.write_text("\r\n".join([
+        "BEGIN:VCALENDAR",
+        "BEGIN:VEVENT",
+        "SUMMARY:Session with a long",
+        "  title folded onto the next line",
+        f"DTSTART:{start:%Y%m%dT%H%M%S}Z",
+        f"DTEND;TZID=UTC:{end:%Y%m%dT%H%M%S}",
+        "END:VEVENT",
+        "BEGIN:VEVENT",
+        "X-THERAPIST-",
+        " ID:t2",
+        f"DTSTART:{start + timedelta(hours=1):%Y%m%dT%H%M%S}",
+        f"DTEND:{end + timedelta(hours=1):%Y%m%dT%H%M%S}",
+        "X-SLOT-STATUS:busy",
+        "END:VEVENT",
+        "BEGIN:VEVENT",
+        "DTSTART:tomorrow",
+        "END:VEVENT",
+        "END:VCALENDAR"
+    ]) + "\r\n")
+    
+    summary = import_slots(str(path), therapist_id="t1")
+    
+    assert (summary["rows"], summary["imported"], summary["rejected"]) == (3, 2, 1)
+    assert listing(backend, "t1", TOMORROW) == [(9, "free")]
+    assert listing(backend, "t2", TOMORROW) == [(10, "busy")]
+
+
+def test_unknown_format_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        import_slots(str(tmp_path / "slots.xlsx"))
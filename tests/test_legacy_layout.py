@@ -0,0 +1,74 @@
+"""
+Tests of the Firebase therapists still stored in the legacy flat list layout.
+"""
+from datetime import date, timedelta
+from typing import Iterator
+
+import pytest
+
+from app.integrations import BookingResult, TimeSlot
+from app.integrations.firebase_db import FirebaseBackend
+from benchmarks.fake_firebase import InMemoryDatabase
+from tests.conftest import at
+
+TOMORROW = date.today() + timedelta(days=1)
+
+
+@pytest.fixture
+def database() -> InMemoryDatabase:
+    return InMemoryDatabase()
+
+
+@pytest.fixture
+def backend(database: InMemoryDatabase) -> Iterator[FirebaseBackend]:
+    backend = FirebaseBackend(ref=database.reference("appointments"))
+    yield backend
+    backend.close()
+
+
+def legacy_slot(hour: int, status: str = "free") -> dict:
+    """Return a slot as the legacy layout stored it, with ISO strings."""
+    return TimeSlot(at(TOMORROW, hour), at(TOMORROW, hour + 1), status).to_dict()
+
+
+def listing(backend, therapist_id):
+    return [(slot.start_time, slot.status) for slot in backend.list_all_slots(therapist_id, TOMORROW)]
+
+
+def test_legacy_list_is_read_through(database, backend):
+    database.reference("appointments/t1").set([legacy_slot(10), legacy_slot(11, "busy")])
+    
+    assert listing(backend, "t1") == [(at(TOMORROW, 10), "free"), (at(TOMORROW, 11), "busy")]
+    # Reading does not migrate
+    assert isinstance(database.reference("appointments/t1").get(), list)
+
+
+@pytest.mark.parametrize("indexes", [[1, 2], [3, 9]])
+def test_sparse_legacy_list_without_its_first_index_is_read_through(database, backend, indexes):
+    database.reference("appointments/t1").set({str(index): legacy_slot(10 + i) for i, index in enumerate(indexes)})
+    
+    assert listing(backend, "t1") == [(at(TOMORROW, 10), "free"), (at(TOMORROW, 11), "free")]
+
+
+def test_first_write_migrates_the_legacy_list(database, backend):
+    database.reference("appointments/t1").set([legacy_slot(10), None, legacy_slot(11, "busy")])
+    
+    assert backend.book_slot("t1", at(TOMORROW, 10)) is BookingResult.SUCCESS
+    
+    stored = database.reference("appointments/t1").get()
+    assert sorted(stored) == [TOMORROW.isoformat()]
+    assert sorted(stored[TOMORROW.isoformat()]) == ["10:00:00", "11:00:00"]
+    assert listing(backend, "t1") == [(at(TOMORROW, 10), "busy"), (at(TOMORROW, 11), "busy")]
+    assert backend.get_day_stats("t1", TOMORROW) == {"free": 0, "busy": 2, "total": 2}
+    assert backend.cancel_booking("t1", at(TOMORROW, 11)) is BookingResult.SUCCESS
+
+
+def test_partitioned_therapist_is_not_mistaken_for_a_legacy_one(database, backend):
+    assert backend.create_free_slot("t1", at(TOMORROW, 10), at(TOMORROW, 11))
+    
+    other = FirebaseBackend(ref=database.reference("appointments"))
+    try:
+        assert other._get_legacy_slots("t1") is None
+        assert listing(other, "t1") == [(at(TOMORROW, 10), "free")]
+    finally:
+        other.close()
@@ -0,0 +1,103 @@
+"""
+Tests of the in-process metrics and their /metrics endpoint.
+"""
+from datetime import date, timedelta
+
+import pytest
+
+from app.utils.metrics import OTHER_LABEL, BoundedLabel, MetricsRegistry, RequestTally
+from tests.conftest import at
+
+TOMORROW = date.today() + timedelta(days=1)
+SLOTS_ROUTE = "/api/appointments/therapist/<therapist_id>/slots"
+
+
+def sample(text, name):
+    """Return the value of a sample line of the exposition text, or 0 if it is missing."""
+    for line in text.splitlines():
+        if line.startswith(name + " "):
+            return float(line.rsplit(" ", 1)[1])
+    return 0
+
+
+def test_metrics_render_in_the_text_exposition_format():
+    registry = MetricsRegistry()
+    requests = registry.counter("requests_total", "Requests", ("route",))
+    in_flight = registry.gauge("in_flight", "Requests in flight")
+    latency = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+    
+    requests.inc('/a"b')
+    requests.inc('/a"b', amount=2)
+    in_flight.inc()
+    in_flight.inc()
+    in_flight.dec()
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.observe(value)
+    
+    assert registry.render().splitlines() == [
+        "# HELP in_flight Requests in flight",
+        "# TYPE in_flight gauge",
+        "in_flight 1",
+        "# HELP latency_seconds Latency",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{le="0.1"} 2',
+        'latency_seconds_bucket{le="1"} 3',
+        'latency_seconds_bucket{le="+Inf"} 4',
+        "latency_seconds_sum 3.65",
+        "latency_seconds_count 4",
+        "# HELP requests_total Requests",
+        "# TYPE requests_total counter",
+        'requests_total{route="/a\\"b"} 3'
+    ]
+
+
+def test_metric_names_are_registered_once():
+    registry = MetricsRegistry()
+    counter = registry.counter("requests_total", "Requests", ("route",))
+    
+    assert registry.counter("requests_total", "Requests", ("route",)) is counter
+    with pytest.raises(ValueError):
+        registry.gauge("requests_total", "Requests", ("route",))
+    with pytest.raises(ValueError):
+        counter.inc("/a", "200")
+
+
+def test_bounded_label_shares_one_value_beyond_its_limit():
+    label = BoundedLabel(2)
+    
+    assert [label(value) for value in ("t1", "t2", "t3", "t1")] == ["t1", "t2", OTHER_LABEL, "t1"]
+
+
+def test_request_tally_counts_only_once_started():
+    tally = RequestTally("test_tally")
+    tally.add(5)
+    assert tally.finish() is None
+    
+    tally.start()
+    tally.add(2)
+    tally.add(3)
+    assert tally.finish() == 5
+    assert tally.finish() is None
+
+
+def test_metrics_endpoint_reports_requests_and_backend_calls(client, backend):
+    assert backend.create_free_slot("t1", at(TOMORROW, 10), at(TOMORROW, 11))
+    labels = f'{{method="GET",route="{SLOTS_ROUTE}",status="200"}}'
+    before = client.get("/metrics").get_data(as_text=True)
+    
+    assert client.get(f"/api/appointments/therapist/t1/slots?date={TOMORROW}").status_code == 200
+    assert client.get("/no/such/page").status_code == 404
+    response = client.get("/metrics")
+    text = response.get_data(as_text=True)
+    
+    assert response.content_type == "text/plain; version=0.0.4; charset=utf-8"
+    assert sample(text, f"http_requests_total{labels}") == sample(before, f"http_requests_total{labels}") + 1
+    assert sample(text, f"http_request_duration_seconds_count{labels}") == sample(before, f"http_request_duration_seconds_count{labels}") + 1
+    assert sample(text, 'http_requests_total{method="GET",route="unmatched",status="404"}') >= 1
+    assert sample(text, "http_requests_in_flight") == 1
+    
+    parsed = f'http_request_slots_parsed_sum{{method="GET",route="{SLOTS_ROUTE}"}}'
+    assert sample(text, parsed) >= sample(before, parsed) + 1
+    call = f'backend_call_duration_seconds_count{{backend="{backend.name}",operation="get_therapist_slots",therapist_id="t1"}}'
+    assert sample(text, call) > sample(before, call)
+    assert "slot_cache_entries " in text
@@ -0,0 +1,90 @@
+"""
+Tests of the on-demand request profiler.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import pstats
+
+import pytest
+from flask import Flask, jsonify
+
+from app.utils.concurrency import fan_out
+from app.utils.profiler import RESULT_HEADER, init_profiler, profile_call
+
+TOKEN = "secret"
+
+
+def square(value):
+    return value * value
+
+
+@pytest.fixture
+def make_app(tmp_path):
+    """Build a small app with the profiler installed as configured, and its output directory."""
+    executor = ThreadPoolExecutor(max_workers=2)
+    
+    def make(**options):
+        app = Flask(__name__)
+        
+        @app.route("/therapist/<therapist_id>/squares")
+        def squares(therapist_id):
+            results = fan_out(executor, square, [1, 2, 3], item_timeout=5, deadline=5)
+            return jsonify({key: result for key, (_, result) in results.items()})
+        
+        @app.route("/fail")
+        def fail():
+            raise RuntimeError("boom")
+        
+        installed = init_profiler(app, str(tmp_path / "profiles"), **options)
+        return app, installed
+    
+    yield make, tmp_path / "profiles"
+    executor.shutdown()
+
+
+def test_profiler_is_not_installed_by_default(make_app):
+    make, directory = make_app
+    app, installed = make()
+    
+    assert installed is False
+    assert RESULT_HEADER not in app.test_client().get("/therapist/t1/squares").headers
+    assert not directory.exists()
+
+
+def test_flagged_request_writes_a_profile_with_its_worker_calls(make_app):
+    make, directory = make_app
+    app, installed = make(token=TOKEN)
+    client = app.test_client()
+    
+    assert installed is True
+    assert RESULT_HEADER not in client.get("/therapist/t1/squares").headers
+    assert RESULT_HEADER not in client.get("/therapist/t1/squares", headers={"X-Profile-Token": "wrong"}).headers
+    
+    response = client.get("/therapist/t1/squares", headers={"X-Profile-Token": TOKEN})
+    
+    name = response.headers[RESULT_HEADER]
+    assert "-get-therapist_therapist_id_squares-t1-" in name
+    assert [path.name for path in directory.iterdir()] == [f"{name}.prof"]
+    functions = {function for _, _, function in pstats.Stats(str(directory / f"{name}.prof")).stats}
+    assert {"squares", "square"} <= functions
+
+
+def test_sampled_request_can_trace_memory(make_app):
+    make, directory = make_app
+    app, _ = make(sample_rate=1.0, trace_memory=True)
+    
+    name = app.test_client().get("/therapist/t1/squares").headers[RESULT_HEADER]
+    
+    assert sorted(path.name for path in directory.iterdir()) == [f"{name}.prof", f"{name}.tracemalloc"]
+
+
+def test_failed_request_releases_the_profiler(make_app):
+    make, _ = make_app
+    app, _ = make(sample_rate=1.0)
+    client = app.test_client()
+    
+    assert client.get("/fail").status_code == 500
+    assert RESULT_HEADER in client.get("/therapist/t1/squares").headers
+
+
+def test_worker_calls_outside_of_a_profiled_request_run_plainly():
+    assert profile_call(square, 4) == 16
@@ -0,0 +1,84 @@
+"""
+Tests of listing the slots of a therapist over a range of days, on every backend.
+"""
+from datetime import date, datetime, time, timedelta
+
+import pytest
+
+from app.integrations import BookingResult
+from tests.conftest import at
+
+TOMORROW = date.today() + timedelta(days=1)
+
+
+def starts(slots):
+    """Return the start times of slots."""
+    return [slot.start_time for slot in slots]
+
+
+def test_range_spans_several_days_in_time_order(backend):
+    for offset, hour in ((2, 9), (0, 15), (1, 11), (0, 10)):
+        day = TOMORROW + timedelta(days=offset)
+        assert backend.create_free_slot("t1", at(day, hour), at(day, hour + 1))
+    
+    slots = backend.list_slots_in_range("t1", at(TOMORROW, 0), at(TOMORROW + timedelta(days=3), 0))
+    
+    assert starts(slots) == [
+        at(TOMORROW, 10),
+        at(TOMORROW, 15),
+        at(TOMORROW + timedelta(days=1), 11),
+        at(TOMORROW + timedelta(days=2), 9)
+    ]
+
+
+def test_range_bounds_are_start_inclusive_and_end_exclusive(backend):
+    for hour in (9, 10, 11, 12):
+        assert backend.create_free_slot("t1", at(TOMORROW, hour), at(TOMORROW, hour + 1))
+    
+    assert starts(backend.list_slots_in_range("t1", at(TOMORROW, 10), at(TOMORROW, 12))) == [at(TOMORROW, 10), at(TOMORROW, 11)]
+    assert backend.list_slots_in_range("t1", at(TOMORROW, 12), at(TOMORROW, 12)) == []
+    assert backend.list_slots_in_range("t1", at(TOMORROW, 12), at(TOMORROW, 10)) == []
+
+
+def test_range_filters_by_status(backend):
+    for hour in (9, 10):
+        assert backend.create_free_slot("t1", at(TOMORROW, hour), at(TOMORROW, hour + 1))
+    assert backend.book_slot("t1", at(TOMORROW, 10)) is BookingResult.SUCCESS
+    start, end = at(TOMORROW, 0), at(TOMORROW + timedelta(days=1), 0)
+    
+    assert starts(backend.list_slots_in_range("t1", start, end, "free")) == [at(TOMORROW, 9)]
+    assert starts(backend.list_slots_in_range("t1", start, end, "busy")) == [at(TOMORROW, 10)]
+    with pytest.raises(ValueError):
+        backend.list_slots_in_range("t1", start, end, "pending")
+
+
+def test_date_bounds_include_the_whole_last_day(client, backend):
+    last_day = TOMORROW + timedelta(days=1)
+    for day, hour in ((TOMORROW, 9), (last_day, 23), (last_day + timedelta(days=1), 0)):
+        assert backend.create_free_slot("t1", at(day, hour), datetime.combine(day, time(hour, 30)))
+    
+    response = client.get(f"/api/appointments/therapist/t1/slots?from={TOMORROW}&to={last_day}")
+    
+    assert response.status_code == 200
+    assert [slot["start_time"] for slot in response.get_json()["slots"]] == [at(TOMORROW, 9).isoformat(), at(last_day, 23).isoformat()]
+
+
+def test_datetime_bounds_and_status_reach_the_listing(client, backend):
+    for hour in (9, 10, 11):
+        assert backend.create_free_slot("t1", at(TOMORROW, hour), at(TOMORROW, hour + 1))
+    assert backend.book_slot("t1", at(TOMORROW, 9)) is BookingResult.SUCCESS
+    
+    response = client.get(
+        f"/api/appointments/therapist/t1/slots?from={at(TOMORROW, 9).isoformat()}&to={at(TOMORROW, 11).isoformat()}&status=free"
+    )
+    
+    assert response.status_code == 200
+    assert [slot["start_time"] for slot in response.get_json()["slots"]] == [at(TOMORROW, 10).isoformat()]
+
+
+@pytest.mark.parametrize("query", [f"from={TOMORROW}", f"to={TOMORROW}", f"from={TOMORROW}&to={TOMORROW}&status=pending", "from=tomorrow&to=later"])
+def test_incomplete_or_invalid_range_is_a_bad_request(client, query):
+    response = client.get(f"/api/appointments/therapist/t1/slots?{query}")
+    
+    assert response.status_code == 400
+    assert response.get_json()["success"] is False
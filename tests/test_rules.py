@@ -0,0 +1,102 @@
+"""
+Tests of the recurring availability rules and the slots they generate, on every backend.
+"""
+from datetime import date, time, timedelta
+
+import pytest
+
+from app.integrations import BookingResult
+from tests.conftest import at
+
+TOMORROW = date.today() + timedelta(days=1)
+NEXT_WEEK = TOMORROW + timedelta(days=7)
+
+
+def listing(backend, therapist_id, day):
+    """Return the (start time, status) of every slot of a therapist on a day."""
+    return [(slot.start_time, slot.status) for slot in backend.list_all_slots(therapist_id, day)]
+
+
+def test_booked_rule_slot_is_stored_and_outlives_its_rule(backend):
+    rule = backend.create_availability_rule("t1", [TOMORROW.weekday()], time(9), time(12))
+    assert backend.create_free_slot("t1", at(TOMORROW, 14), at(TOMORROW, 15))
+    assert backend.get_day_stats("t1", TOMORROW) == {"free": 4, "busy": 0, "total": 4}
+    
+    assert backend.book_slot("t1", at(TOMORROW, 10)) is BookingResult.SUCCESS
+    assert backend.book_slot("t1", at(TOMORROW, 10)) is BookingResult.CONFLICT
+    assert [slot.start_time for slot in backend._get_therapist_slots("t1", TOMORROW, TOMORROW)] == [at(TOMORROW, 10), at(TOMORROW, 14)]
+    assert backend.get_day_stats("t1", TOMORROW) == {"free": 3, "busy": 1, "total": 4}
+    
+    assert backend.delete_availability_rule("t1", rule.rule_id)
+    assert listing(backend, "t1", TOMORROW) == [(at(TOMORROW, 10), "busy"), (at(TOMORROW, 14), "free")]
+    assert backend.book_slot("t1", at(TOMORROW, 9)) is BookingResult.NOT_FOUND
+
+
+def test_rule_slots_overlapping_stored_slots_are_left_out(backend):
+    assert backend.create_free_slot("t1", at(TOMORROW, 10), at(TOMORROW, 11))
+    assert backend.book_slot("t1", at(TOMORROW, 10)) is BookingResult.SUCCESS
+    backend.create_availability_rule("t1", [TOMORROW.weekday()], time(9), time(12))
+    
+    assert listing(backend, "t1", TOMORROW) == [(at(TOMORROW, 9), "free"), (at(TOMORROW, 10), "busy"), (at(TOMORROW, 11), "free")]
+    assert backend.book_slot("t1", at(TOMORROW, 10)) is BookingResult.CONFLICT
+
+
+def test_rule_applies_on_its_weekdays_within_its_validity(backend):
+    backend.create_availability_rule(
+        "t1", [TOMORROW.weekday()], time(9), time(10), slot_duration_minutes=30,
+        valid_to=NEXT_WEEK + timedelta(days=7), exceptions=[NEXT_WEEK]
+    )
+    
+    assert listing(backend, "t1", TOMORROW) == [(at(TOMORROW, 9), "free"), (at(TOMORROW, 9).replace(minute=30), "free")]
+    assert listing(backend, "t1", TOMORROW + timedelta(days=1)) == []
+    assert listing(backend, "t1", NEXT_WEEK) == []
+    assert len(listing(backend, "t1", NEXT_WEEK + timedelta(days=7))) == 2
+    assert listing(backend, "t1", NEXT_WEEK + timedelta(days=14)) == []
+    assert backend.get_day_stats("t1", NEXT_WEEK) == {"free": 0, "busy": 0, "total": 0}
+
+
+def test_rule_slots_are_listed_in_ranges_and_searches(backend):
+    backend.create_availability_rule("t1", range(7), time(9), time(11))
+    assert backend.create_free_slot("t2", at(TOMORROW, 9), at(TOMORROW, 10))
+    
+    in_range = backend.list_slots_in_range("t1", at(TOMORROW, 0), at(TOMORROW + timedelta(days=2), 0))
+    assert [slot.start_time for slot in in_range] == [at(TOMORROW + timedelta(days=offset), hour) for offset in (0, 1) for hour in (9, 10)]
+    
+    earliest = backend.find_earliest_available(["t1", "t2"], at(TOMORROW, 0), at(NEXT_WEEK, 0), 3)
+    assert [(therapist_id, slot.start_time) for therapist_id, slot in earliest] == [
+        ("t1", at(TOMORROW, 9)),
+        ("t2", at(TOMORROW, 9)),
+        ("t1", at(TOMORROW, 10))
+    ]
+
+
+@pytest.mark.parametrize("weekdays, start, end", [([], time(9), time(10)), ([0], time(10), time(9))])
+def test_rule_that_cannot_generate_slots_is_rejected(backend, weekdays, start, end):
+    with pytest.raises(ValueError):
+        backend.create_availability_rule("t1", weekdays, start, end)
+    assert backend.list_availability_rules("t1") == []
+
+
+def test_rule_routes_create_list_and_delete(client):
+    url = "/api/appointments/therapist/t1/rules"
+    created = client.post(url, json={"weekdays": ["mon", "wed"], "start_time": "09:00", "end_time": "12:00", "exceptions": [NEXT_WEEK.isoformat()]})
+    assert created.status_code == 201
+    rule_id = created.get_json()["rule"]["rule_id"]
+    
+    assert [rule["rule_id"] for rule in client.get(url).get_json()["rules"]] == [rule_id]
+    assert client.delete(f"{url}/{rule_id}").status_code == 200
+    assert client.delete(f"{url}/{rule_id}").status_code == 404
+    assert client.get(url).get_json()["rules"] == []
+
+
+@pytest.mark.parametrize("body", [
+    {"start_time": "09:00", "end_time": "12:00", "slot_duration_minutes": 5},
+    {"start_time": "12:00", "end_time": "09:00"},
+    {"weekdays": ["someday"], "start_time": "09:00", "end_time": "12:00"},
+    {"end_time": "12:00"}
+])
+def test_invalid_rule_is_a_bad_request(client, body):
+    response = client.post("/api/appointments/therapist/t1/rules", json=body)
+    
+    assert response.status_code == 400
+    assert response.get_json()["success"] is False
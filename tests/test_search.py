@@ -0,0 +1,83 @@
+"""
+Tests of the earliest-available slot search across therapists, on every backend.
+"""
+from datetime import date, timedelta
+
+import pytest
+
+from app.integrations import BookingResult
+from tests.conftest import at
+
+TOMORROW = date.today() + timedelta(days=1)
+WINDOW_END = at(TOMORROW + timedelta(days=30), 0)
+
+
+def found(tagged_slots):
+    """Return the (therapist, start time) of the slots a search found."""
+    return [(therapist_id, slot.start_time) for therapist_id, slot in tagged_slots]
+
+
+def test_search_merges_the_free_slots_of_every_therapist(backend):
+    for therapist_id, offset, hour in (("t1", 0, 14), ("t1", 2, 9), ("t2", 0, 9), ("t2", 1, 10), ("t3", 0, 11)):
+        day = TOMORROW + timedelta(days=offset)
+        assert backend.create_free_slot(therapist_id, at(day, hour), at(day, hour + 1))
+    assert backend.book_slot("t3", at(TOMORROW, 11)) is BookingResult.SUCCESS
+    
+    tagged_slots = backend.find_earliest_available(["t1", "t2", "t3"], at(TOMORROW, 0), WINDOW_END, 10)
+    
+    assert found(tagged_slots) == [
+        ("t2", at(TOMORROW, 9)),
+        ("t1", at(TOMORROW, 14)),
+        ("t2", at(TOMORROW + timedelta(days=1), 10)),
+        ("t1", at(TOMORROW + timedelta(days=2), 9))
+    ]
+
+
+def test_search_stops_at_the_limit_and_breaks_ties_by_therapist_order(backend):
+    for therapist_id in ("t1", "t2"):
+        for hour in (9, 10):
+            assert backend.create_free_slot(therapist_id, at(TOMORROW, hour), at(TOMORROW, hour + 1))
+    
+    tagged_slots = backend.find_earliest_available(["t2", "t1", "t2"], at(TOMORROW, 0), WINDOW_END, 3)
+    
+    assert found(tagged_slots) == [("t2", at(TOMORROW, 9)), ("t1", at(TOMORROW, 9)), ("t2", at(TOMORROW, 10))]
+    assert backend.find_earliest_available(["t1"], at(TOMORROW, 0), WINDOW_END, 0) == []
+
+
+def test_search_reads_only_as_far_as_the_limit_needs(backend, monkeypatch):
+    assert backend.create_free_slot("t1", at(TOMORROW, 9), at(TOMORROW, 10))
+    read_days = []
+    read_slots = backend._read_slots
+    
+    def counting_read(therapist_id, first_day, last_day):
+        read_days.append((first_day, last_day))
+        return read_slots(therapist_id, first_day, last_day)
+    
+    monkeypatch.setattr(backend, "_read_slots", counting_read)
+    
+    assert found(backend.find_earliest_available(["t1"], at(TOMORROW, 0), WINDOW_END, 1)) == [("t1", at(TOMORROW, 9))]
+    assert read_days == [(TOMORROW, TOMORROW)]
+
+
+def test_search_route_defaults_and_window(client, backend):
+    for offset in (0, 3):
+        day = TOMORROW + timedelta(days=offset)
+        assert backend.create_free_slot("t1", at(day, 9), at(day, 10))
+    
+    response = client.get("/api/appointments/search/earliest?therapist_ids=t1, t2")
+    assert response.status_code == 200
+    assert [slot["start_time"] for slot in response.get_json()["slots"]] == [
+        at(TOMORROW, 9).isoformat(),
+        at(TOMORROW + timedelta(days=3), 9).isoformat()
+    ]
+    
+    windowed = client.get(f"/api/appointments/search/earliest?therapist_ids=t1&from={TOMORROW}&to={TOMORROW + timedelta(days=1)}")
+    assert [slot["start_time"] for slot in windowed.get_json()["slots"]] == [at(TOMORROW, 9).isoformat()]
+
+
+@pytest.mark.parametrize("query", ["therapist_ids=", "therapist_ids=t1&limit=0", "therapist_ids=t1&limit=101", "therapist_ids=t1&limit=many"])
+def test_missing_therapists_or_bad_limit_is_a_bad_request(client, query):
+    response = client.get(f"/api/appointments/search/earliest?{query}")
+    
+    assert response.status_code == 400
+    assert response.get_json()["success"] is False
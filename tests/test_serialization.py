@@ -0,0 +1,53 @@
+"""
+Tests of the fast serialization of slot listings.
+"""
+from datetime import date, timedelta
+
+from app.schemas.time_slot import TimeSlotResponse
+from tests.conftest import at
+
+TOMORROW = date.today() + timedelta(days=1)
+
+
+def model_rows(rows):
+    """Return rows as the response models serialized them before the fast path."""
+    return [
+        {
+            "therapist_id": model.therapist_id,
+            "start_time": model.start_time.isoformat(),
+            "end_time": model.end_time.isoformat(),
+            "status": model.status
+        } for model in (TimeSlotResponse(**row) for row in rows)
+    ]
+
+
+def test_listings_match_the_response_models(client, backend):
+    for therapist_id, hour in (("t1", 10), ("t2", 9), ("t2", 11)):
+        assert backend.create_free_slot(therapist_id, at(TOMORROW, hour), at(TOMORROW, hour + 1))
+    backend.book_slot("t2", at(TOMORROW, 11))
+    
+    listing = client.get(f"/api/appointments/therapist/t2/slots?date={TOMORROW}").get_json()["slots"]
+    assert listing == model_rows(listing)
+    assert [row["status"] for row in listing] == ["free", "busy"]
+    
+    search = client.get(f"/api/appointments/search/earliest?therapist_ids=t1,t2&from={TOMORROW}&to={TOMORROW}").get_json()["slots"]
+    assert search == model_rows(search)
+    assert [(row["therapist_id"], row["start_time"]) for row in search] == [
+        ("t2", at(TOMORROW, 9).isoformat()),
+        ("t1", at(TOMORROW, 10).isoformat())
+    ]
+
+
+def test_search_etag_changes_with_the_results(client, backend):
+    assert backend.create_free_slot("t1", at(TOMORROW, 10), at(TOMORROW, 11))
+    url = f"/api/appointments/search/earliest?therapist_ids=t1,t2&from={TOMORROW}&to={TOMORROW}"
+    
+    first = client.get(url)
+    assert client.get(url, headers={"If-None-Match": first.headers["ETag"]}).status_code == 304
+    
+    # Same times with another therapist
+    backend.book_slot("t1", at(TOMORROW, 10))
+    assert backend.create_free_slot("t2", at(TOMORROW, 10), at(TOMORROW, 11))
+    changed = client.get(url, headers={"If-None-Match": first.headers["ETag"]})
+    assert changed.status_code == 200
+    assert [row["therapist_id"] for row in changed.get_json()["slots"]] == ["t2"]
@@ -0,0 +1,69 @@
+"""
+Tests of the sorted slot index and the overlap checks built on it.
+"""
+from datetime import date, timedelta
+
+from app.integrations import TimeSlot
+from app.integrations.slot_index import SlotIndex
+from tests.conftest import at
+
+TOMORROW = date.today() + timedelta(days=1)
+
+
+def slot(start_hour: int, end_hour: int) -> TimeSlot:
+    return TimeSlot(at(TOMORROW, start_hour), at(TOMORROW, end_hour))
+
+
+def starts(slots):
+    return [item.start_time.hour for item in slots]
+
+
+def test_index_finds_and_checks_overlaps_in_any_order():
+    index = SlotIndex([slot(14, 15), slot(9, 12), slot(12, 13)])
+    
+    assert starts(index) == [9, 12, 14]
+    assert index.find(slot(12, 13).start).end == slot(12, 13).end
+    assert index.find(slot(10, 11).start) is None
+    # The long 9-12 slot covers 10-11 even though 12-13 starts later
+    assert index.overlaps(slot(10, 11).start, slot(10, 11).end)
+    assert not index.overlaps(slot(13, 14).start, slot(13, 14).end)
+    assert not index.overlaps(slot(15, 16).start, slot(15, 16).end)
+    assert starts(index.between(slot(12, 13).start, slot(15, 16).start)) == [12, 14]
+
+
+def test_merge_skips_candidates_overlapping_indexed_slots():
+    index = SlotIndex([slot(10, 11)])
+    
+    inserted, skipped = index.merge([slot(8, 9), slot(9, 10), slot(10, 11), slot(11, 12)])
+    
+    assert starts(inserted) == [8, 9, 11]
+    assert starts(skipped) == [10]
+    assert starts(index) == [8, 9, 10, 11]
+
+
+def test_overlapping_slot_is_rejected(backend):
+    assert backend.create_free_slot("t1", at(TOMORROW, 10), at(TOMORROW, 11))
+    
+    assert not backend.create_free_slot("t1", at(TOMORROW, 10), at(TOMORROW, 11))
+    assert backend.create_free_slot("t2", at(TOMORROW, 10), at(TOMORROW, 11))
+    assert backend.get_day_stats("t1", TOMORROW)["total"] == 1
+
+
+def test_availability_range_skips_overlapping_slots(backend):
+    assert backend.create_free_slot("t1", at(TOMORROW, 10), at(TOMORROW, 11))
+    
+    assert backend.create_availability_range("t1", at(TOMORROW, 9), at(TOMORROW, 12))
+    
+    assert starts(backend.list_all_slots("t1", TOMORROW)) == [9, 10, 11]
+    assert backend.get_day_stats("t1", TOMORROW)["total"] == 3
+
+
+def test_overlapping_slot_is_a_bad_request(client, backend):
+    assert backend.create_free_slot("t1", at(TOMORROW, 10), at(TOMORROW, 11))
+    
+    response = client.post("/api/appointments/therapist/slots", json={
+        "therapist_id": "t1",
+        "start_time": at(TOMORROW, 10).isoformat(),
+        "end_time": at(TOMORROW, 11).isoformat()
+    })
+    assert response.status_code == 400
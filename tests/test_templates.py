@@ -0,0 +1,48 @@
+"""
+Tests of the clinic-wide availability templates.
+"""
+from datetime import date, timedelta
+
+import pytest
+
+from app.config import active_config
+
+MONDAY = date.today() + timedelta(days=7 - date.today().weekday())
+
+
+def template(therapist_ids, days: int = 7) -> dict:
+    return {
+        "therapist_ids": therapist_ids,
+        "from": MONDAY.isoformat(),
+        "to": (MONDAY + timedelta(days=days - 1)).isoformat(),
+        "weekdays": ["mon", "wed"],
+        "start_time": "09:00",
+        "end_time": "11:00"
+    }
+
+
+def test_template_creates_the_slots_of_every_therapist_once(client, backend):
+    response = client.post("/api/appointments/availability/template", json=template(["t1", "t2"]))
+    
+    assert response.status_code == 201
+    assert response.get_json()["therapists"] == {"t1": 4, "t2": 4}
+    assert backend.get_day_stats("t2", MONDAY + timedelta(days=2)) == {"free": 2, "busy": 0, "total": 2}
+    
+    again = client.post("/api/appointments/availability/template", json=template(["t1"]))
+    assert again.get_json()["slots_created"] == 0
+
+
+@pytest.mark.parametrize("therapist_ids", ["abc", {"t1": True}, None, []])
+def test_template_rejects_anything_but_a_list_of_therapists(client, backend, therapist_ids):
+    response = client.post("/api/appointments/availability/template", json=template(therapist_ids))
+    
+    assert response.status_code == 400
+    assert backend.list_therapist_ids() == []
+
+
+def test_template_limits_therapists_and_days(client, backend, monkeypatch):
+    monkeypatch.setattr(active_config, "TEMPLATE_MAX_THERAPISTS", 2)
+    
+    assert client.post("/api/appointments/availability/template", json=template(["t1", "t2", "t3"])).status_code == 400
+    assert client.post("/api/appointments/availability/template", json=template(["t1"], days=active_config.TEMPLATE_MAX_DAYS + 1)).status_code == 400
+    assert backend.list_therapist_ids() == []
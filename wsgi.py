@@ -0,0 +1,12 @@
+"""
+WSGI entry point of the production server.
+
+    gunicorn wsgi:app
+
+The app is loaded once in the master process, before the workers are forked,
+so it starts no background jobs and opens no connections here: each worker
+does so after the fork (see gunicorn.conf.py and app/services/worker_service.py).
+"""
+from app import create_app
+
+app = create_app(background_jobs=False)